@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput and latency benchmarks of Redlock against in-process Redis stand-ins (see fake_server.py).
+
+Every scenario runs in synchronous mode (one thread per worker) and in asynchronous mode (one task per worker),
+and reports one JSON object per run with the throughput and the latency percentiles of the operations:
+
+    python benchmarks/bench_redlock.py --duration 2 --output results.json
+    python benchmarks/bench_redlock.py --scenario contention --mode async --workers 1,10,100 --latency 0.5
+
+Scenarios:
+    uncontended  each worker acquires and releases its own resources, an operation is one acquire plus one release.
+    contention   all the workers compete for one hot resource with single-attempt acquisitions,
+                 an operation is one attempt (plus the release when it succeeded).
+    quorum       one worker acquires and releases its own resources on 1, 3, 5 and 7 nodes.
+    extend       each worker holds a lock and extends it, an operation is one extend.
+    read         all the workers share read locks on one hot resource (RedlockRW) with single-attempt acquisitions,
+                 an operation is one attempt (plus the release when it succeeded).
+    blocking     all the workers compete for one hot resource with blocking acquisitions,
+                 an operation is one acquisition (plus the release when it succeeded).
+    fair         the blocking scenario with FairRedlock, which grants the resource in the order of arrival.
+    optimistic   each worker updates its own resource with OptimisticRedlock, an operation is one committed update,
+                 to compare with one acquire plus one release of the uncontended scenario.
+
+The stand-ins run in the benchmark process, so the absolute numbers include their own CPU time;
+compare results taken on the same machine with the same options.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import pyredlock
+from pyredlock import AioRedisClientManager, FairRedlock, OptimisticRedlock, RedisClientManager, RedlockRW
+from fake_server import Faults, FakeRedisServer
+
+SCENARIOS = ("uncontended", "contention", "quorum", "extend", "read", "blocking", "fair", "optimistic")
+# Upper bound of a blocking acquisition in seconds.
+BLOCKING_TIMEOUT = 10.0
+MODES = ("sync", "async")
+# The workers never hold more than one connection per node, but with 1000 workers
+# setting up their connections at once a pool can be starved for more than the socket timeout.
+POOL_TIMEOUT = 60.0
+
+
+def _percentile(samples: List[float], q: float) -> Optional[float]:
+    if len(samples) == 0:
+        return None
+    return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+
+def _report(scenario: str, mode: str, servers: List[FakeRedisServer], workers: int, elapsed: float,
+            latencies: List[float], succeeded: int) -> Dict[str, Any]:
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "mode": mode,
+        "nodes": len(servers),
+        "workers": workers,
+        "ops": len(latencies),
+        "succeeded": succeeded,
+        # Including the connection handshakes and the script loads.
+        "commands_per_op": round(sum(server.commands for server in servers) / max(len(latencies), 1), 2),
+        "commands_per_success": round(sum(server.commands for server in servers) / max(succeeded, 1), 2),
+        "seconds": round(elapsed, 3),
+        "ops_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": None if len(latencies) == 0 else round(_percentile(latencies, 50) * 1000, 3),
+        "p99_ms": None if len(latencies) == 0 else round(_percentile(latencies, 99) * 1000, 3),
+        "p999_ms": None if len(latencies) == 0 else round(_percentile(latencies, 99.9) * 1000, 3),
+    }
+
+
+def _client_confs(servers: List[FakeRedisServer]) -> List[Dict[str, Any]]:
+    return [{
+        "endpoint": f"127.0.0.1:{server.port}",
+        "password": "",
+        "db": 0,
+        "socket_timeout": 1.0,
+        "socket_connect_timeout": 1.0
+    } for server in servers]
+
+
+def _make_op(scenario: str, redlock: pyredlock.Redlock, worker: int, ttl: int) -> Callable[[], bool]:
+    counter = iter(range(1 << 62))
+    if scenario == "contention":
+        def op() -> bool:
+            success, lock = redlock.lock("bench:hot", ttl)
+            if success:
+                redlock.unlock(lock)
+            return success
+    elif scenario == "read":
+        def op() -> bool:
+            success, lock = redlock.read_lock("bench:hot", ttl)
+            if success:
+                redlock.unlock(lock)
+            return success
+    elif scenario == "optimistic":
+        def op() -> bool:
+            success, _, _ = redlock.run(f"bench:optimistic:{worker}", lambda version: version)
+            return success
+    elif scenario in ("blocking", "fair"):
+        def op() -> bool:
+            success, lock = redlock.lock("bench:hot", ttl, blocking=True, timeout=BLOCKING_TIMEOUT)
+            if success:
+                redlock.unlock(lock)
+            return success
+    elif scenario == "extend":
+        held = {}
+
+        def op() -> bool:
+            if "lock" not in held:
+                _, held["lock"] = redlock.lock(f"bench:extend:{worker}", ttl)
+            return redlock.extend(held["lock"], ttl)
+    else:
+        def op() -> bool:
+            success, lock = redlock.lock(f"bench:{worker}:{next(counter)}", ttl)
+            if success:
+                redlock.unlock(lock)
+            return success
+    return op
+
+
+def _make_aop(scenario: str, redlock: pyredlock.Redlock, worker: int, ttl: int) -> Callable[[], Awaitable[bool]]:
+    counter = iter(range(1 << 62))
+    if scenario == "contention":
+        async def op() -> bool:
+            success, lock = await redlock.alock("bench:hot", ttl)
+            if success:
+                await redlock.aunlock(lock)
+            return success
+    elif scenario == "read":
+        async def op() -> bool:
+            success, lock = await redlock.aread_lock("bench:hot", ttl)
+            if success:
+                await redlock.aunlock(lock)
+            return success
+    elif scenario == "optimistic":
+        async def op() -> bool:
+            success, _, _ = await redlock.arun(f"bench:optimistic:{worker}", lambda version: version)
+            return success
+    elif scenario in ("blocking", "fair"):
+        async def op() -> bool:
+            success, lock = await redlock.alock("bench:hot", ttl, blocking=True, timeout=BLOCKING_TIMEOUT)
+            if success:
+                await redlock.aunlock(lock)
+            return success
+    elif scenario == "extend":
+        held = {}
+
+        async def op() -> bool:
+            if "lock" not in held:
+                _, held["lock"] = await redlock.alock(f"bench:extend:{worker}", ttl)
+            return await redlock.aextend(held["lock"], ttl)
+    else:
+        async def op() -> bool:
+            success, lock = await redlock.alock(f"bench:{worker}:{next(counter)}", ttl)
+            if success:
+                await redlock.aunlock(lock)
+            return success
+    return op
+
+
+def run_sync(scenario: str, servers: List[FakeRedisServer], workers: int, duration: float,
+             ttl: int, redlock_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    manager = RedisClientManager(_client_confs(servers), max_connections=max(workers, 1), pool_timeout=POOL_TIMEOUT)
+    if scenario == "read":
+        redlock = RedlockRW(connections=manager.get_connections(), async_mode=False, **redlock_kwargs)
+    elif scenario == "fair":
+        redlock = FairRedlock(connections=manager.get_connections(), async_mode=False, **redlock_kwargs)
+    elif scenario == "optimistic":
+        redlock = OptimisticRedlock(connections=manager.get_connections(), async_mode=False, **redlock_kwargs)
+    else:
+        redlock = manager.redlock(**redlock_kwargs)
+    results = [[] for _ in range(workers)]
+    succeeded = [0] * workers
+    start = threading.Barrier(workers + 1)
+
+    def worker(i: int) -> None:
+        op = _make_op(scenario, redlock, i, ttl)
+        latencies = results[i]
+        start.wait()
+        deadline = time.perf_counter() + duration
+        while True:
+            t = time.perf_counter()
+            if t >= deadline:
+                break
+            ok = op()
+            latencies.append(time.perf_counter() - t)
+            succeeded[i] += ok
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    t = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - t
+    redlock.close()
+    manager.close()
+    return _report(scenario, "sync", servers, workers, elapsed, [x for r in results for x in r], sum(succeeded))
+
+
+async def run_async(scenario: str, servers: List[FakeRedisServer], workers: int, duration: float,
+                    ttl: int, redlock_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    manager = AioRedisClientManager(_client_confs(servers), max_connections=max(workers, 1), pool_timeout=POOL_TIMEOUT)
+    if scenario == "read":
+        redlock = RedlockRW(connections=manager.get_connections(), async_mode=True, **redlock_kwargs)
+    elif scenario == "fair":
+        redlock = FairRedlock(connections=manager.get_connections(), async_mode=True, **redlock_kwargs)
+    elif scenario == "optimistic":
+        redlock = OptimisticRedlock(connections=manager.get_connections(), async_mode=True, **redlock_kwargs)
+    else:
+        redlock = manager.redlock(**redlock_kwargs)
+    results = [[] for _ in range(workers)]
+    succeeded = [0] * workers
+
+    async def worker(i: int, deadline: float) -> None:
+        op = _make_aop(scenario, redlock, i, ttl)
+        latencies = results[i]
+        while True:
+            t = time.perf_counter()
+            if t >= deadline:
+                break
+            ok = await op()
+            latencies.append(time.perf_counter() - t)
+            succeeded[i] += ok
+
+    t = time.perf_counter()
+    await asyncio.gather(*[worker(i, t + duration) for i in range(workers)])
+    elapsed = time.perf_counter() - t
+    await redlock.aclose()
+    await manager.close()
+    return _report(scenario, "async", servers, workers, elapsed, [x for r in results for x in r], sum(succeeded))
+
+
+def run(scenario: str, mode: str, nodes: int, workers: int, duration: float, ttl: int,
+        faults: Dict[str, Any], redlock_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    if scenario in ("contention", "read"):
+        # Single attempts, so that the latency is not dominated by the retry delays.
+        redlock_kwargs = dict(redlock_kwargs, retry_count=1)
+    if scenario in ("blocking", "fair"):
+        # The stand-ins do not publish the releases, so the waiters poll.
+        redlock_kwargs = dict(redlock_kwargs, retry_delay=0.005)
+    if scenario in ("read", "fair"):
+        # The readers do not contend, and neither RedlockRW nor FairRedlock have a local queue or fencing tokens.
+        redlock_kwargs = dict(redlock_kwargs, coalesce_local=False, fencing=False)
+    if mode == "sync":
+        redlock_kwargs = dict(redlock_kwargs, multiplex=False)
+    servers = [FakeRedisServer(Faults(seed=i, **faults)).start() for i in range(nodes)]
+    try:
+        if mode == "sync":
+            result = run_sync(scenario, servers, workers, duration, ttl, redlock_kwargs)
+        else:
+            result = asyncio.run(run_async(scenario, servers, workers, duration, ttl, redlock_kwargs))
+    finally:
+        for server in servers:
+            server.stop()
+    result.update({"faults": faults, "redlock": redlock_kwargs})
+    return result
+
+
+def plan(scenarios: List[str], nodes: int, workers: List[int]) -> List[Dict[str, int]]:
+    runs = []
+    for scenario in scenarios:
+        if scenario in ("contention", "read", "blocking", "fair"):
+            runs.extend({"scenario": scenario, "nodes": nodes, "workers": n} for n in workers)
+        elif scenario == "quorum":
+            runs.extend({"scenario": scenario, "nodes": n, "workers": 1} for n in (1, 3, 5, 7))
+        else:
+            runs.append({"scenario": scenario, "nodes": nodes, "workers": 1})
+    return runs
+
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="scenarios to run (default: all)")
+    parser.add_argument("--mode", action="append", choices=MODES, help="modes to run (default: both)")
+    parser.add_argument("--nodes", type=int, default=3, help="number of nodes, except in the quorum scenario")
+    parser.add_argument("--workers", default="1,10,100,1000", help="worker counts of the contended scenarios")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per run")
+    parser.add_argument("--ttl", type=int, default=10000, help="lock ttl in milliseconds")
+    parser.add_argument("--latency", type=float, default=0.0, help="injected latency per round-trip in milliseconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="injected latency jitter in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an error reply")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="probability of a dropped connection")
+    parser.add_argument("--fan-out", action="store_true", help="send the per-node commands concurrently")
+    parser.add_argument("--coalesce-local", action="store_true", help="queue the local contenders of a resource")
+    parser.add_argument("--fencing", action="store_true", help="issue fencing tokens with the locks")
+    parser.add_argument("--multiplex", action="store_true", help="pipeline the concurrent commands per node (async mode)")
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    faults = {
+        "latency": args.latency / 1000,
+        "jitter": args.jitter / 1000,
+        "error_rate": args.error_rate,
+        "drop_rate": args.drop_rate
+    }
+    redlock_kwargs = {"fan_out": args.fan_out, "coalesce_local": args.coalesce_local, "fencing": args.fencing,
+                      "multiplex": args.multiplex}
+    workers = [int(n) for n in args.workers.split(",")]
+    results = []
+    for item in plan(args.scenario or list(SCENARIOS), args.nodes, workers):
+        for mode in args.mode or list(MODES):
+            result = run(item["scenario"], mode, item["nodes"], item["workers"], args.duration, args.ttl,
+                         faults, redlock_kwargs)
+            results.append(result)
+            print(
+                f"{result['scenario']:<12} {mode:<5} nodes={result['nodes']} workers={result['workers']:<5}"
+                f" {result['ops_per_sec']:>10.1f} ops/s {result['commands_per_op']:>6.2f} cmd/op  p50={result['p50_ms']}ms"
+                f" p99={result['p99_ms']}ms p999={result['p999_ms']}ms",
+                file=sys.stderr
+            )
+    document = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "redis-py": redis.__version__,
+            "pyredlock": pyredlock.__version__
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+    else:
+        json.dump(document, sys.stdout, indent=2)
+        print()
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""Micro-benchmark of the lock value generation: the former random.choice based ids against TokenGenerator."""
+import base64
+import os
+import random
+import string
+import sys
+import timeit
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyredlock import TokenGenerator
+
+
+def legacy_unique_id() -> str:
+    CHARACTERS = string.ascii_letters + string.digits
+    return "".join([random.choice(CHARACTERS) for _ in range(22)])
+
+
+def main(number: int = 200000) -> None:
+    candidates = [
+        ("legacy random.choice x22", legacy_unique_id),
+        ("TokenGenerator()", TokenGenerator()),
+        ("TokenGenerator(owner_prefix=True)", TokenGenerator(owner_prefix=True)),
+        ("os.urandom(15) + base64 per token", lambda: base64.urlsafe_b64encode(os.urandom(15))),
+    ]
+    for name, generate in candidates:
+        elapsed = min(timeit.repeat(generate, number=number, repeat=5))
+        print(f"{name:<36} {elapsed / number * 1e9:8.1f} ns/token  {number / elapsed:12.0f} tokens/s")
+
+
+if __name__ == "__main__":
+    main()
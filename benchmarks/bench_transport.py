@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the client CPU time per lock/unlock cycle: Redlock over redis-py against the lean RESP transports.
+
+Each cycle acquires and releases an uncontended lock on every node, one cycle after the other, against in-process
+Redis stand-ins (see fake_server.py). The stand-ins run on their own threads, so the CPU time of the calling thread
+is that of the client alone: building, sending and parsing the commands, and the Redlock logic around them.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis
+import redis.asyncio as aio_redis
+
+from typing import Any, Callable, List, Optional, Tuple
+
+from fake_server import FakeRedisServer
+from pyredlock import AioRespConnection, Redlock, RespConnection
+
+
+def _report(name: str, ops: int, cpu: float, elapsed: float) -> None:
+    print(f"{name:<26} {cpu / ops * 1e6:8.1f} us CPU/op  {elapsed / ops * 1e6:8.1f} us/op  {ops / elapsed:9.0f} ops/s")
+
+
+def run_sync(connect: Callable[[int], Any], servers: List[FakeRedisServer], ops: int) -> Tuple[float, float]:
+    connections = [connect(server.port) for server in servers]
+    redlock = Redlock(connections, async_mode=False)
+    for i in range(ops // 10):  # Warm up the connections and the script caches.
+        success, lock = redlock.lock(f"bench:{i}", 10000)
+        redlock.unlock(lock)
+    started, cpu = time.perf_counter(), time.thread_time()
+    for i in range(ops):
+        success, lock = redlock.lock(f"bench:{i}", 10000)
+        redlock.unlock(lock)
+    return (time.thread_time() - cpu, time.perf_counter() - started)
+
+
+async def run_async(connect: Callable[[int], Any], servers: List[FakeRedisServer], ops: int) -> Tuple[float, float]:
+    connections = [connect(server.port) for server in servers]
+    redlock = Redlock(connections)
+    for i in range(ops // 10):
+        success, lock = await redlock.alock(f"bench:{i}", 10000)
+        await redlock.aunlock(lock)
+    started, cpu = time.perf_counter(), time.thread_time()
+    for i in range(ops):
+        success, lock = await redlock.alock(f"bench:{i}", 10000)
+        await redlock.aunlock(lock)
+    elapsed = (time.thread_time() - cpu, time.perf_counter() - started)
+    for connection in connections:
+        await connection.aclose()
+    return elapsed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=5000, help="lock/unlock cycles per transport")
+    parser.add_argument("--nodes", type=int, default=3, help="number of Redis stand-ins")
+    args = parser.parse_args(argv)
+
+    servers = [FakeRedisServer().start() for _ in range(args.nodes)]
+    try:
+        candidates = [
+            ("sync redis-py", lambda port: redis.Redis(port=port, socket_timeout=1.0)),
+            ("sync RespConnection", lambda port: RespConnection(port=port, socket_timeout=1.0)),
+        ]
+        for name, connect in candidates:
+            _report(name, args.ops, *run_sync(connect, servers, args.ops))
+        candidates = [
+            ("async redis-py", lambda port: aio_redis.Redis(port=port, socket_timeout=1.0)),
+            ("async AioRespConnection", lambda port: AioRespConnection(port=port, socket_timeout=1.0)),
+        ]
+        for name, connect in candidates:
+            _report(name, args.ops, *asyncio.run(run_async(connect, servers, args.ops)))
+    finally:
+        for server in servers:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,686 @@
+# -*- coding: utf-8 -*-
+"""
+An in-process stand-in for a Redis server, speaking RESP over TCP on localhost, for the benchmarks.
+
+It implements the handful of commands Redlock sends, and emulates the Lua scripts of Redlock in Python
+(looked up by their SHA1 digest, as EVALSHA does), so that no Redis installation is needed.
+Latency and faults can be injected per server, to measure how the lock behaves with slow or failing nodes.
+"""
+import asyncio
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pyredlock import FairRedlock, OptimisticRedlock, RedlockRW, RedlockSemaphore, ReentrantRedlock
+
+
+class _Simple(bytes):
+    """A simple string reply, e.g. +OK."""
+    pass
+
+
+class _Error(Exception):
+    pass
+
+
+_OK = _Simple(b"OK")
+_PONG = _Simple(b"PONG")
+
+
+def _encode(reply: Any) -> bytes:
+    if isinstance(reply, _Simple):
+        return b"+" + reply + b"\r\n"
+    if isinstance(reply, _Error):
+        return b"-" + str(reply).encode("utf-8") + b"\r\n"
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, bool):
+        return b":%d\r\n" % int(reply)
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    if isinstance(reply, (list, tuple)):
+        return b"*%d\r\n" % len(reply) + b"".join(_encode(item) for item in reply)
+    raise TypeError(f"cannot encode {reply!r}")
+
+
+def _parse(buf: bytearray, pos: int) -> Optional[Tuple[List[bytes], int]]:
+    """
+    Parse one RESP array of bulk strings from a buffer, or return None if it is incomplete.
+    """
+    end = buf.find(b"\r\n", pos)
+    if end < 0:
+        return None
+    if buf[pos] != 42:  # "*"
+        raise ValueError("inline commands are not supported")
+    count = int(buf[pos + 1:end])
+    pos = end + 2
+    args = []
+    for _ in range(count):
+        end = buf.find(b"\r\n", pos)
+        if end < 0:
+            return None
+        size = int(buf[pos + 1:end])
+        pos = end + 2
+        if pos + size + 2 > len(buf):
+            return None
+        args.append(bytes(buf[pos:pos + size]))
+        pos += size + 2
+    return args, pos
+
+
+class Faults(object):
+    """
+    The latency and faults injected by a FakeRedisServer.
+
+    Attributes:
+        latency (float): Delay added before each batch of replies, in seconds.
+        jitter (float): Upper bound of a uniformly distributed delay added on top of the latency, in seconds.
+        error_rate (float): Probability of replying to a command with an error.
+        drop_rate (float): Probability of closing the connection instead of replying to a command.
+        down (bool): Whether the server closes every connection, as a crashed node would.
+    """
+
+    def __init__(
+            self,
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            error_rate: float = 0.0,
+            drop_rate: float = 0.0,
+            down: bool = False,
+            seed: Optional[int] = None
+        ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.down = down
+        self.random = random.Random(seed)
+
+    def delay(self) -> float:
+        return self.latency + (self.random.uniform(0, self.jitter) if self.jitter > 0 else 0.0)
+
+
+class _RespProtocol(asyncio.Protocol):
+
+    def __init__(self, server: "FakeRedisServer") -> None:
+        self._server = server
+        self._buffer = bytearray()
+        self._transport: Optional[asyncio.Transport] = None
+        self._ready_at = 0.0
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self._transport = transport
+        if self._server.faults.down:
+            transport.close()
+            return
+        self._server._transports.add(transport)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._server._transports.discard(self._transport)
+
+    def data_received(self, data: bytes) -> None:
+        self._buffer += data
+        faults = self._server.faults
+        replies = []
+        pos = 0
+        while pos < len(self._buffer):
+            parsed = _parse(self._buffer, pos)
+            if parsed is None:
+                break
+            args, pos = parsed
+            if faults.drop_rate > 0 and faults.random.random() < faults.drop_rate:
+                self._transport.close()
+                return
+            if faults.error_rate > 0 and faults.random.random() < faults.error_rate:
+                replies.append(_encode(_Error("ERR injected fault")))
+                continue
+            replies.append(_encode(self._server.execute(args)))
+        del self._buffer[:pos]
+        if len(replies) == 0:
+            return
+        out = b"".join(replies)
+        # A pipeline costs one round-trip, and the replies are never reordered by the jitter.
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        at = max(now + faults.delay(), self._ready_at)
+        self._ready_at = at
+        if at <= now:
+            self._transport.write(out)
+        else:
+            loop.call_later(at - now, self._write, out)
+
+    def _write(self, out: bytes) -> None:
+        if not self._transport.is_closing():
+            self._transport.write(out)
+
+
+class FakeRedisServer(object):
+    """A Redis stand-in serving on localhost from a background thread."""
+
+    def __init__(self, faults: Optional[Faults] = None) -> None:
+        """
+        Initialize the FakeRedisServer.
+
+        Args:
+            faults (Optional[Faults], optional): The latency and faults to inject. Defaults to None (none),
+                and can be changed while the server runs.
+
+        Attributes:
+            port (int): The port the server listens on, once started.
+            scripts (Dict[str, Callable]): The emulated Lua scripts by SHA1 digest.
+            commands (int): Number of commands served.
+        """
+        self.faults = faults or Faults()
+        self.port: Optional[int] = None
+        self.commands = 0
+        self.scripts: Dict[str, Callable[["FakeRedisServer", List[bytes], List[bytes]], Any]] = {}
+        self._data: Dict[bytes, Any] = {}
+        self._expires: Dict[bytes, float] = {}
+        self._transports = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        for name, source in _redlock_sources().items():
+            self.register_script(source, _SCRIPTS[name])
+
+    def register_script(self, source: str, fn: Callable[["FakeRedisServer", List[bytes], List[bytes]], Any]) -> None:
+        """
+        Emulate a Lua script.
+
+        Args:
+            source (str): The Lua source of the script.
+            fn (Callable[[FakeRedisServer, List[bytes], List[bytes]], Any]): Called with the server, the keys
+                and the arguments of the script, returns the reply.
+        """
+        self.scripts[hashlib.sha1(source.encode("utf-8")).hexdigest()] = fn
+
+    def start(self) -> "FakeRedisServer":
+        ready = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            server = self._loop.run_until_complete(
+                self._loop.create_server(lambda: _RespProtocol(self), "127.0.0.1", 0)
+            )
+            self.port = server.sockets[0].getsockname()[1]
+            ready.set()
+            try:
+                self._loop.run_forever()
+            finally:
+                server.close()
+                for transport in list(self._transports):
+                    transport.close()
+                self._loop.run_until_complete(server.wait_closed())
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="fake-redis", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    def crash(self) -> None:
+        """
+        Close every connection and refuse the new ones, until the faults are reset.
+        """
+        self.faults.down = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: [transport.close() for transport in list(self._transports)])
+
+    # The keyspace, only touched from the event loop of the server.
+
+    def get(self, key: bytes) -> Any:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            del self._expires[key]
+            self._data.pop(key, None)
+        return self._data.get(key)
+
+    def set(self, key: bytes, value: Any, px: Optional[int] = None) -> None:
+        self._data[key] = value
+        if px is None:
+            self._expires.pop(key, None)
+        else:
+            self._expires[key] = time.monotonic() + px / 1000
+
+    def delete(self, key: bytes) -> int:
+        exists = self.get(key) is not None
+        self._expires.pop(key, None)
+        self._data.pop(key, None)
+        return int(exists)
+
+    def pexpire(self, key: bytes, px: int) -> int:
+        if self.get(key) is None:
+            return 0
+        self._expires[key] = time.monotonic() + px / 1000
+        return 1
+
+    def pttl(self, key: bytes) -> int:
+        if self.get(key) is None:
+            return -2
+        expires = self._expires.get(key)
+        return -1 if expires is None else int((expires - time.monotonic()) * 1000)
+
+    def execute(self, args: List[bytes]) -> Any:
+        self.commands += 1
+        name = args[0].upper()
+        handler = _COMMANDS.get(name)
+        if handler is None:
+            return _Error(f"ERR unknown command '{name.decode()}'")
+        try:
+            return handler(self, args[1:])
+        except _Error as exc:
+            return exc
+        except (IndexError, ValueError) as exc:
+            return _Error(f"ERR {exc or 'syntax error'}")
+
+
+def _cmd_set(server: FakeRedisServer, args: List[bytes]) -> Any:
+    key, value = args[0], args[1]
+    nx = xx = False
+    px = None
+    i = 2
+    while i < len(args):
+        opt = args[i].upper()
+        if opt == b"NX":
+            nx = True
+        elif opt == b"XX":
+            xx = True
+        elif opt == b"PX":
+            px = int(args[i + 1])
+            i += 1
+        elif opt == b"EX":
+            px = int(args[i + 1]) * 1000
+            i += 1
+        else:
+            raise ValueError("syntax error")
+        i += 1
+    exists = server.get(key) is not None
+    if (nx and exists) or (xx and not exists):
+        return None
+    server.set(key, value, px)
+    return _OK
+
+
+def _cmd_incr(server: FakeRedisServer, args: List[bytes]) -> Any:
+    # Keeps the expiry of the key, as INCR does.
+    value = int(server.get(args[0]) or 0) + 1
+    server._data[args[0]] = b"%d" % value
+    return value
+
+
+def _cmd_script(server: FakeRedisServer, args: List[bytes]) -> Any:
+    sub = args[0].upper()
+    if sub == b"LOAD":
+        sha = hashlib.sha1(args[1]).hexdigest()
+        if sha not in server.scripts:
+            return _Error("ERR script not emulated by the fake server")
+        return sha.encode("ascii")
+    if sub == b"EXISTS":
+        return [int(arg.decode("ascii") in server.scripts) for arg in args[1:]]
+    if sub == b"FLUSH":
+        return _OK
+    raise ValueError("unknown SCRIPT subcommand")
+
+
+def _run_script(server: FakeRedisServer, sha: str, args: List[bytes]) -> Any:
+    fn = server.scripts.get(sha)
+    if fn is None:
+        return _Error("NOSCRIPT No matching script. Please use EVAL.")
+    numkeys = int(args[0])
+    return fn(server, args[1:1 + numkeys], args[1 + numkeys:])
+
+
+def _cmd_time(server: FakeRedisServer, args: List[bytes]) -> Any:
+    now = time.time()
+    return [b"%d" % int(now), b"%d" % int(now % 1 * 1000000)]
+
+
+_COMMANDS: Dict[bytes, Callable[[FakeRedisServer, List[bytes]], Any]] = {
+    b"PING": lambda server, args: _PONG,
+    b"AUTH": lambda server, args: _OK,
+    b"SELECT": lambda server, args: _OK,
+    b"CLIENT": lambda server, args: _OK,
+    b"FLUSHALL": lambda server, args: server._data.clear() or server._expires.clear() or _OK,
+    b"GET": lambda server, args: server.get(args[0]),
+    b"SET": _cmd_set,
+    b"DEL": lambda server, args: sum(server.delete(key) for key in args),
+    b"EXISTS": lambda server, args: sum(1 for key in args if server.get(key) is not None),
+    b"PEXPIRE": lambda server, args: server.pexpire(args[0], int(args[1])),
+    b"PTTL": lambda server, args: server.pttl(args[0]),
+    b"INCR": _cmd_incr,
+    b"PUBLISH": lambda server, args: 0,
+    b"TIME": _cmd_time,
+    b"SCRIPT": _cmd_script,
+    b"EVALSHA": lambda server, args: _run_script(server, args[0].decode("ascii").lower(), args[1:]),
+    b"EVAL": lambda server, args: _run_script(server, hashlib.sha1(args[0]).hexdigest(), args[1:]),
+}
+
+
+# Python twins of the Lua scripts of Redlock, by script name.
+
+def _unlock(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if server.get(keys[0]) == args[0]:
+        return server.delete(keys[0])
+    return 0
+
+
+def _extend(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if server.get(keys[0]) == args[0]:
+        return server.pexpire(keys[0], int(args[1]))
+    return 0
+
+
+def _lock_many(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if any(server.get(key) is not None for key in keys):
+        return 0
+    for key in keys:
+        server.set(key, args[0], int(args[1]))
+    return 1
+
+
+def _lock_each(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    acquired = []
+    for key in keys:
+        if server.get(key) is None:
+            server.set(key, args[0], int(args[1]))
+            acquired.append(1)
+        else:
+            acquired.append(0)
+    return acquired
+
+
+def _swap(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if server.get(keys[0]) == args[0]:
+        server.set(keys[0], args[1], int(args[2]))
+        return 1
+    return 0
+
+
+def _unlock_many(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    return sum(_unlock(server, [key], args) for key in keys)
+
+
+def _fenced_lock(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if server.get(keys[0]) is not None:
+        return 0
+    server.set(keys[0], args[0], int(args[1]))
+    return _cmd_incr(server, [keys[1]])
+
+
+def _fenced_swap(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if not _swap(server, keys, args):
+        return 0
+    return _cmd_incr(server, [keys[1]])
+
+
+def _raise_fence(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if int(server.get(keys[1]) or 0) < int(args[0]):
+        server.set(keys[1], args[0])
+    return 1
+
+
+def _hash(server: FakeRedisServer, key: bytes) -> Any:
+    held = server.get(key)
+    if held is not None and not isinstance(held, dict):
+        raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+    return held
+
+
+def _reentrant_lock(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    held = _hash(server, keys[0])
+    if held is None:
+        held = {}
+        server.set(keys[0], held)
+    elif args[0] not in held:
+        return 0
+    held[args[0]] = held.get(args[0], 0) + 1
+    server.pexpire(keys[0], int(args[1]))
+    return held[args[0]]
+
+
+def _reentrant_unlock(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    held = _hash(server, keys[0])
+    if held is None or args[0] not in held:
+        return 0
+    held[args[0]] -= 1
+    if held[args[0]] == 0:
+        server.delete(keys[0])
+    return 1
+
+
+def _reentrant_extend(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    held = _hash(server, keys[0])
+    if held is not None and args[0] in held:
+        return server.pexpire(keys[0], int(args[1]))
+    return 0
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _readers(server: FakeRedisServer, key: bytes, now: int) -> Any:
+    # The sorted set of the read locks as {value: expiry}, without the expired ones.
+    readers = _hash(server, key)
+    if readers is not None:
+        for member, expires in list(readers.items()):
+            if expires <= now:
+                del readers[member]
+        if len(readers) == 0:
+            server.delete(key)
+            return None
+    return readers
+
+
+def _read_lock(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if server.get(keys[0]) is not None or server.get(keys[2]) is not None:
+        return 0
+    now = _now_ms()
+    readers = _readers(server, keys[1], now)
+    if readers is None:
+        readers = {}
+        server.set(keys[1], readers)
+    readers[args[0]] = now + int(args[1])
+    if server.pttl(keys[1]) < int(args[1]):
+        server.pexpire(keys[1], int(args[1]))
+    return 1
+
+
+def _write_lock(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if _readers(server, keys[1], _now_ms()) is None and server.get(keys[0]) is None:
+        server.set(keys[0], args[0], int(args[1]))
+        server.delete(keys[2])
+        return 1
+    server.set(keys[2], args[0], int(args[1]))
+    return 0
+
+
+def _rw_unlock(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if server.get(keys[0]) == args[0]:
+        return server.delete(keys[0])
+    readers = _hash(server, keys[1])
+    if readers is None or args[0] not in readers:
+        return 0
+    del readers[args[0]]
+    if len(readers) == 0:
+        server.delete(keys[1])
+    return 1
+
+
+def _rw_extend(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if server.get(keys[0]) == args[0]:
+        return server.pexpire(keys[0], int(args[1]))
+    now = _now_ms()
+    readers = _hash(server, keys[1])
+    if readers is None or readers.get(args[0], 0) <= now:
+        return 0
+    readers[args[0]] = now + int(args[1])
+    if server.pttl(keys[1]) < int(args[1]):
+        server.pexpire(keys[1], int(args[1]))
+    return 1
+
+
+def _rw_abandon(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    if server.get(keys[2]) not in args[1:]:
+        return 0
+    server.delete(keys[2])
+    return 1
+
+
+def _waiters(server: FakeRedisServer, keys: List[bytes], now: int) -> Any:
+    # The queue of a fair lock as {waiter: ticket}, without the waiters which timed out.
+    queue = _hash(server, keys[1])
+    timeouts = _hash(server, keys[2])
+    if queue is not None and timeouts is not None:
+        for member, expires in list(timeouts.items()):
+            if expires <= now:
+                del timeouts[member]
+                queue.pop(member, None)
+    return queue
+
+
+def _dequeue(server: FakeRedisServer, keys: List[bytes], waiter: bytes) -> int:
+    removed = 0
+    for key in (keys[1], keys[2]):
+        waiters = _hash(server, key)
+        if waiters is not None and waiters.pop(waiter, None) is not None:
+            removed = 1
+            if len(waiters) == 0:
+                server.delete(key)
+    return removed
+
+
+def _fair_lock(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    now = _now_ms()
+    queue = _waiters(server, keys, now)
+    if queue is None:
+        queue = {}
+        server.set(keys[1], queue)
+    queue.setdefault(args[2], float(args[3]))
+    if server.get(keys[0]) is None and min(queue, key=lambda member: (queue[member], member)) == args[2]:
+        server.set(keys[0], args[0], int(args[1]))
+        _dequeue(server, keys, args[2])
+        return 1
+    timeouts = _hash(server, keys[2])
+    if timeouts is None:
+        timeouts = {}
+        server.set(keys[2], timeouts)
+    timeouts[args[2]] = now + int(args[4])
+    for key in (keys[1], keys[2]):
+        if server.pttl(key) < int(args[4]):
+            server.pexpire(key, int(args[4]))
+    return 0
+
+
+def _fair_dequeue(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    _dequeue(server, keys, args[0])
+    return 1
+
+
+def _permit_members(val: bytes) -> List[bytes]:
+    count = int(val.rsplit(b"#", 1)[1])
+    return [val + b":%d" % i for i in range(1, count + 1)]
+
+
+def _semaphore_acquire(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    now = _now_ms()
+    members = _permit_members(args[0])
+    # The sorted set of the permits is a dict like the one of the read locks.
+    permits = _readers(server, keys[0], now)
+    if permits is None:
+        permits = {}
+    held = len(permits) - sum(1 for member in members if member in permits)
+    if held + len(members) > int(args[2]):
+        return 0
+    if server.get(keys[0]) is None:
+        server.set(keys[0], permits)
+    for member in members:
+        permits[member] = now + int(args[1])
+    if server.pttl(keys[0]) < int(args[1]):
+        server.pexpire(keys[0], int(args[1]))
+    return 1
+
+
+def _semaphore_release(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    permits = _hash(server, keys[0])
+    if permits is None:
+        return 0
+    removed = [permits.pop(member, None) for member in _permit_members(args[0])]
+    if len(permits) == 0:
+        server.delete(keys[0])
+    return int(any(expires is not None for expires in removed))
+
+
+def _semaphore_extend(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    now = _now_ms()
+    members = _permit_members(args[0])
+    permits = _hash(server, keys[0])
+    if permits is None or any(permits.get(member, 0) <= now for member in members):
+        return 0
+    for member in members:
+        permits[member] = now + int(args[1])
+    if server.pttl(keys[0]) < int(args[1]):
+        server.pexpire(keys[0], int(args[1]))
+    return 1
+
+
+def _optimistic_commit(server: FakeRedisServer, keys: List[bytes], args: List[bytes]) -> Any:
+    current = int(server.get(keys[0]) or 0)
+    if current > int(args[0]):
+        return [0, current]
+    server.set(keys[0], b"%d" % (int(args[0]) + 1))
+    return [1, int(args[0]) + 1]
+
+
+_SCRIPTS = {
+    "unlock": _unlock,
+    "extend": _extend,
+    "lock_many": _lock_many,
+    "lock_each": _lock_each,
+    "unlock_many": _unlock_many,
+    "swap": _swap,
+    "fenced_lock": _fenced_lock,
+    "fenced_swap": _fenced_swap,
+    "raise_fence": _raise_fence,
+    "reentrant_lock": _reentrant_lock,
+    "reentrant_unlock": _reentrant_unlock,
+    "reentrant_extend": _reentrant_extend,
+    "read_lock": _read_lock,
+    "write_lock": _write_lock,
+    "rw_unlock": _rw_unlock,
+    "rw_extend": _rw_extend,
+    "rw_abandon": _rw_abandon,
+    "fair_lock": _fair_lock,
+    # Nobody listens to the releases on the stand-ins.
+    "fair_unlock": _unlock,
+    "fair_dequeue": _fair_dequeue,
+    "semaphore_acquire": _semaphore_acquire,
+    "semaphore_release": _semaphore_release,
+    "semaphore_extend": _semaphore_extend,
+    "optimistic_commit": _optimistic_commit,
+}
+
+
+def _redlock_sources() -> Dict[str, str]:
+    sources = {}
+    for cls in (ReentrantRedlock, RedlockRW, FairRedlock, RedlockSemaphore, OptimisticRedlock):
+        registry = cls(connections=[], async_mode=False)._scripts
+        for name in _SCRIPTS:
+            try:
+                sources.setdefault(name, registry.get(name).source)
+            except KeyError:
+                pass
+    return sources
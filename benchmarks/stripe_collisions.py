@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the false contention of StripedRedlock for a range of stripe counts.
+
+The resource names are read from a file, one per line (e.g. a trace of the acquisitions), or generated as
+"user:<n>:row:<m>". Each run of --concurrency consecutive distinct names is taken as locked at once, and the
+fraction of the acquisitions whose stripe was already held for another resource of their run is reported,
+along with the rate expected for uniformly hashed names. Each node holds at most as many lock keys as stripes.
+"""
+import argparse
+import os
+import random
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import Iterator, List, Optional
+
+from pyredlock import StripedRedlock
+
+
+def _generated(count: int, seed: int) -> Iterator[str]:
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield f"user:{rng.getrandbits(32)}:row:{rng.getrandbits(16)}"
+
+
+def _read(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stripes", default="1024,4096,16384,65536,262144", help="stripe counts to measure")
+    parser.add_argument("--concurrency", type=int, default=1000, help="locks held at once")
+    parser.add_argument("--resources", type=int, default=200000, help="number of generated resource names")
+    parser.add_argument("--input", help="file of resource names, one per line, instead of generated ones")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated resource names")
+    args = parser.parse_args(argv)
+
+    print(f"{'stripes':>10} {'measured':>10} {'expected':>10}")
+    for stripes in (int(n) for n in args.stripes.split(",")):
+        names = _read(args.input) if args.input else _generated(args.resources, args.seed)
+        rate = StripedRedlock.collision_rate(names, stripes, args.concurrency)
+        print(f"{stripes:>10} {rate['measured']:>10.4%} {rate['expected']:>10.4%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,65 @@
 # -*- coding: utf-8 -*-
-from .redis_client import AioRedisClient, RedisClient, RedisClientSetupException
+from .backoff import (
+    BackoffStrategy,
+    ConstantBackoff,
+    DeadlineAwareBackoff,
+    DecorrelatedJitterBackoff,
+    ExponentialBackoff,
+    FullJitterBackoff
+)
+from .fair import FairRedlock
+from .health import CircuitOpenError, NodeHealth
+from .metrics import InMemoryMetrics, MetricsSink, Span
+from .multiplex import AioCommandMultiplexer
+from .optimistic import OptimisticRedlock
+from .redis_client import (
+    AioRedisClient,
+    AioRedisClientManager,
+    RedisClient,
+    RedisClientManager,
+    RedisClientSetupException
+)
 from .redlock import Redlock, Lock
+from .reentrant import ReentrantRedlock
+from .rwlock import RedlockRW
+from .semaphore import RedlockSemaphore
+from .sharded import ShardedRedlock
+from .striped import StripedRedlock
+from .tokens import TokenGenerator
+from .transport import AioRespConnection, RespConnection
+from .watchdog import AioLockWatchdog, LockWatchdog
 
 __version__ = "1.0.0"
 __all__ = [
+    "AioCommandMultiplexer",
+    "AioLockWatchdog",
     "AioRedisClient",
+    "AioRedisClientManager",
+    "AioRespConnection",
+    "BackoffStrategy",
+    "CircuitOpenError",
+    "ConstantBackoff",
+    "DeadlineAwareBackoff",
+    "DecorrelatedJitterBackoff",
+    "ExponentialBackoff",
+    "FairRedlock",
+    "FullJitterBackoff",
+    "InMemoryMetrics",
+    "NodeHealth",
+    "OptimisticRedlock",
     "RedisClient",
+    "RedisClientManager",
     "RedisClientSetupException",
     "Redlock",
-    "Lock"
+    "RedlockRW",
+    "RedlockSemaphore",
+    "ReentrantRedlock",
+    "RespConnection",
+    "ShardedRedlock",
+    "StripedRedlock",
+    "Lock",
+    "LockWatchdog",
+    "MetricsSink",
+    "Span",
+    "TokenGenerator"
 ]
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import abc
+import random
+
+from typing import Optional
+
+
+class BackoffStrategy(abc.ABC):
+    """
+    Base class of the strategies computing the delay before retrying to acquire a lock.
+
+    A strategy is called with the number of failed attempts so far (starting from 1), the previous delay in seconds
+    (0 before the first retry), and the remaining overall acquisition budget in seconds (None when unbounded).
+    It returns the delay in seconds, which never exceeds the remaining budget.
+    Any callable with the same signature can be used as a strategy.
+    """
+
+    @abc.abstractmethod
+    def delay(self, attempt: int, previous: float) -> float:
+        """
+        Compute the unbounded delay before the next attempt.
+
+        Args:
+            attempt (int): Number of failed attempts so far, starting from 1.
+            previous (float): The previous delay in seconds, 0 before the first retry.
+
+        Returns:
+            float: The delay in seconds.
+        """
+
+    def __call__(self, attempt: int, previous: float, remaining: Optional[float]) -> float:
+        delay = self.delay(attempt, previous)
+        if remaining is not None:
+            delay = min(delay, remaining)
+        return max(delay, 0.0)
+
+
+class ConstantBackoff(BackoffStrategy):
+    """Retry after a constant delay, which is what Redlock does by default."""
+
+    def __init__(self, delay: float = 0.2) -> None:
+        self._delay = delay
+
+    def delay(self, attempt: int, previous: float) -> float:
+        return self._delay
+
+
+class ExponentialBackoff(BackoffStrategy):
+    """Retry after a delay growing exponentially with the number of attempts, up to a cap."""
+
+    def __init__(self, base: float = 0.05, factor: float = 2.0, cap: float = 2.0) -> None:
+        self._base = base
+        self._factor = factor
+        self._cap = cap
+
+    def delay(self, attempt: int, previous: float) -> float:
+        return min(self._cap, self._base * self._factor ** (attempt - 1))
+
+
+class FullJitterBackoff(ExponentialBackoff):
+    """Retry after a delay drawn uniformly between 0 and the capped exponential delay."""
+
+    def delay(self, attempt: int, previous: float) -> float:
+        return random.uniform(0, super(FullJitterBackoff, self).delay(attempt, previous))
+
+
+class DecorrelatedJitterBackoff(BackoffStrategy):
+    """Retry after a delay drawn uniformly between the base delay and three times the previous delay, up to a cap."""
+
+    def __init__(self, base: float = 0.05, cap: float = 2.0) -> None:
+        self._base = base
+        self._cap = cap
+
+    def delay(self, attempt: int, previous: float) -> float:
+        return min(self._cap, random.uniform(self._base, max(self._base, previous * 3)))
+
+
+class DeadlineAwareBackoff(BackoffStrategy):
+    """
+    Wrap another strategy so that it never spends more than a fraction of the remaining budget in a single delay,
+    which keeps the retries dense, and the lock contended for, as the acquisition deadline approaches.
+    """
+
+    def __init__(self, inner: Optional[BackoffStrategy] = None, fraction: float = 0.5) -> None:
+        if not 0 < fraction <= 1:
+            raise ValueError("fraction {} is not in (0, 1]".format(fraction))
+        self._inner = inner or FullJitterBackoff()
+        self._fraction = fraction
+
+    def delay(self, attempt: int, previous: float) -> float:
+        return self._inner(attempt, previous, None)
+
+    def __call__(self, attempt: int, previous: float, remaining: Optional[float]) -> float:
+        delay = self._inner(attempt, previous, remaining)
+        if remaining is not None:
+            delay = min(delay, remaining * self._fraction)
+        return max(delay, 0.0)
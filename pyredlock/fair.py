@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+import redis
+import redis.asyncio as aio_redis
+import time
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .redlock import Lock, Redlock
+
+
+class FairRedlock(Redlock):
+    """A distributed lock granted to its waiters in their order of arrival."""
+
+    def __init__(self, *args: Any, waiter_timeout: float = 5.0, **kwargs: Any) -> None:
+        """
+        Initialize the FairRedlock, see Redlock for the other arguments.
+
+        Args:
+            waiter_timeout (float, optional): Seconds after which a waiter which stopped retrying is dropped
+                from the queue, see Notes. Defaults to 5.0.
+
+        Attributes:
+            _waiter_timeout (bytes): The waiter timeout in milliseconds, pre-encoded.
+            _fair_lock_script (str): Lua script to queue for a lock, and acquire it at the head of the queue.
+            _fair_unlock_script (str): Lua script to release a lock and wake up the head of the queue.
+            _fair_dequeue_script (str): Lua script to leave the queue.
+
+        Notes:
+            On each node a resource is made of three keys: the resource itself, holding the value of the lock
+            like a plain Redlock, "<resource>:queue", a sorted set of the waiters scored by their ticket,
+            i.e. the time at which they started waiting, and "<resource>:timeouts", a sorted set of the waiters
+            scored by the time (on the clock of the node) after which they are considered dead.
+            A node only grants the lock to the head of its queue, so the waiters take turns in the order of their
+            tickets, which is the same on every node; the waiters which did not retry within waiter_timeout,
+            e.g. because their process died, are dropped from the queues.
+
+            Releasing a lock publishes on the release channel of the head of the queue only,
+            i.e. the channel named by release_channel_prefix followed by "<resource>:<waiter>",
+            so that a blocking waiter is woken up when, and only when, its turn comes. Without release notifications
+            the head of the queue finds the lock free on its next retry, so set release_channel_prefix when waiting
+            for contended locks. waiter_timeout must exceed the longest delay between two attempts.
+
+            The tickets are read from the clocks of the clients, which therefore have to be roughly in sync for the
+            lock to be fair; the mutual exclusion does not depend on them. The scripts read the clock of the node
+            with TIME before writing, which requires Redis 5 or later.
+            lock_many/alock_many raise ValueError, and local coalescing and fencing tokens are not supported.
+        """
+        super(FairRedlock, self).__init__(*args, **kwargs)
+        if self._coalesce_local:
+            raise ValueError("coalesce_local is not supported by FairRedlock")
+        if self._fencing:
+            raise ValueError("fencing is not supported by FairRedlock")
+        self._waiter_timeout = self._encode_ttl(int(waiter_timeout * 1000))
+
+        self._fair_lock_script = """local now = redis.call("TIME")
+now = now[1] * 1000 + math.floor(now[2] / 1000)
+local dead = redis.call("ZRANGEBYSCORE",KEYS[3],"-inf",now)
+if #dead > 0 then
+    redis.call("ZREM",KEYS[2],unpack(dead))
+    redis.call("ZREM",KEYS[3],unpack(dead))
+end
+redis.call("ZADD",KEYS[2],"NX",ARGV[4],ARGV[3])
+if redis.call("EXISTS",KEYS[1]) == 0 and redis.call("ZRANGE",KEYS[2],0,0)[1] == ARGV[3] then
+    redis.call("SET",KEYS[1],ARGV[1],"PX",ARGV[2])
+    redis.call("ZREM",KEYS[2],ARGV[3])
+    redis.call("ZREM",KEYS[3],ARGV[3])
+    return 1
+end
+redis.call("ZADD",KEYS[3],now + ARGV[5],ARGV[3])
+for i = 2, 3 do
+    if redis.call("PTTL",KEYS[i]) < tonumber(ARGV[5]) then
+        redis.call("PEXPIRE",KEYS[i],ARGV[5])
+    end
+end
+return 0"""
+        self._fair_unlock_script = """if redis.call("GET",KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call("DEL",KEYS[1])
+if ARGV[2] then
+    local now = redis.call("TIME")
+    now = now[1] * 1000 + math.floor(now[2] / 1000)
+    local dead = redis.call("ZRANGEBYSCORE",KEYS[3],"-inf",now)
+    if #dead > 0 then
+        redis.call("ZREM",KEYS[2],unpack(dead))
+        redis.call("ZREM",KEYS[3],unpack(dead))
+    end
+    local first = redis.call("ZRANGE",KEYS[2],0,0)[1]
+    if first then
+        redis.call("PUBLISH",ARGV[2]..KEYS[1]..":"..first,KEYS[1])
+    end
+end
+return 1"""
+        self._fair_dequeue_script = """redis.call("ZREM",KEYS[3],ARGV[1])
+if redis.call("ZREM",KEYS[2],ARGV[1]) == 1 and ARGV[2] and redis.call("EXISTS",KEYS[1]) == 0 then
+    local first = redis.call("ZRANGE",KEYS[2],0,0)[1]
+    if first then
+        redis.call("PUBLISH",ARGV[2]..KEYS[1]..":"..first,KEYS[1])
+    end
+end
+return 1"""
+        self._scripts.register("fair_lock", self._fair_lock_script)
+        self._scripts.register("fair_unlock", self._fair_unlock_script)
+        self._scripts.register("fair_dequeue", self._fair_dequeue_script)
+
+    @staticmethod
+    def _fair_keys(resource: Union[str, bytes]) -> Tuple[Union[str, bytes], ...]:
+        """
+        Get the keys of a resource: the lock, the queue of the waiters and their timeouts.
+        """
+        if isinstance(resource, bytes):
+            return (resource, resource + b":queue", resource + b":timeouts")
+        return (resource, resource + ":queue", resource + ":timeouts")
+
+    @staticmethod
+    def _wake_key(resource: Union[str, bytes], waiter: Union[str, bytes]) -> bytes:
+        if isinstance(resource, str):
+            resource = resource.encode("utf-8")
+        if isinstance(waiter, str):
+            waiter = waiter.encode("utf-8")
+        return resource + b":" + waiter
+
+    @staticmethod
+    def _ticket() -> bytes:
+        # Microseconds since the epoch, exact in the double score of a sorted set.
+        return b"%d" % (time.time_ns() // 1000)
+
+    def _dequeue_args(self, waiter: Union[str, bytes], wake: bool) -> Tuple[Any, ...]:
+        if not wake or self._release_channel_prefix is None:
+            return (waiter,)
+        return (waiter, self._release_channel_prefix)
+
+    async def _aunlock_instance(
+            self,
+            server: aio_redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes]
+        ) -> bool:
+        return await self._scripts.aexecute(server, "fair_unlock", self._fair_keys(resource), self._unlock_args(val)) == 1
+
+    def _unlock_instance(
+            self,
+            server: redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes]
+        ) -> bool:
+        return self._scripts.execute(server, "fair_unlock", self._fair_keys(resource), self._unlock_args(val)) == 1
+
+    async def alock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a lock on a resource asynchronously, after the waiters which arrived before.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully and an optional Lock object.
+        """
+        keys = self._fair_keys(resource)
+        waiter = self._get_unique_id()
+        ticket = self._ticket()
+        granted: Dict[aio_redis.Redis, bool] = {}
+
+        async def acquire(server: aio_redis.Redis, val: Union[str, bytes], ttl_arg: bytes) -> bool:
+            granted[server] = False
+            granted[server] = bool(await self._scripts.aexecute(
+                server, "fair_lock", keys, (val, ttl_arg, waiter, ticket, self._waiter_timeout)
+            ))
+            return granted[server]
+
+        success, lock = await self._alock(
+            resource, ttl, blocking, timeout, acquire=acquire, wake=self._wake_key(resource, waiter)
+        )
+        # The nodes which granted the last attempt dropped the waiter already, the others still queue it.
+        if not all(granted.get(server) for server in self._servers):
+            args = self._dequeue_args(waiter, not success)
+            await self._acall_servers(lambda server: self._adequeue_instance(server, keys, args, granted))
+        return (success, lock)
+
+    def lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a lock on a resource, after the waiters which arrived before.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully and an optional Lock object.
+        """
+        keys = self._fair_keys(resource)
+        waiter = self._get_unique_id()
+        ticket = self._ticket()
+        granted: Dict[redis.Redis, bool] = {}
+
+        def acquire(server: redis.Redis, val: Union[str, bytes], ttl_arg: bytes) -> bool:
+            granted[server] = False
+            granted[server] = bool(self._scripts.execute(
+                server, "fair_lock", keys, (val, ttl_arg, waiter, ticket, self._waiter_timeout)
+            ))
+            return granted[server]
+
+        success, lock = self._lock(
+            resource, ttl, blocking, timeout, acquire=acquire, wake=self._wake_key(resource, waiter)
+        )
+        # The nodes which granted the last attempt dropped the waiter already, the others still queue it.
+        if not all(granted.get(server) for server in self._servers):
+            args = self._dequeue_args(waiter, not success)
+            self._call_servers(lambda server: self._dequeue_instance(server, keys, args, granted))
+        return (success, lock)
+
+    async def _adequeue_instance(
+            self,
+            server: aio_redis.Redis,
+            keys: Tuple[Union[str, bytes], ...],
+            args: Tuple[Any, ...],
+            granted: Dict[aio_redis.Redis, bool]
+        ) -> Any:
+        if granted.get(server):
+            return None
+        return await self._scripts.aexecute(server, "fair_dequeue", keys, args)
+
+    def _dequeue_instance(
+            self,
+            server: redis.Redis,
+            keys: Tuple[Union[str, bytes], ...],
+            args: Tuple[Any, ...],
+            granted: Dict[redis.Redis, bool]
+        ) -> Any:
+        if granted.get(server):
+            return None
+        return self._scripts.execute(server, "fair_dequeue", keys, args)
+
+    async def alock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Not supported by FairRedlock, as it would store plain lock values under the keys of the resources.
+
+        Raises:
+            ValueError: Always.
+        """
+        raise ValueError("lock_many is not supported by FairRedlock")
+
+    def lock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Not supported by FairRedlock, as it would store plain lock values under the keys of the resources.
+
+        Raises:
+            ValueError: Always.
+        """
+        raise ValueError("lock_many is not supported by FairRedlock")
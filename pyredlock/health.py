@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import redis.exceptions as redis_exceptions
+import threading
+import time
+
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(redis_exceptions.ConnectionError):
+    """Raised in place of a command not sent to a node whose circuit breaker is open."""
+    pass
+
+
+def is_node_failure(exc: BaseException) -> bool:
+    """
+    Tell whether an error means that the node is unreachable, rather than that it rejected the command.
+    """
+    return isinstance(exc, (redis_exceptions.ConnectionError, redis_exceptions.TimeoutError))
+
+
+class NodeHealth(object):
+    """The health of one Redis node: latency, error counts and a circuit breaker."""
+
+    def __init__(
+            self,
+            failure_threshold: Optional[int] = 5,
+            recovery_timeout: float = 1.0,
+            alpha: float = 0.2,
+            name: str = ""
+        ) -> None:
+        """
+        Initialize the NodeHealth.
+
+        Args:
+            failure_threshold (Optional[int], optional): Number of consecutive failures which opens the circuit.
+                Defaults to 5. None never opens it.
+            recovery_timeout (float, optional): Seconds to wait after the circuit opened, or after a failed probe,
+                before probing the node again. Defaults to 1.0.
+            alpha (float, optional): Smoothing factor of the latency moving average. Defaults to 0.2.
+            name (str, optional): The "host:port" of the node. Defaults to "".
+
+        Attributes:
+            name (str): The "host:port" of the node.
+            state (str): CLOSED while the node is in use, OPEN while it is skipped,
+                HALF_OPEN while it is skipped and a probe is in flight.
+            latency (Optional[float]): Exponentially weighted moving average of the command latency, in seconds.
+            successes (int): Number of commands answered by the node.
+            failures (int): Number of commands which failed to reach the node.
+            consecutive_failures (int): Number of failures since the last success.
+
+        Notes:
+            A command which fails with a connection error or a timeout is a failure; any reply, including
+            an error reply, is a success since the node is reachable.
+            Once the circuit is open the commands for the node fail immediately with CircuitOpenError,
+            i.e. the node counts as a failed vote without costing a socket timeout,
+            until a background probe gets an answer from the node and closes the circuit.
+        """
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha {} is not in (0, 1]".format(alpha))
+        self._failure_threshold = failure_threshold
+        self._recovery_timeout = recovery_timeout
+        self._alpha = alpha
+        self._lock = threading.Lock()
+        self.name = name
+        self.state = CLOSED
+        self.latency: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+
+    def allow(self) -> bool:
+        """
+        Tell whether a command may be sent to the node.
+        """
+        return self.state == CLOSED
+
+    def should_probe(self) -> bool:
+        """
+        Tell whether the node is due for a probe, in which case the circuit becomes half-open
+        until the outcome of the probe is recorded.
+        """
+        with self._lock:
+            if self.state != OPEN or time.monotonic() - self._opened_at < self._recovery_timeout:
+                return False
+            self.state = HALF_OPEN
+            return True
+
+    def record_success(self, latency: float) -> None:
+        """
+        Record a command answered by the node.
+
+        Args:
+            latency (float): Duration of the command in seconds.
+        """
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.latency = latency if self.latency is None else self.latency + self._alpha * (latency - self.latency)
+            self.state = CLOSED
+
+    def record_failure(self, latency: float) -> None:
+        """
+        Record a command which failed to reach the node.
+
+        Args:
+            latency (float): Duration of the command in seconds.
+        """
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.latency = latency if self.latency is None else self.latency + self._alpha * (latency - self.latency)
+            if self.state == HALF_OPEN or (
+                    self._failure_threshold is not None and self.consecutive_failures >= self._failure_threshold):
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def record(self, exc: Optional[BaseException], latency: float) -> None:
+        """
+        Record the outcome of a command, see is_node_failure.
+        """
+        if exc is not None and is_node_failure(exc):
+            self.record_failure(latency)
+        else:
+            self.record_success(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the health of the node.
+
+        Returns:
+            Dict[str, Any]: The name, state, latency, successes, failures and consecutive_failures of the node.
+        """
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "latency": self.latency,
+                "successes": self.successes,
+                "failures": self.failures,
+                "consecutive_failures": self.consecutive_failures
+            }
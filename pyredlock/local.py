@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+
+from typing import Any, Optional
+
+
+class LocalGate(object):
+    """
+    The in-process queue in front of a resource, see Redlock(coalesce_local=True).
+
+    Attributes:
+        lock (threading.Lock): Held by the local contender which acquires, or holds, the distributed lock.
+        waiters (int): Number of local contenders waiting for the gate.
+        holder (Optional[Lock]): The distributed lock held through the gate.
+        handoff (Optional[Lock]): The distributed lock left held by its previous holder for the next local contender.
+    """
+
+    __slots__ = ("lock", "waiters", "holder", "handoff")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.waiters = 0
+        self.holder: Optional[Any] = None
+        self.handoff: Optional[Any] = None
+
+    def idle(self) -> bool:
+        return self.waiters == 0 and self.handoff is None and not self.lock.locked()
+
+
+class AioLocalGate(object):
+    """
+    The in-process queue in front of a resource, for asyncio, see Redlock(coalesce_local=True).
+
+    Attributes:
+        lock (asyncio.Lock): Held by the local contender which acquires, or holds, the distributed lock.
+            The waiters are served in FIFO order.
+        waiters (int): Number of local contenders waiting for the gate.
+        holder (Optional[Lock]): The distributed lock held through the gate.
+        handoff (Optional[Lock]): The distributed lock left held by its previous holder for the next local contender.
+    """
+
+    __slots__ = ("lock", "waiters", "holder", "handoff")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.waiters = 0
+        self.holder: Optional[Any] = None
+        self.handoff: Optional[Any] = None
+
+    def idle(self) -> bool:
+        return self.waiters == 0 and self.handoff is None and not self.lock.locked()
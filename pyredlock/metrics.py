@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+import bisect
+import collections
+import threading
+import time
+
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Union
+
+# Upper bounds of the latency buckets in seconds, from 100us to 10s.
+DEFAULT_LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Upper bounds of the validity buckets in milliseconds.
+DEFAULT_VALIDITY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Span(object):
+    """
+    A timed operation, shaped after the OpenTelemetry span so that sinks can map it onto a tracer.
+
+    Attributes:
+        name (str): Name of the operation, e.g. "redlock.acquire".
+        attributes (Dict[str, Any]): Attributes of the operation.
+        start (float): time.monotonic() at which the operation started.
+    """
+
+    __slots__ = ("name", "attributes", "start")
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.attributes = attributes if attributes is not None else {}
+        self.start = time.monotonic()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """
+        End the operation.
+
+        Args:
+            error (Optional[BaseException], optional): The exception which aborted the operation. Defaults to None.
+        """
+        pass
+
+
+class MetricsSink(object):
+    """
+    Base class of the metrics sinks of Redlock, whose hooks do nothing.
+
+    Subclasses override the hooks they are interested in. The hooks are called synchronously, from the event loop
+    or from the fan-out threads, so they must be cheap and thread-safe. A Redlock without a sink does not call them
+    at all, so the instrumentation costs nothing when it is disabled.
+    """
+
+    def start_span(self, name: str, attributes: Dict[str, Any]) -> Span:
+        """
+        Start a span around a lock operation: "redlock.acquire", "redlock.release" or "redlock.extend".
+
+        Args:
+            name (str): Name of the operation.
+            attributes (Dict[str, Any]): Attributes of the operation, e.g. the resource and the ttl.
+
+        Returns:
+            Span: The span, ended when the operation completes.
+        """
+        return Span(name, attributes)
+
+    def on_acquire(self, resource: Union[str, bytes], acquired: bool, duration: float, attempts: int) -> None:
+        """
+        Called when an acquisition completes.
+
+        Args:
+            resource (Union[str, bytes]): The resource.
+            acquired (bool): Whether the lock was acquired.
+            duration (float): Duration of the acquisition in seconds, retries included.
+            attempts (int): Number of attempts made, i.e. 1 plus the number of retries used.
+        """
+        pass
+
+    def on_quorum(self, operation: str, resource: Union[str, bytes], margin: int) -> None:
+        """
+        Called after each attempt to acquire or extend a lock.
+
+        Args:
+            operation (str): "acquire" or "extend".
+            resource (Union[str, bytes]): The resource.
+            margin (int): Number of nodes which granted the lock minus the quorum,
+                non-negative when the quorum was reached.
+        """
+        pass
+
+    def on_validity(self, resource: Union[str, bytes], ttl: int, validity: int) -> None:
+        """
+        Called when a lock is acquired.
+
+        Args:
+            resource (Union[str, bytes]): The resource.
+            ttl (int): The requested time-to-live in milliseconds.
+            validity (int): The validity time left after the round-trips and the clock drift, in milliseconds.
+        """
+        pass
+
+    def on_node_rtt(self, node: str, duration: float, error: Optional[BaseException]) -> None:
+        """
+        Called after each command sent to a node.
+
+        Args:
+            node (str): The "host:port" of the node.
+            duration (float): Round-trip time in seconds.
+            error (Optional[BaseException]): The error raised by the command, if any.
+        """
+        pass
+
+    def on_release(self, resource: Union[str, bytes], released: bool, duration: float) -> None:
+        """
+        Called when a release completes.
+
+        Args:
+            resource (Union[str, bytes]): The resource.
+            released (bool): Whether the lock was released on all the nodes.
+            duration (float): Duration of the release in seconds.
+        """
+        pass
+
+    def on_extend(self, resource: Union[str, bytes], extended: bool, duration: float) -> None:
+        """
+        Called when an extension completes.
+
+        Args:
+            resource (Union[str, bytes]): The resource.
+            extended (bool): Whether the lock was extended on a quorum of the nodes.
+            duration (float): Duration of the extension in seconds.
+        """
+        pass
+
+
+class Histogram(object):
+    """A histogram of samples in fixed buckets."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        """
+        Initialize the Histogram.
+
+        Args:
+            buckets (Sequence[float]): The increasing upper bounds of the buckets. Larger samples fall in an overflow bucket.
+        """
+        self._bounds = list(buckets)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = None
+
+    def record(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estimate a percentile of the samples.
+
+        Args:
+            q (float): The percentile, between 0 and 100.
+
+        Returns:
+            Optional[float]: The upper bound of the bucket holding the percentile (the largest sample for the overflow bucket),
+            or None without samples.
+        """
+        if self.count == 0:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self._bounds, self._counts):
+            seen += count
+            if seen >= rank and seen > 0:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "buckets": dict(zip([*self._bounds, float("inf")], self._counts))
+        }
+
+
+def _default_prefix(resource: Union[str, bytes]) -> str:
+    # "orders:42" -> "orders"
+    if isinstance(resource, bytes):
+        resource = resource.decode("utf-8", "replace")
+    return resource.split(":", 1)[0]
+
+
+class InMemoryMetrics(MetricsSink):
+    """A metrics sink which aggregates everything in memory, e.g. to be scraped by an exporter or inspected in tests."""
+
+    def __init__(
+            self,
+            prefix: Optional[Callable[[Union[str, bytes]], str]] = None,
+            max_spans: int = 1000,
+            latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+            validity_buckets: Sequence[float] = DEFAULT_VALIDITY_BUCKETS
+        ) -> None:
+        """
+        Initialize the InMemoryMetrics.
+
+        Args:
+            prefix (Optional[Callable[[Union[str, bytes]], str]], optional): Maps a resource to the prefix
+                the contention is reported by. Defaults to None (the part of the resource before the first ":").
+            max_spans (int, optional): Number of finished spans kept. Defaults to 1000.
+            latency_buckets (Sequence[float], optional): Upper bounds of the latency buckets in seconds.
+            validity_buckets (Sequence[float], optional): Upper bounds of the validity lost buckets in milliseconds.
+
+        Attributes:
+            acquire_latency (Histogram): Duration of the acquisitions, retries included.
+            release_latency (Histogram): Duration of the releases.
+            extend_latency (Histogram): Duration of the extensions.
+            node_rtt (Dict[str, Histogram]): Round-trip time of the commands, by node.
+            node_errors (Counter): Number of failed commands, by node.
+            validity_lost (Histogram): Milliseconds of the ttl lost to the round-trips and the clock drift.
+            quorum_margin (Counter): Number of attempts by (operation, margin).
+            attempts (Counter): Number of acquisitions by number of attempts.
+            outcomes (Counter): Number of operations by (operation, success).
+            contention (Dict[str, List[int]]): The [acquisitions, contended acquisitions] by resource prefix;
+                an acquisition is contended when its first attempt failed.
+            spans (Deque[Span]): The last finished spans.
+        """
+        self._prefix = prefix or _default_prefix
+        self._lock = threading.Lock()
+        self._latency_buckets = latency_buckets
+        self.acquire_latency = Histogram(latency_buckets)
+        self.release_latency = Histogram(latency_buckets)
+        self.extend_latency = Histogram(latency_buckets)
+        self.node_rtt: Dict[str, Histogram] = {}
+        self.node_errors = collections.Counter()
+        self.validity_lost = Histogram(validity_buckets)
+        self.quorum_margin = collections.Counter()
+        self.attempts = collections.Counter()
+        self.outcomes = collections.Counter()
+        self.contention: Dict[str, List[int]] = {}
+        self.spans: Deque[Span] = collections.deque(maxlen=max_spans)
+
+    def start_span(self, name: str, attributes: Dict[str, Any]) -> Span:
+        return _RecordedSpan(name, attributes, self)
+
+    def on_acquire(self, resource: Union[str, bytes], acquired: bool, duration: float, attempts: int) -> None:
+        prefix = self._prefix(resource)
+        with self._lock:
+            self.acquire_latency.record(duration)
+            self.attempts[attempts] += 1
+            self.outcomes[("acquire", acquired)] += 1
+            stats = self.contention.setdefault(prefix, [0, 0])
+            stats[0] += 1
+            if attempts > 1 or not acquired:
+                stats[1] += 1
+
+    def on_quorum(self, operation: str, resource: Union[str, bytes], margin: int) -> None:
+        with self._lock:
+            self.quorum_margin[(operation, margin)] += 1
+
+    def on_validity(self, resource: Union[str, bytes], ttl: int, validity: int) -> None:
+        with self._lock:
+            self.validity_lost.record(ttl - validity)
+
+    def on_node_rtt(self, node: str, duration: float, error: Optional[BaseException]) -> None:
+        with self._lock:
+            histogram = self.node_rtt.get(node)
+            if histogram is None:
+                histogram = self.node_rtt[node] = Histogram(self._latency_buckets)
+            histogram.record(duration)
+            if error is not None:
+                self.node_errors[node] += 1
+
+    def on_release(self, resource: Union[str, bytes], released: bool, duration: float) -> None:
+        with self._lock:
+            self.release_latency.record(duration)
+            self.outcomes[("release", released)] += 1
+
+    def on_extend(self, resource: Union[str, bytes], extended: bool, duration: float) -> None:
+        with self._lock:
+            self.extend_latency.record(duration)
+            self.outcomes[("extend", extended)] += 1
+
+    def contention_rate(self) -> Dict[str, float]:
+        """
+        Get the share of contended acquisitions.
+
+        Returns:
+            Dict[str, float]: The fraction of the acquisitions whose first attempt failed, by resource prefix.
+        """
+        with self._lock:
+            return {prefix: contended / total for prefix, (total, contended) in self.contention.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get all the metrics as plain data.
+
+        Returns:
+            Dict[str, Any]: The histograms and counters, e.g. to be serialized to JSON.
+        """
+        with self._lock:
+            return {
+                "acquire_latency": self.acquire_latency.snapshot(),
+                "release_latency": self.release_latency.snapshot(),
+                "extend_latency": self.extend_latency.snapshot(),
+                "node_rtt": {node: histogram.snapshot() for node, histogram in self.node_rtt.items()},
+                "node_errors": dict(self.node_errors),
+                "validity_lost": self.validity_lost.snapshot(),
+                "quorum_margin": {f"{operation}:{margin}": n for (operation, margin), n in self.quorum_margin.items()},
+                "attempts": dict(self.attempts),
+                "outcomes": {f"{operation}:{ok}": n for (operation, ok), n in self.outcomes.items()},
+                "contention": {prefix: contended / total for prefix, (total, contended) in self.contention.items()}
+            }
+
+
+class _RecordedSpan(Span):
+
+    __slots__ = ("_sink", "duration", "error")
+
+    def __init__(self, name: str, attributes: Dict[str, Any], sink: InMemoryMetrics) -> None:
+        super(_RecordedSpan, self).__init__(name, attributes)
+        self._sink = sink
+        self.duration: Optional[float] = None
+        self.error: Optional[BaseException] = None
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        self.duration = time.monotonic() - self.start
+        self.error = error
+        self._sink.spans.append(self)
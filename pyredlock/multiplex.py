@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import redis.asyncio as aio_redis
+import redis.exceptions as redis_exceptions
+
+from typing import Any, List, Optional, Sequence, Set, Tuple
+
+from .scripts import ScriptRegistry
+
+
+class AioCommandMultiplexer(object):
+    """Coalesces the commands issued to one Redis node by concurrent coroutines into pipelines."""
+
+    def __init__(
+            self,
+            server: aio_redis.Redis,
+            scripts: ScriptRegistry,
+            window: float = 0.0,
+            max_batch: int = 512
+        ) -> None:
+        """
+        Initialize the AioCommandMultiplexer.
+
+        Args:
+            server (aio_redis.Redis): The Redis connection.
+            scripts (ScriptRegistry): Registry of the scripts which may be submitted.
+            window (float, optional): Seconds to wait for more commands after the first command of a batch.
+                Defaults to 0.0 (the commands submitted in the same event loop iteration).
+            max_batch (int, optional): Maximum number of commands per pipeline. Defaults to 512.
+
+        Attributes:
+            batches (int): Number of pipelines sent.
+            commands (int): Number of commands sent.
+            _pending (List[Tuple[Optional[str], Sequence[Any], Sequence[Any], asyncio.Future]]): The commands
+                waiting for the next flush, as (script name or None, keys or command, args, future).
+            _flushing (Set[asyncio.Task]): The pipelines in flight.
+            _timer (Optional[asyncio.Handle]): The scheduled flush of the pending commands.
+
+        Notes:
+            The first command submitted schedules a flush at the end of the current event loop iteration
+            (or after the window), and every command submitted until then joins the same pipeline, which takes
+            a single connection from the pool and a single round-trip. A batch which reaches max_batch is flushed
+            at once and its scheduled flush cancelled, so that the next batch waits its own window. The replies are
+            routed back to the futures of the commands; an error reply fails its own command only, and a connection
+            error fails the whole batch. Commands cancelled while pending are still sent, and their replies dropped.
+        """
+        self._server = server
+        self._scripts = scripts
+        self._window = window
+        self._max_batch = max_batch
+        self._pending: List[Tuple[Optional[str], Sequence[Any], Sequence[Any], asyncio.Future]] = []
+        self._flushing: Set[asyncio.Task] = set()
+        self._timer: Optional[asyncio.Handle] = None
+        self.batches = 0
+        self.commands = 0
+
+    def _submit(self, name: Optional[str], keys: Sequence[Any], args: Sequence[Any]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((name, keys, args, future))
+        if len(self._pending) == 1:
+            if self._window > 0:
+                self._timer = loop.call_later(self._window, self._flush)
+            else:
+                self._timer = loop.call_soon(self._flush)
+        elif len(self._pending) >= self._max_batch:
+            self._flush()
+        return future
+
+    def execute_command(self, *args: Any) -> asyncio.Future:
+        """
+        Submit a command.
+
+        Returns:
+            asyncio.Future: The future of the reply.
+        """
+        return self._submit(None, args, ())
+
+    def execute_script(self, name: str, keys: Sequence[Any], args: Sequence[Any]) -> asyncio.Future:
+        """
+        Submit a call of a registered script.
+
+        Args:
+            name (str): Name of the script.
+            keys (Sequence[Any]): The KEYS of the script.
+            args (Sequence[Any]): The ARGV of the script.
+
+        Returns:
+            asyncio.Future: The future of the reply.
+        """
+        return self._submit(name, keys, args)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if len(self._pending) == 0:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._send(batch))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _send(self, batch: List[Tuple[Optional[str], Sequence[Any], Sequence[Any], asyncio.Future]]) -> None:
+        try:
+            replies = await self._execute(batch)
+        except asyncio.CancelledError:
+            for _, _, _, future in batch:
+                future.cancel()
+            raise
+        except Exception as exc:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, _, _, future), reply in zip(batch, replies):
+            if future.done():
+                continue
+            if isinstance(reply, Exception):
+                future.set_exception(reply)
+            else:
+                future.set_result(reply)
+
+    async def _execute(self, batch: List[Tuple[Optional[str], Sequence[Any], Sequence[Any], asyncio.Future]]) -> List[Any]:
+        for name in {name for name, _, _, _ in batch if name is not None}:
+            if not self._scripts.is_loaded(self._server, name):
+                await self._server.execute_command("SCRIPT", "LOAD", self._scripts.get(name).source)
+                self._scripts.loads += 1
+                self._scripts.mark_loaded(self._server, name)
+        self.batches += 1
+        self.commands += len(batch)
+        async with self._server.pipeline(transaction=False) as pipe:
+            for name, keys, args, _ in batch:
+                if name is None:
+                    pipe.execute_command(*keys)
+                else:
+                    pipe.execute_command("EVALSHA", self._scripts.get(name).sha, len(keys), *keys, *args)
+            replies = await pipe.execute(raise_on_error=False)
+        missed = [i for i, reply in enumerate(replies) if isinstance(reply, redis_exceptions.NoScriptError)]
+        self._scripts.hits += sum(1 for name, _, _, _ in batch if name is not None) - len(missed)
+        if len(missed) > 0:
+            # The server lost its script cache, see ScriptRegistry.
+            self._scripts.misses += len(missed)
+            async with self._server.pipeline(transaction=False) as pipe:
+                for i in missed:
+                    name, keys, args, _ = batch[i]
+                    pipe.execute_command("EVAL", self._scripts.get(name).source, len(keys), *keys, *args)
+                for i, reply in zip(missed, await pipe.execute(raise_on_error=False)):
+                    replies[i] = reply
+        return replies
+
+    async def aclose(self) -> None:
+        """
+        Send the pending commands, and wait for the pipelines in flight.
+        """
+        self._flush()
+        if len(self._flushing) > 0:
+            await asyncio.gather(*list(self._flushing), return_exceptions=True)
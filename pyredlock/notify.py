@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import redis
+import redis.asyncio as aio_redis
+import redis.exceptions as redis_exceptions
+import threading
+import time
+
+from loguru import logger as loguru_logger
+from typing import Dict, Optional, Set
+
+
+class ReleaseListener(object):
+    """A shared subscription to the lock release notifications published by one Redis node."""
+
+    def __init__(self, server: redis.Redis) -> None:
+        """
+        Initialize the ReleaseListener.
+
+        Args:
+            server (redis.Redis): The Redis connection to subscribe on.
+
+        Attributes:
+            _pubsub (redis.client.PubSub): The subscription connection, shared by all the waiters.
+            _waiters (Dict[bytes, Set[threading.Event]]): The events of the waiters, by channel.
+            _thread (Optional[threading.Thread]): The thread reading the notifications, started on first use.
+
+        Notes:
+            A channel is subscribed to when its first waiter arrives and unsubscribed from when its last waiter leaves.
+            Every notification published on a channel sets the events of all its waiters.
+        """
+        self._pubsub = server.pubsub(ignore_subscribe_messages=True)
+        self._waiters: Dict[bytes, Set[threading.Event]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def add_waiter(self, channel: bytes, event: threading.Event) -> None:
+        """
+        Set an event whenever a release is published on a channel.
+
+        Args:
+            channel (bytes): The release channel of a resource.
+            event (threading.Event): The event of the waiter.
+        """
+        with self._lock:
+            waiters = self._waiters.get(channel)
+            if waiters is None:
+                self._pubsub.subscribe(channel)
+                waiters = self._waiters[channel] = set()
+            waiters.add(event)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="redlock-release-listener", daemon=True)
+                self._thread.start()
+
+    def remove_waiter(self, channel: bytes, event: threading.Event) -> None:
+        """
+        Stop setting an event on the releases published on a channel.
+
+        Args:
+            channel (bytes): The release channel of a resource.
+            event (threading.Event): The event of the waiter.
+        """
+        with self._lock:
+            waiters = self._waiters.get(channel)
+            if waiters is None:
+                return
+            waiters.discard(event)
+            if len(waiters) == 0:
+                del self._waiters[channel]
+                try:
+                    self._pubsub.unsubscribe(channel)
+                except redis_exceptions.RedisError as exc:
+                    loguru_logger.error(f"Redis unsubscribe error:{exc}.")
+
+    def _run(self) -> None:
+        while not self._closed:
+            try:
+                message = self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except redis_exceptions.RedisError as exc:
+                # The waiters keep polling meanwhile, redis-py resubscribes when reconnecting.
+                loguru_logger.error(f"Redis pubsub error:{exc}.")
+                time.sleep(1.0)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            with self._lock:
+                waiters = list(self._waiters.get(message["channel"], ()))
+            for event in waiters:
+                event.set()
+
+    def close(self) -> None:
+        """
+        Close the subscription connection.
+        """
+        self._closed = True
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._pubsub.close()
+
+
+class AioReleaseListener(object):
+    """A shared subscription to the lock release notifications published by one Redis node, for asyncio."""
+
+    def __init__(self, server: aio_redis.Redis) -> None:
+        """
+        Initialize the AioReleaseListener.
+
+        Args:
+            server (aio_redis.Redis): The Redis connection to subscribe on.
+
+        Attributes:
+            _pubsub (redis.asyncio.client.PubSub): The subscription connection, shared by all the waiters.
+            _waiters (Dict[bytes, Set[asyncio.Event]]): The events of the waiters, by channel.
+            _task (Optional[asyncio.Task]): The task reading the notifications, started on first use.
+        """
+        self._pubsub = server.pubsub(ignore_subscribe_messages=True)
+        self._waiters: Dict[bytes, Set[asyncio.Event]] = {}
+        self._subscribed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def add_waiter(self, channel: bytes, event: asyncio.Event) -> None:
+        """
+        Set an event whenever a release is published on a channel.
+
+        Args:
+            channel (bytes): The release channel of a resource.
+            event (asyncio.Event): The event of the waiter.
+        """
+        waiters = self._waiters.get(channel)
+        if waiters is None:
+            waiters = self._waiters[channel] = set()
+            try:
+                await self._pubsub.subscribe(channel)
+            except BaseException:
+                del self._waiters[channel]
+                raise
+        waiters.add(event)
+        self._subscribed.set()
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def remove_waiter(self, channel: bytes, event: asyncio.Event) -> None:
+        """
+        Stop setting an event on the releases published on a channel.
+
+        Args:
+            channel (bytes): The release channel of a resource.
+            event (asyncio.Event): The event of the waiter.
+        """
+        waiters = self._waiters.get(channel)
+        if waiters is None:
+            return
+        waiters.discard(event)
+        if len(waiters) == 0:
+            del self._waiters[channel]
+            if len(self._waiters) == 0:
+                self._subscribed.clear()
+            try:
+                await self._pubsub.unsubscribe(channel)
+            except redis_exceptions.RedisError as exc:
+                loguru_logger.error(f"Redis unsubscribe error:{exc}.")
+
+    async def _run(self) -> None:
+        while not self._closed:
+            # Reading an idle subscription connection may not suspend the task at all.
+            await self._subscribed.wait()
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except redis_exceptions.RedisError as exc:
+                # The waiters keep polling meanwhile, redis-py resubscribes when reconnecting.
+                loguru_logger.error(f"Redis pubsub error:{exc}.")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            for event in self._waiters.get(message["channel"], ()):
+                event.set()
+
+    async def close(self) -> None:
+        """
+        Close the subscription connection.
+        """
+        self._closed = True
+        if self._task is not None:
+            # The flag stops the task even if the cancellation is swallowed by a pending read.
+            self._subscribed.set()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._pubsub.aclose()
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import collections
+import inspect
+import threading
+import time
+
+from loguru import logger as loguru_logger
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, Union
+
+from .redlock import MultipleRedlockException, Redlock
+
+
+class OptimisticRedlock(Redlock):
+    """Version-checked updates of a resource: the work runs unlocked, and is committed only if nobody else committed."""
+
+    def __init__(self, *args: Any, version_cache_size: int = 10000, **kwargs: Any) -> None:
+        """
+        Initialize the OptimisticRedlock, see Redlock for the other arguments.
+
+        Args:
+            version_cache_size (int, optional): Number of resources whose last known version is kept,
+                see Notes. Defaults to 10000.
+
+        Attributes:
+            _versions (collections.OrderedDict): The last known version of the most recently used resources.
+            _version_cache_size (int): Number of resources whose last known version is kept.
+            _optimistic_commit_script (str): Lua script to compare-and-increment the version of a resource.
+
+        Notes:
+            On each node a resource has a version, "<resource>:version", which never expires. run/arun read
+            the version of the resource, call the work with it, and commit: each node increments the version if it
+            is not ahead of the one read, and the commit succeeds when a quorum of the nodes did. Since any two
+            quorums share a node, a commit based on a version which another commit already moved past fails,
+            and the work is retried with the versions returned by the nodes, after the backoff delay.
+
+            The version of a resource last read or committed through this instance is cached, so that an update
+            of an uncontended resource takes one round-trip to the nodes, instead of two for lock and unlock.
+            A stale cached version merely costs a retry.
+
+            The work runs without mutual exclusion, so it must not make its effects visible before the commit
+            succeeded, e.g. it computes a result which the caller applies after the commit, keyed on the committed
+            version like a fencing token. lock/alock neither check nor increment the versions, so a resource
+            is updated either optimistically or under a lock, not both.
+        """
+        super(OptimisticRedlock, self).__init__(*args, **kwargs)
+        self._versions: "collections.OrderedDict[Union[str, bytes], int]" = collections.OrderedDict()
+        self._versions_lock = threading.Lock()
+        self._version_cache_size = version_cache_size
+
+        self._optimistic_commit_script = """local v = tonumber(redis.call("GET",KEYS[1]) or "0")
+if v > tonumber(ARGV[1]) then
+    return {0, v}
+end
+redis.call("SET",KEYS[1],ARGV[1] + 1)
+return {1, ARGV[1] + 1}"""
+        self._scripts.register("optimistic_commit", self._optimistic_commit_script)
+
+    @staticmethod
+    def _version_key(resource: Union[str, bytes]) -> Union[str, bytes]:
+        if isinstance(resource, bytes):
+            return resource + b":version"
+        return resource + ":version"
+
+    def _cached_version(self, resource: Union[str, bytes]) -> Optional[int]:
+        with self._versions_lock:
+            version = self._versions.get(resource)
+            if version is not None:
+                self._versions.move_to_end(resource)
+            return version
+
+    def _cache_version(self, resource: Union[str, bytes], version: int) -> None:
+        with self._versions_lock:
+            self._versions[resource] = version
+            self._versions.move_to_end(resource)
+            while len(self._versions) > self._version_cache_size:
+                self._versions.popitem(last=False)
+
+    def _settle_read(self, resource: Union[str, bytes], results: List[Any], redis_errors: List[Exception]) -> Optional[int]:
+        """
+        Get the version of a resource from the replies of the nodes, the highest one of a quorum.
+        """
+        if len(results) < self._quorum:
+            loguru_logger.error(f"Redlock Version Error:{MultipleRedlockException(redis_errors)}")
+            return None
+        version = max(int(reply or 0) for reply in results)
+        self._cache_version(resource, version)
+        return version
+
+    def _settle_commit(
+            self,
+            resource: Union[str, bytes],
+            version: int,
+            results: List[Any],
+            redis_errors: List[Exception]
+        ) -> Tuple[bool, Optional[int]]:
+        """
+        Tell whether a commit succeeded on a quorum of the nodes, and get the version to retry with otherwise.
+        """
+        if sum(1 for ok, _ in results if ok) >= self._quorum:
+            self._cache_version(resource, version + 1)
+            return (True, version + 1)
+        if len(redis_errors) > 0:
+            loguru_logger.error(f"Redlock Commit Error:{MultipleRedlockException(redis_errors)}")
+        if len(results) < self._quorum:
+            with self._versions_lock:
+                self._versions.pop(resource, None)
+            return (False, None)
+        # A node which refused the commit is ahead of the version.
+        version = max(int(current) for _, current in results)
+        self._cache_version(resource, version)
+        return (False, version)
+
+    async def aread_version(self, resource: Union[str, bytes]) -> Optional[int]:
+        """
+        Read the version of a resource from the nodes asynchronously.
+
+        Args:
+            resource (Union[str, bytes]): Resource to read the version of.
+
+        Returns:
+            Optional[int]: The version of the resource, None if a quorum of the nodes could not be read.
+        """
+        key = self._version_key(resource)
+        results, redis_errors, _ = await self._acall_servers(lambda server: server.get(key))
+        return self._settle_read(resource, results, redis_errors)
+
+    def read_version(self, resource: Union[str, bytes]) -> Optional[int]:
+        """
+        Read the version of a resource from the nodes.
+
+        Args:
+            resource (Union[str, bytes]): Resource to read the version of.
+
+        Returns:
+            Optional[int]: The version of the resource, None if a quorum of the nodes could not be read.
+        """
+        key = self._version_key(resource)
+        results, redis_errors, _ = self._call_servers(lambda server: server.get(key))
+        return self._settle_read(resource, results, redis_errors)
+
+    async def acommit(self, resource: Union[str, bytes], version: int) -> Tuple[bool, Optional[int]]:
+        """
+        Commit an update of a resource based on a version asynchronously.
+
+        Args:
+            resource (Union[str, bytes]): Resource to commit an update of.
+            version (int): The version the update is based on.
+
+        Returns:
+            Tuple[bool, Optional[int]]: A tuple containing a boolean indicating whether the update is committed,
+            and the new version of the resource if it is, the version to retry with otherwise
+            (None if a quorum of the nodes could not be reached).
+        """
+        keys = (self._version_key(resource),)
+        results, redis_errors, _ = await self._acall_servers(
+            lambda server: self._scripts.aexecute(server, "optimistic_commit", keys, (version,))
+        )
+        return self._settle_commit(resource, version, results, redis_errors)
+
+    def commit(self, resource: Union[str, bytes], version: int) -> Tuple[bool, Optional[int]]:
+        """
+        Commit an update of a resource based on a version.
+
+        Args:
+            resource (Union[str, bytes]): Resource to commit an update of.
+            version (int): The version the update is based on.
+
+        Returns:
+            Tuple[bool, Optional[int]]: A tuple containing a boolean indicating whether the update is committed,
+            and the new version of the resource if it is, the version to retry with otherwise
+            (None if a quorum of the nodes could not be reached).
+        """
+        keys = (self._version_key(resource),)
+        results, redis_errors, _ = self._call_servers(
+            lambda server: self._scripts.execute(server, "optimistic_commit", keys, (version,))
+        )
+        return self._settle_commit(resource, version, results, redis_errors)
+
+    async def arun(
+            self,
+            resource: Union[str, bytes],
+            work: Callable[[int], Union[Any, Awaitable[Any]]],
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Any, Optional[int]]:
+        """
+        Run some work on a resource and commit it asynchronously, retrying the work on conflicts.
+
+        Args:
+            resource (Union[str, bytes]): Resource to update.
+            work (Callable[[int], Union[Any, Awaitable[Any]]]): Called with the version the update is based on,
+                returns the result of the work, or an awaitable of it.
+            timeout (Optional[float], optional): Maximum time in seconds to spend retrying. Defaults to None.
+
+        Returns:
+            Tuple[bool, Any, Optional[int]]: A tuple containing a boolean indicating whether the work is committed
+            within retry_count attempts, the result of its last run, and the committed version.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        version = self._cached_version(resource)
+        result = None
+        delay = 0.0
+        for attempt in range(1, int(self.retry_count) + 1):
+            if version is None:
+                version = await self.aread_version(resource)
+            if version is not None:
+                result = work(version)
+                if inspect.isawaitable(result):
+                    result = await result
+                committed, version = await self.acommit(resource, version)
+                if committed:
+                    return (True, result, version)
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if attempt >= self.retry_count or (remaining is not None and remaining <= 0):
+                break
+            delay = self._next_delay(attempt, delay, remaining)
+            await asyncio.sleep(delay)
+        return (False, result, None)
+
+    def run(
+            self,
+            resource: Union[str, bytes],
+            work: Callable[[int], Any],
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Any, Optional[int]]:
+        """
+        Run some work on a resource and commit it, retrying the work on conflicts.
+
+        Args:
+            resource (Union[str, bytes]): Resource to update.
+            work (Callable[[int], Any]): Called with the version the update is based on, returns the result of the work.
+            timeout (Optional[float], optional): Maximum time in seconds to spend retrying. Defaults to None.
+
+        Returns:
+            Tuple[bool, Any, Optional[int]]: A tuple containing a boolean indicating whether the work is committed
+            within retry_count attempts, the result of its last run, and the committed version.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        version = self._cached_version(resource)
+        result = None
+        delay = 0.0
+        for attempt in range(1, int(self.retry_count) + 1):
+            if version is None:
+                version = self.read_version(resource)
+            if version is not None:
+                result = work(version)
+                committed, version = self.commit(resource, version)
+                if committed:
+                    return (True, result, version)
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if attempt >= self.retry_count or (remaining is not None and remaining <= 0):
+                break
+            delay = self._next_delay(attempt, delay, remaining)
+            time.sleep(delay)
+        return (False, result, None)
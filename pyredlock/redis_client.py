@@ -6,7 +6,9 @@ import redis.asyncio as aio_redis
 import redis.exceptions as redis_exceptions
 
 from loguru import logger as loguru_logger
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Union
+
+from .redlock import Redlock
 
 
 class Singleton(type):
@@ -33,7 +35,9 @@ class AioRedisClient(metaclass=Singleton):
             "db": {"type": "number"},
             "password": {"type": "string"},
             "socket_timeout": {"type": "number"},
-            "socket_connect_timeout": {"type": "number"}
+            "socket_connect_timeout": {"type": "number"},
+            # optional, the size of the connection pool (see RedisClientManager)
+            "max_connections": {"type": "number"}
         },
         "required": [
             "endpoint",
@@ -147,7 +151,9 @@ class RedisClient(metaclass=Singleton):
             "db": {"type": "number"},
             "password": {"type": "string"},
             "socket_timeout": {"type": "number"},
-            "socket_connect_timeout": {"type": "number"}
+            "socket_connect_timeout": {"type": "number"},
+            # optional, the size of the connection pool (see RedisClientManager)
+            "max_connections": {"type": "number"}
         },
         "required": [
             "endpoint",
@@ -238,3 +244,233 @@ class RedisClient(metaclass=Singleton):
         """
         if self._conn is not None:
             self._conn.close()
+
+
+def _pool_stats(pool: Union[redis.BlockingConnectionPool, aio_redis.BlockingConnectionPool]) -> Dict[str, int]:
+    """
+    Read the occupancy of a connection pool.
+
+    Notes:
+        redis-py exposes no occupancy counters, so this reads the private attributes of its blocking pools,
+        _available_connections and _in_use_connections (asyncio), pool.queue and _connections (sync), as laid out
+        in redis-py 5.0, the version pinned by the package; test_client_manager checks them against a real pool.
+    """
+    if isinstance(pool, aio_redis.BlockingConnectionPool):
+        available = len(pool._available_connections)
+        in_use = len(pool._in_use_connections)
+    else:
+        available = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        in_use = len(pool._connections) - available
+    return {
+        "max_connections": pool.max_connections,
+        "created": available + in_use,
+        "available": available,
+        "in_use": in_use
+    }
+
+
+class _BaseClientManager(object):
+    """The configuration handling shared by RedisClientManager and AioRedisClientManager."""
+
+    def __init__(self, client_confs: List[Dict[str, Any]], max_connections: int, pool_timeout: Optional[float]) -> None:
+        """
+        Validate the endpoint configurations.
+
+        Raises:
+            RedisClientSetupException: If an endpoint configuration is invalid, or if an endpoint is listed twice.
+        """
+        if len(client_confs) == 0:
+            raise RedisClientSetupException("Please provide at least one redis endpoint.")
+        endpoints = []
+        for conf in client_confs:
+            if not RedisClient.validate_client_config(conf):
+                raise RedisClientSetupException("Please provide valid redis config file.")
+            if conf["endpoint"] in endpoints:
+                # The same master counted twice would break the independence the quorum relies on.
+                raise RedisClientSetupException(f"Redis endpoint {conf['endpoint']} is listed twice.")
+            endpoints.append(conf["endpoint"])
+        self._confs = client_confs
+        self._endpoints = endpoints
+        self._max_connections = max_connections
+        self._pool_timeout = pool_timeout
+
+    def _pool_kwargs(self, conf: Dict[str, Any]) -> Dict[str, Any]:
+        host, port = conf["endpoint"].split(":")[0], int(conf["endpoint"].split(":")[1])
+        return {
+            "host": host,
+            "port": port,
+            "db": conf["db"],
+            "password": conf["password"],
+            "socket_timeout": conf["socket_timeout"],
+            "socket_connect_timeout": conf["socket_connect_timeout"],
+            "max_connections": int(conf.get("max_connections", self._max_connections)),
+            # how long to wait for a free connection when the pool is exhausted
+            "timeout": self._pool_timeout if self._pool_timeout is not None else conf["socket_timeout"]
+        }
+
+    @property
+    def endpoints(self) -> List[str]:
+        """
+        The endpoints of the Redis masters, in the order of the connections.
+        """
+        return list(self._endpoints)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get the occupancy of the connection pools.
+
+        Returns:
+            Dict[str, Dict[str, int]]: The max_connections, created, available and in_use connections of each endpoint.
+
+        Notes:
+            The counts are read from private attributes of the redis-py 5.0 pools, see _pool_stats.
+        """
+        return {endpoint: _pool_stats(pool) for endpoint, pool in zip(self._endpoints, self._pools)}
+
+
+class AioRedisClientManager(_BaseClientManager):
+    """Connection pools to several independent Redis masters, for an asynchronous Redlock."""
+
+    def __init__(
+            self,
+            client_confs: List[Dict[str, Any]],
+            max_connections: int = 16,
+            pool_timeout: Optional[float] = None
+        ) -> None:
+        """
+        Initialize the AioRedisClientManager.
+
+        Args:
+            client_confs (List[Dict[str, Any]]): The configuration of each Redis master, see AioRedisClient.CLIENT_CONFIG_SCHEMA.
+            max_connections (int, optional): The size of the connection pool of each master, unless its configuration
+                sets max_connections. Defaults to 16.
+            pool_timeout (Optional[float], optional): How long to wait for a free connection when a pool is exhausted,
+                in seconds. Defaults to None (the socket_timeout of the master).
+
+        Raises:
+            RedisClientSetupException: If an endpoint configuration is invalid, or if an endpoint is listed twice.
+
+        Notes:
+            Unlike AioRedisClient, any number of managers can be created, each with its own pools.
+        """
+        super(AioRedisClientManager, self).__init__(client_confs, max_connections, pool_timeout)
+        self._pools = [aio_redis.BlockingConnectionPool(**self._pool_kwargs(conf)) for conf in client_confs]
+        self._conns = [aio_redis.Redis(connection_pool=pool) for pool in self._pools]
+
+    def get_connections(self) -> List[aio_redis.Redis]:
+        """
+        Get the Redis connections, one per master.
+
+        Returns:
+            List[aio_redis.Redis]: The Redis connection objects.
+        """
+        return list(self._conns)
+
+    async def health(self) -> Dict[str, bool]:
+        """
+        Ping every master concurrently.
+
+        Returns:
+            Dict[str, bool]: Whether each endpoint answered.
+        """
+        async def ping(conn: aio_redis.Redis) -> bool:
+            try:
+                return bool(await conn.ping())
+            except redis_exceptions.RedisError as exc:
+                loguru_logger.error(f"Redis connection error:{exc}.")
+                return False
+        return dict(zip(self._endpoints, await asyncio.gather(*[ping(conn) for conn in self._conns])))
+
+    def redlock(self, **kwargs: Any) -> Redlock:
+        """
+        Create an asynchronous Redlock over the masters.
+
+        Args:
+            **kwargs: The other arguments of Redlock.
+
+        Returns:
+            Redlock: The lock manager.
+        """
+        return Redlock(connections=self.get_connections(), async_mode=True, **kwargs)
+
+    async def close(self):
+        """
+        Close the Redis connections.
+        """
+        for conn in self._conns:
+            await conn.aclose(close_connection_pool=True)
+
+
+class RedisClientManager(_BaseClientManager):
+    """Connection pools to several independent Redis masters, for a Redlock."""
+
+    def __init__(
+            self,
+            client_confs: List[Dict[str, Any]],
+            max_connections: int = 16,
+            pool_timeout: Optional[float] = None
+        ) -> None:
+        """
+        Initialize the RedisClientManager.
+
+        Args:
+            client_confs (List[Dict[str, Any]]): The configuration of each Redis master, see RedisClient.CLIENT_CONFIG_SCHEMA.
+            max_connections (int, optional): The size of the connection pool of each master, unless its configuration
+                sets max_connections. Defaults to 16.
+            pool_timeout (Optional[float], optional): How long to wait for a free connection when a pool is exhausted,
+                in seconds. Defaults to None (the socket_timeout of the master).
+
+        Raises:
+            RedisClientSetupException: If an endpoint configuration is invalid, or if an endpoint is listed twice.
+
+        Notes:
+            Unlike RedisClient, any number of managers can be created, each with its own pools.
+            Size the pools for the fan-out thread pool of the Redlock: each of its threads may hold a connection.
+        """
+        super(RedisClientManager, self).__init__(client_confs, max_connections, pool_timeout)
+        self._pools = [redis.BlockingConnectionPool(**self._pool_kwargs(conf)) for conf in client_confs]
+        self._conns = [redis.Redis(connection_pool=pool) for pool in self._pools]
+
+    def get_connections(self) -> List[redis.Redis]:
+        """
+        Get the Redis connections, one per master.
+
+        Returns:
+            List[redis.Redis]: The Redis connection objects.
+        """
+        return list(self._conns)
+
+    def health(self) -> Dict[str, bool]:
+        """
+        Ping every master.
+
+        Returns:
+            Dict[str, bool]: Whether each endpoint answered.
+        """
+        healthy = {}
+        for endpoint, conn in zip(self._endpoints, self._conns):
+            try:
+                healthy[endpoint] = bool(conn.ping())
+            except redis_exceptions.RedisError as exc:
+                loguru_logger.error(f"Redis connection error:{exc}.")
+                healthy[endpoint] = False
+        return healthy
+
+    def redlock(self, **kwargs: Any) -> Redlock:
+        """
+        Create a synchronous Redlock over the masters.
+
+        Args:
+            **kwargs: The other arguments of Redlock.
+
+        Returns:
+            Redlock: The lock manager.
+        """
+        return Redlock(connections=self.get_connections(), async_mode=False, **kwargs)
+
+    def close(self):
+        """
+        Close the Redis connections.
+        """
+        for pool in self._pools:
+            pool.disconnect()
@@ -1,17 +1,67 @@
 # -*- coding: utf-8 -*-
 import asyncio
-import random
+import functools
 import redis
 import redis.asyncio as aio_redis
 import redis.exceptions as redis_exceptions
-import string
+import threading
 import time
 
 from collections import namedtuple
+from concurrent import futures
 from loguru import logger as loguru_logger
-from typing import List, Optional, Tuple, Union
+from .backoff import BackoffStrategy
+from .health import CircuitOpenError, NodeHealth
+from .local import AioLocalGate, LocalGate
+from .metrics import MetricsSink, Span
+from .multiplex import AioCommandMultiplexer
+from .notify import AioReleaseListener, ReleaseListener
+from .scripts import ScriptRegistry
+from .tokens import TokenGenerator
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
-Lock = namedtuple("Lock", ("validity", "resource", "val"))
+
+class Lock(namedtuple("Lock", ("validity", "resource", "val", "deadline", "fence"), defaults=(None, None))):
+    """
+    A lock held on a quorum of the nodes.
+
+    Attributes:
+        validity (int): Validity time of the lock in milliseconds, as of its acquisition.
+        resource (Union[str, bytes]): The locked resource.
+        val (Union[str, bytes]): The unique value of the lock.
+        deadline (Optional[int]): The time.monotonic_ns() instant at which the lock may start to expire on the nodes.
+        fence (Optional[int]): The fencing token of the lock, greater than the one of any earlier holder
+            of the resource, if the Redlock issues fencing tokens.
+    """
+
+    __slots__ = ()
+
+    def remaining_ms(self) -> int:
+        """
+        Get the remaining validity time of the lock.
+
+        Returns:
+            int: Remaining validity time in milliseconds, 0 once expired,
+            or the validity as of the acquisition if the lock has no deadline.
+        """
+        if self.deadline is None:
+            return self.validity
+        return max(0, (self.deadline - time.monotonic_ns()) // 1000000)
+
+    def is_expired(self) -> bool:
+        """
+        Check whether the validity time of the lock has elapsed.
+
+        Returns:
+            bool: True if the lock may have expired on the nodes, False otherwise.
+        """
+        return self.deadline is not None and time.monotonic_ns() >= self.deadline
+
+
+# Pre-encoded tokens of the acquisition command, sent as-is by redis-py.
+_SET = b"SET"
+_NX = b"NX"
+_PX = b"PX"
 
 
 class CannotObtainLock(Exception):
@@ -38,16 +88,60 @@ class Redlock(object):
             connections: List[Union[redis.Redis, aio_redis.Redis]],
             async_mode: bool = True,
             retry_count: float = None,
-            retry_delay: float = None
+            retry_delay: float = None,
+            fan_out: bool = False,
+            node_timeout: Optional[float] = None,
+            max_workers: Optional[int] = None,
+            release_channel_prefix: Optional[str] = None,
+            backoff: Optional[Union[BackoffStrategy, Callable[[int, float, Optional[float]], float]]] = None,
+            token_generator: Optional[Callable[[], Union[str, bytes]]] = None,
+            failure_threshold: Optional[int] = 5,
+            recovery_timeout: float = 1.0,
+            metrics: Optional[MetricsSink] = None,
+            coalesce_local: bool = False,
+            fencing: bool = False,
+            multiplex: bool = False,
+            multiplex_window: float = 0.0
         ):
         """
         Initialize the Redlock instance.
 
         Args:
-            connections (List[Union[redis.Redis, aio_redis.Redis]]): List of Redis connections.
+            connections (List[Union[redis.Redis, aio_redis.Redis]]): List of Redis connections, or of the lean
+                RespConnection / AioRespConnection transports of pyredlock.transport.
             async_mode (bool, optional): Whether to use asynchronous mode. Defaults to True.
             retry_count (float, optional): Number of retry attempts. Defaults to None.
             retry_delay (float, optional): Delay between retry attempts in seconds. Defaults to None.
+            fan_out (bool, optional): Whether to send the per-node commands to all servers concurrently
+                instead of one-by-one. In synchronous mode the commands run on a thread pool owned by
+                the instance. Defaults to False.
+            node_timeout (Optional[float], optional): Per-node deadline in seconds for a single command
+                in fan-out mode. A node that misses its deadline counts as a failed vote. Defaults to None.
+            max_workers (Optional[int], optional): Size of the fan-out thread pool used in synchronous mode.
+                Defaults to None (4 threads per server).
+            release_channel_prefix (Optional[str], optional): If set, releasing a lock publishes a notification on the
+                channel named by this prefix followed by the resource, which wakes up the blocking waiters for the
+                resource. Defaults to None (no notification, blocking waiters poll).
+            backoff (Optional[Union[BackoffStrategy, Callable[[int, float, Optional[float]], float]]], optional):
+                Strategy computing the delay before each retry, see pyredlock.backoff. Defaults to None
+                (a constant retry_delay).
+            token_generator (Optional[Callable[[], Union[str, bytes]]], optional): Generator of the unique lock values.
+                Defaults to None (a TokenGenerator).
+            failure_threshold (Optional[int], optional): Number of consecutive connection errors or timeouts
+                after which a node is skipped, see pyredlock.health. Defaults to 5. None never skips a node.
+            recovery_timeout (float, optional): Seconds between the background probes of a skipped node.
+                Defaults to 1.0.
+            metrics (Optional[MetricsSink], optional): Sink of the metrics and spans of the lock operations,
+                see pyredlock.metrics. Defaults to None (no instrumentation).
+            coalesce_local (bool, optional): Whether to queue the contenders of this instance for a resource locally,
+                so that only the head of the queue talks to Redis, and to hand the lock over to the next local contender
+                on release. Defaults to False.
+            fencing (bool, optional): Whether to issue a fencing token with every lock acquired by lock/alock,
+                see Lock.fence. Defaults to False.
+            multiplex (bool, optional): Whether to send the lock, unlock and extend commands which concurrent coroutines
+                issue to a node in one pipeline, see pyredlock.multiplex. Asynchronous mode only. Defaults to False.
+            multiplex_window (float, optional): Seconds a multiplexed batch waits for more commands. Defaults to 0.0
+                (the commands issued in the same event loop iteration).
 
         Attributes:
             _async_mode (bool): Whether asynchronous mode is enabled.
@@ -55,9 +149,33 @@ class Redlock(object):
             _quorum (int): Quorum value for determining lock validity.
             retry_count (float): Number of retry attempts.
             retry_delay (float): Delay between retry attempts in seconds.
+            _backoff (Optional[Callable[[int, float, Optional[float]], float]]): Strategy computing the delay before each retry.
+            _fan_out (bool): Whether concurrent fan-out mode is enabled.
+            _node_timeout (Optional[float]): Per-node deadline in seconds for fan-out mode.
+            _max_workers (int): Size of the fan-out thread pool used in synchronous mode.
+            _executor (Optional[futures.ThreadPoolExecutor]): The fan-out thread pool, created on first use.
+            _release_channel_prefix (Optional[str]): Prefix of the release notification channels.
+            _release_listeners (Optional[List[ReleaseListener]]): Per-node subscriptions of the blocking waiters.
+            _aio_release_listeners (Optional[List[AioReleaseListener]]): Per-node subscriptions of the asynchronous blocking waiters.
             _clock_drift_factor (float): Clock drift factor for calculating lock validity.
+            _token_generator (Callable[[], Union[str, bytes]]): Generator of the unique lock values.
+            _health (List[NodeHealth]): Latency, error counts and circuit breaker of each node.
+            _metrics (Optional[MetricsSink]): Sink of the metrics and spans of the lock operations.
+            _coalesce_local (bool): Whether the contenders of this instance are queued locally.
+            _local_gates (Dict[Union[str, bytes], Union[LocalGate, AioLocalGate]]): The local queues by resource.
+            _fencing (bool): Whether fencing tokens are issued.
+            _multiplexers (Optional[Dict[int, AioCommandMultiplexer]]): The command multiplexer of each node by id,
+                None unless multiplexing.
             _unlock_script (str): Lua script to unlock a resource.
             _extend_script (str): Lua script to extend the lock.
+            _lock_many_script (str): Lua script to lock a set of resources all-or-nothing.
+            _lock_each_script (str): Lua script to lock each of a set of resources independently.
+            _unlock_many_script (str): Lua script to unlock a set of resources.
+            _swap_script (str): Lua script to hand a lock over to a new value.
+            _fenced_lock_script (str): Lua script to acquire a lock and increment its fencing counter.
+            _fenced_swap_script (str): Lua script to hand a lock over to a new value and increment its fencing counter.
+            _raise_fence_script (str): Lua script to bring a fencing counter up to a given token.
+            _scripts (ScriptRegistry): Registry which runs the Lua scripts by EVALSHA.
 
         Notes:
             N Redis servers are peers and do not differentiate between master and slave relationships.
@@ -75,6 +193,36 @@ class Redlock(object):
 
             We also recommend that the socket_timeout option be set the same for all Redis servers,
             and be much less than the lock validity time.
+
+            In fan-out mode the per-node commands are issued concurrently (on a bounded thread pool in synchronous mode), so the time spent acquiring
+            a lock tracks the slowest member of the quorum rather than the sum over all nodes.
+            lock/extend return as soon as the quorum is reached or can no longer be reached,
+            the remaining in-flight commands ("stragglers") are left to finish in the background,
+            and after a failed acquisition they are released in the background as well.
+
+            A node which keeps failing with connection errors or timeouts has its circuit opened: it is skipped,
+            counting as a failed vote, instead of costing a socket timeout on every call, and it is probed
+            with PING in the background until it answers again.
+
+            With local coalescing, the coroutines (or threads) of one process which contend for a resource wait
+            in a local queue instead of all running the protocol against every node and mostly failing.
+            Releasing a lock while local contenders are waiting does not delete the key: the next contender takes
+            it over with a single compare-and-swap of the value per node, so the lock never goes back up for grabs
+            between two local holders. A non-blocking contender waits in the local queue for at most
+            retry_count * retry_delay seconds. Only lock/alock and unlock/aunlock go through the local queue.
+
+            With fencing, each node keeps a counter per resource under "<resource>:fence", which is incremented
+            in the same script that sets the lock, and the fencing token of the lock is the highest counter among
+            the nodes which granted it. When those disagree, the counters of all the nodes are raised to the token
+            before the lock is returned, and the acquisition fails unless a quorum of them hold it: any later quorum
+            shares a node with them, so every later lock gets a greater token. Storage which remembers the highest
+            token it has seen can then reject the writes of a holder whose lock expired behind its back.
+            The counters never expire. Handing a lock over locally issues a new token, lock_many issues none.
+
+            With multiplexing, the SET NX of alock and the scripts of aunlock and aextend go through a per-node
+            multiplexer, which sends all the commands issued in the same event loop iteration as one pipeline.
+            Thousands of coroutines locking at once then share a few connections and round-trips per node,
+            instead of holding a pooled connection each; the other commands are sent as usual.
         """
 
         self._async_mode = async_mode
@@ -85,10 +233,34 @@ class Redlock(object):
         self.retry_count = retry_count or default_retry_count
         default_retry_delay = 0.2
         self.retry_delay = retry_delay or default_retry_delay
+        self._backoff = backoff
+        self._fan_out = fan_out
+        self._node_timeout = node_timeout
+        self._max_workers = max_workers or 4 * max(len(connections), 1)
+        self._executor: Optional[futures.ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._release_channel_prefix = release_channel_prefix
+        self._release_listeners: Optional[List[ReleaseListener]] = None
+        self._aio_release_listeners: Optional[List[AioReleaseListener]] = None
         self._clock_drift_factor = 0.01
+        self._token_generator = token_generator or TokenGenerator()
+        self._background_tasks = set()
+        self._health = [
+            NodeHealth(failure_threshold, recovery_timeout, name=self._node_name(server, i))
+            for i, server in enumerate(connections)
+        ]
+        self._metrics = metrics
+        self._coalesce_local = coalesce_local
+        self._local_gates: Dict[Union[str, bytes], Union[LocalGate, AioLocalGate]] = {}
+        self._local_gates_lock = threading.Lock()
+        self._fencing = fencing
 
         self._unlock_script = """if redis.call("GET",KEYS[1]) == ARGV[1] then
-    return redis.call("DEL",KEYS[1])
+    local n = redis.call("DEL",KEYS[1])
+    if ARGV[2] then
+        redis.call("PUBLISH",ARGV[2]..KEYS[1],KEYS[1])
+    end
+    return n
 else
     return 0
 end"""
@@ -97,84 +269,723 @@ end"""
 else
     return 0
 end"""
+        self._lock_many_script = """for i = 1, #KEYS do
+    if redis.call("EXISTS",KEYS[i]) == 1 then
+        return 0
+    end
+end
+for i = 1, #KEYS do
+    redis.call("SET",KEYS[i],ARGV[1],"PX",ARGV[2])
+end
+return 1"""
+        self._lock_each_script = """local acquired = {}
+for i = 1, #KEYS do
+    if redis.call("SET",KEYS[i],ARGV[1],"NX","PX",ARGV[2]) then
+        acquired[i] = 1
+    else
+        acquired[i] = 0
+    end
+end
+return acquired"""
+        self._unlock_many_script = """local n = 0
+for i = 1, #KEYS do
+    if redis.call("GET",KEYS[i]) == ARGV[1] then
+        n = n + redis.call("DEL",KEYS[i])
+        if ARGV[2] then
+            redis.call("PUBLISH",ARGV[2]..KEYS[i],KEYS[i])
+        end
+    end
+end
+return n"""
+        self._swap_script = """if redis.call("GET",KEYS[1]) == ARGV[1] then
+    redis.call("SET",KEYS[1],ARGV[2],"PX",ARGV[3])
+    return 1
+else
+    return 0
+end"""
+        self._fenced_lock_script = """if redis.call("SET",KEYS[1],ARGV[1],"NX","PX",ARGV[2]) then
+    return redis.call("INCR",KEYS[2])
+else
+    return 0
+end"""
+        self._fenced_swap_script = """if redis.call("GET",KEYS[1]) == ARGV[1] then
+    redis.call("SET",KEYS[1],ARGV[2],"PX",ARGV[3])
+    return redis.call("INCR",KEYS[2])
+else
+    return 0
+end"""
+        self._raise_fence_script = """if tonumber(redis.call("GET",KEYS[2]) or "0") < tonumber(ARGV[1]) then
+    redis.call("SET",KEYS[2],ARGV[1])
+end
+return 1"""
+        self._scripts = ScriptRegistry()
+        self._scripts.register("unlock", self._unlock_script)
+        self._scripts.register("extend", self._extend_script)
+        self._scripts.register("lock_many", self._lock_many_script)
+        self._scripts.register("lock_each", self._lock_each_script)
+        self._scripts.register("unlock_many", self._unlock_many_script)
+        self._scripts.register("swap", self._swap_script)
+        self._scripts.register("fenced_lock", self._fenced_lock_script)
+        self._scripts.register("fenced_swap", self._fenced_swap_script)
+        self._scripts.register("raise_fence", self._raise_fence_script)
+        self._multiplexers: Optional[Dict[int, AioCommandMultiplexer]] = None
+        if multiplex:
+            if not async_mode:
+                raise ValueError("multiplex requires async_mode")
+            self._multiplexers = {
+                id(server): AioCommandMultiplexer(server, self._scripts, window=multiplex_window) for server in connections
+            }
+
+    async def _aexecute_script(self, server: aio_redis.Redis, name: str, keys: Tuple[Any, ...], args: Tuple[Any, ...]) -> Any:
+        """
+        Run a registered script on a node asynchronously, through its multiplexer if multiplexing.
+        """
+        if self._multiplexers is not None:
+            return await self._multiplexers[id(server)].execute_script(name, keys, args)
+        return await self._scripts.aexecute(server, name, keys, args)
 
     async def _alock_instance(
             self,
             server: aio_redis.Redis,
-            resource: str,
-            val: str,
-            ttl: int
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: bytes
         ) -> bool:
-        try:
-            assert isinstance(ttl, int), "ttl {} is not an integer".format(ttl)
-        except AssertionError as e:
-            raise ValueError(str(e))
-        return await server.execute_command(f"SET {resource} {val} NX PX {ttl}") == b"OK"
+        # The arguments are passed pre-tokenized, so that binary and whitespace-containing values are sent verbatim,
+        # and the ttl comes pre-encoded by the caller.
+        if self._multiplexers is not None:
+            return bool(await self._multiplexers[id(server)].execute_command(_SET, resource, val, _NX, _PX, ttl))
+        return bool(await server.execute_command(_SET, resource, val, _NX, _PX, ttl))
 
     def _lock_instance(
             self,
             server: redis.Redis,
-            resource: str,
-            val: str,
-            ttl: int
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: bytes
         ) -> bool:
-        try:
-            assert isinstance(ttl, int), "ttl {} is not an integer".format(ttl)
-        except AssertionError as e:
-            raise ValueError(str(e))
-        return server.execute_command(f"SET {resource} {val} NX PX {ttl}") == b"OK"
+        # The arguments are passed pre-tokenized, so that binary and whitespace-containing values are sent verbatim,
+        # and the ttl comes pre-encoded by the caller.
+        return bool(server.execute_command(_SET, resource, val, _NX, _PX, ttl))
 
     async def _aunlock_instance(
             self,
             server: aio_redis.Redis,
-            resource: str,
-            val: str
+            resource: Union[str, bytes],
+            val: Union[str, bytes]
         ) -> bool:
-        return await server.execute_command("EVAL", self._unlock_script, 1, resource, val) == 1
+        return await self._aexecute_script(server, "unlock", (resource,), self._unlock_args(val)) == 1
 
     def _unlock_instance(
             self,
             server: redis.Redis,
-            resource: str,
-            val: str
+            resource: Union[str, bytes],
+            val: Union[str, bytes]
         ) -> bool:
-        return server.execute_command("EVAL", self._unlock_script, 1, resource, val) == 1
+        return self._scripts.execute(server, "unlock", (resource,), self._unlock_args(val)) == 1
 
     async def _aextend_instance(
             self,
             server: aio_redis.Redis,
-            resource: str,
-            val: str,
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
             ttl: int
         ) -> bool:
-        return await server.execute_command("EVAL", self._extend_script, 1, resource, val, ttl) == 1
+        return await self._aexecute_script(server, "extend", (resource,), (val, ttl)) == 1
 
     def _extend_instance(
             self,
             server: aio_redis.Redis,
-            resource: str,
-            val: str,
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
             ttl: int
         ) -> bool:
-        return server.execute_command("EVAL", self._extend_script, 1, resource, val, ttl) == 1
+        return self._scripts.execute(server, "extend", (resource,), (val, ttl)) == 1
+
+    async def _aswap_instance(
+            self,
+            server: aio_redis.Redis,
+            resource: Union[str, bytes],
+            previous: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: bytes
+        ) -> bool:
+        return bool(await self._scripts.aexecute(server, "swap", (resource,), (previous, val, ttl)))
+
+    def _swap_instance(
+            self,
+            server: redis.Redis,
+            resource: Union[str, bytes],
+            previous: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: bytes
+        ) -> bool:
+        return bool(self._scripts.execute(server, "swap", (resource,), (previous, val, ttl)))
+
+    @staticmethod
+    def _fence_keys(resource: Union[str, bytes]) -> Tuple[Union[str, bytes], ...]:
+        """
+        Get the keys of a fenced resource: the lock and its fencing counter.
+        """
+        if isinstance(resource, bytes):
+            return (resource, resource + b":fence")
+        return (resource, resource + ":fence")
+
+    async def _afenced_lock_instance(
+            self,
+            server: aio_redis.Redis,
+            resource: Union[str, bytes],
+            previous: Optional[Union[str, bytes]],
+            val: Union[str, bytes],
+            ttl: bytes
+        ) -> int:
+        if previous is None:
+            return await self._scripts.aexecute(server, "fenced_lock", self._fence_keys(resource), (val, ttl))
+        return await self._scripts.aexecute(server, "fenced_swap", self._fence_keys(resource), (previous, val, ttl))
+
+    def _fenced_lock_instance(
+            self,
+            server: redis.Redis,
+            resource: Union[str, bytes],
+            previous: Optional[Union[str, bytes]],
+            val: Union[str, bytes],
+            ttl: bytes
+        ) -> int:
+        if previous is None:
+            return self._scripts.execute(server, "fenced_lock", self._fence_keys(resource), (val, ttl))
+        return self._scripts.execute(server, "fenced_swap", self._fence_keys(resource), (previous, val, ttl))
+
+    async def _araise_fence(self, resource: Union[str, bytes], fences: List[int]) -> Optional[int]:
+        """
+        Get the fencing token of a lock from the counters returned by the nodes which granted it asynchronously,
+        or None if a quorum of the nodes could not be brought up to it.
+        """
+        fence = max(fences)
+        if sum(1 for n in fences if n == fence) >= self._quorum:
+            return fence
+        results, _, _ = await self._acall_servers(
+            lambda server: self._scripts.aexecute(server, "raise_fence", self._fence_keys(resource), (fence,))
+        )
+        return fence if sum(1 for ok in results if ok) >= self._quorum else None
+
+    def _raise_fence(self, resource: Union[str, bytes], fences: List[int]) -> Optional[int]:
+        """
+        Get the fencing token of a lock from the counters returned by the nodes which granted it,
+        or None if a quorum of the nodes could not be brought up to it.
+        """
+        fence = max(fences)
+        if sum(1 for n in fences if n == fence) >= self._quorum:
+            return fence
+        results, _, _ = self._call_servers(
+            lambda server: self._scripts.execute(server, "raise_fence", self._fence_keys(resource), (fence,))
+        )
+        return fence if sum(1 for ok in results if ok) >= self._quorum else None
+
+    async def _alock_many_instance(
+            self,
+            server: aio_redis.Redis,
+            resources: List[Union[str, bytes]],
+            val: Union[str, bytes],
+            ttl: bytes,
+            all_or_nothing: bool
+        ) -> Any:
+        if all_or_nothing:
+            return await self._scripts.aexecute(server, "lock_many", resources, (val, ttl)) == 1
+        return await self._scripts.aexecute(server, "lock_each", resources, (val, ttl))
+
+    def _lock_many_instance(
+            self,
+            server: redis.Redis,
+            resources: List[Union[str, bytes]],
+            val: Union[str, bytes],
+            ttl: bytes,
+            all_or_nothing: bool
+        ) -> Any:
+        if all_or_nothing:
+            return self._scripts.execute(server, "lock_many", resources, (val, ttl)) == 1
+        return self._scripts.execute(server, "lock_each", resources, (val, ttl))
+
+    async def _aunlock_many_instance(
+            self,
+            server: aio_redis.Redis,
+            resources: List[Union[str, bytes]],
+            val: Union[str, bytes]
+        ) -> int:
+        return await self._scripts.aexecute(server, "unlock_many", resources, self._unlock_args(val))
+
+    def _unlock_many_instance(
+            self,
+            server: redis.Redis,
+            resources: List[Union[str, bytes]],
+            val: Union[str, bytes]
+        ) -> int:
+        return self._scripts.execute(server, "unlock_many", resources, self._unlock_args(val))
+
+    def _next_delay(self, attempt: int, previous: float, remaining: Optional[float]) -> float:
+        """
+        Compute the delay before the next attempt, never exceeding the remaining acquisition budget.
+        """
+        if self._backoff is None:
+            return self.retry_delay if remaining is None else max(0.0, min(self.retry_delay, remaining))
+        return self._backoff(attempt, previous, remaining)
+
+    def _unlock_args(self, val: Union[str, bytes]) -> Tuple[Any, ...]:
+        if self._release_channel_prefix is None:
+            return (val,)
+        return (val, self._release_channel_prefix)
+
+    def _release_channel(self, resource: Union[str, bytes]) -> bytes:
+        if isinstance(resource, str):
+            resource = resource.encode("utf-8")
+        return self._release_channel_prefix.encode("utf-8") + resource
+
+    async def _asubscribe_release(self, resource: Union[str, bytes]) -> Optional[asyncio.Event]:
+        """
+        Subscribe to the release notifications of a resource on all nodes.
+
+        Returns:
+            Optional[asyncio.Event]: The event set on every release, None if release notifications are disabled.
+        """
+        if self._release_channel_prefix is None:
+            return None
+        if self._aio_release_listeners is None:
+            self._aio_release_listeners = [AioReleaseListener(server) for server in self._servers if hasattr(server, "pubsub")]
+        channel = self._release_channel(resource)
+        event = asyncio.Event()
+        for exc in await asyncio.gather(
+            *[listener.add_waiter(channel, event) for listener in self._aio_release_listeners],
+            return_exceptions=True
+        ):
+            if isinstance(exc, redis_exceptions.RedisError):
+                loguru_logger.error(f"Redis subscribe error:{exc}.")
+            elif isinstance(exc, BaseException):
+                raise exc
+        return event
+
+    async def _aunsubscribe_release(self, resource: Union[str, bytes], event: asyncio.Event) -> None:
+        channel = self._release_channel(resource)
+        for listener in self._aio_release_listeners:
+            await listener.remove_waiter(channel, event)
+
+    def _subscribe_release(self, resource: Union[str, bytes]) -> Optional[threading.Event]:
+        """
+        Subscribe to the release notifications of a resource on all nodes.
+
+        Returns:
+            Optional[threading.Event]: The event set on every release, None if release notifications are disabled.
+        """
+        if self._release_channel_prefix is None:
+            return None
+        with self._executor_lock:
+            if self._release_listeners is None:
+                self._release_listeners = [ReleaseListener(server) for server in self._servers if hasattr(server, "pubsub")]
+        channel = self._release_channel(resource)
+        event = threading.Event()
+        for listener in self._release_listeners:
+            try:
+                listener.add_waiter(channel, event)
+            except redis_exceptions.RedisError as exc:
+                loguru_logger.error(f"Redis subscribe error:{exc}.")
+        return event
+
+    def _unsubscribe_release(self, resource: Union[str, bytes], event: threading.Event) -> None:
+        channel = self._release_channel(resource)
+        for listener in self._release_listeners:
+            listener.remove_waiter(channel, event)
+
+    @staticmethod
+    def _encode_ttl(ttl: int) -> bytes:
+        """
+        Validate a ttl and encode it once, instead of once per node.
+        """
+        if not isinstance(ttl, int):
+            raise ValueError("ttl {} is not an integer".format(ttl))
+        return b"%d" % ttl
+
+    def _extend_command(self, lock: Lock, ttl: int) -> Tuple[str, Tuple[Any, ...], Tuple[Any, ...]]:
+        """
+        Get the (script name, keys, args) which extend a lock, for batched renewals.
+        """
+        return ("extend", (lock.resource,), (lock.val, ttl))
 
-    def _get_unique_id(self) -> str:
+    def _get_unique_id(self) -> Union[str, bytes]:
         """
         Generate a unique identifier for the lock.
 
         Returns:
-            str: Unique identifier.
+            Union[str, bytes]: Unique identifier.
+        """
+        return self._token_generator()
+
+    def _adopt_background_task(self, task: asyncio.Future) -> None:
+        """
+        Keep a reference to a background task until it finishes, so it is neither garbage collected
+        while pending nor reported as "exception was never retrieved" when it fails.
+        """
+        self._background_tasks.add(task)
+        task.add_done_callback(self._on_background_task_done)
+
+    def _on_background_task_done(self, task: asyncio.Future) -> None:
+        self._background_tasks.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def _awith_deadline(self, coro: Awaitable[Any]) -> Any:
+        """
+        Await a per-node command, converting a missed per-node deadline into a Redis timeout error.
+        """
+        if self._node_timeout is None:
+            return await coro
+        try:
+            return await asyncio.wait_for(coro, self._node_timeout)
+        except asyncio.TimeoutError:
+            raise redis_exceptions.TimeoutError(f"Redlock node deadline of {self._node_timeout}s exceeded")
+
+    @staticmethod
+    def _node_name(server: Union[redis.Redis, aio_redis.Redis], index: int) -> str:
+        kwargs = getattr(server, "connection_kwargs", None) or getattr(
+            getattr(server, "connection_pool", None), "connection_kwargs", {}
+        )
+        if "host" in kwargs:
+            return f"{kwargs['host']}:{kwargs.get('port', 6379)}"
+        return f"node{index}"
+
+    def _record_instance(self, health: NodeHealth, exc: Optional[BaseException], latency: float) -> None:
+        health.record(exc, latency)
+        if self._metrics is not None:
+            self._metrics.on_node_rtt(health.name, latency, exc)
+
+    def _end_acquire(
+            self,
+            span: Span,
+            resource: Union[str, bytes],
+            lock: Optional[Lock],
+            attempts: int,
+            error: Optional[BaseException]
+        ) -> None:
+        """
+        Report a completed acquisition to the metrics sink, along with the error which aborted it, if any.
+        """
+        span.set_attribute("acquired", lock is not None)
+        span.set_attribute("attempts", attempts)
+        self._metrics.on_acquire(resource, lock is not None, time.monotonic() - span.start, attempts)
+        span.end(error)
+
+    def _end_span(self, span: Span, hook: Callable[[Union[str, bytes], bool, float], None], lock: Lock, ok: bool) -> None:
+        """
+        Report a completed release or extension to the metrics sink.
+        """
+        span.set_attribute("ok", ok)
+        hook(lock.resource, ok, time.monotonic() - span.start)
+        span.end()
+
+    async def _atimed_instance(self, coro: Awaitable[Any], health: NodeHealth) -> Any:
+        """
+        Await a per-node command, recording its latency and outcome in the health of the node.
+        """
+        t = time.monotonic()
+        try:
+            result = await coro
+        except Exception as exc:
+            self._record_instance(health, exc, time.monotonic() - t)
+            raise
+        self._record_instance(health, None, time.monotonic() - t)
+        return result
+
+    async def _aprobe_instance(self, server: aio_redis.Redis, health: NodeHealth) -> None:
+        try:
+            await self._atimed_instance(self._awith_deadline(server.ping()), health)
+        except Exception:
+            pass
+
+    def _timed_instance(self, call: Callable[[redis.Redis], Any], server: redis.Redis, health: NodeHealth) -> Any:
+        """
+        Run a per-node command, recording its latency and outcome in the health of the node.
+        """
+        t = time.monotonic()
+        try:
+            result = call(server)
+        except Exception as exc:
+            self._record_instance(health, exc, time.monotonic() - t)
+            raise
+        self._record_instance(health, None, time.monotonic() - t)
+        return result
+
+    def _probe_instance(self, server: redis.Redis, health: NodeHealth) -> None:
+        try:
+            self._timed_instance(lambda server: server.ping(), server, health)
+        except Exception:
+            pass
+
+    def _skip_instance(self, server: Union[redis.Redis, aio_redis.Redis], health: NodeHealth) -> bool:
+        """
+        Tell whether a node must be skipped since its circuit is open, probing it in the background when due.
+        """
+        if health.allow():
+            return False
+        if health.should_probe():
+            if self._async_mode:
+                self._adopt_background_task(asyncio.ensure_future(self._aprobe_instance(server, health)))
+            else:
+                self._get_executor().submit(self._probe_instance, server, health)
+        return True
+
+    async def _acall_servers(
+            self,
+            call: Callable[[aio_redis.Redis], Awaitable[Any]],
+            quorum: Optional[int] = None
+        ) -> Tuple[List[Any], List[Exception], Dict[asyncio.Future, aio_redis.Redis]]:
+        """
+        Run a per-node command against all servers asynchronously.
+
+        Args:
+            call (Callable[[aio_redis.Redis], Awaitable[Any]]): Factory of the per-node command.
+            quorum (Optional[int], optional): In fan-out mode, return as soon as this many nodes replied
+                with a truthy result, or as soon as that became impossible. Defaults to None (wait for all).
+
+        Returns:
+            Tuple[List[Any], List[Exception], Dict[asyncio.Future, aio_redis.Redis]]: The replies of the
+            nodes that answered, the Redis errors raised by the nodes that failed, and the commands still
+            in flight (mapped to their server) when returning early.
+        """
+        results = []
+        redis_errors = []
+        servers = []
+        for server, health in zip(self._servers, self._health):
+            if self._skip_instance(server, health):
+                redis_errors.append(CircuitOpenError(f"Redlock node circuit is {health.state}"))
+            else:
+                servers.append((server, health))
+        if not self._fan_out:
+            for server, health in servers:
+                try:
+                    results.append(await self._atimed_instance(call(server), health))
+                except redis_exceptions.RedisError as e:
+                    redis_errors.append(e)
+            return results, redis_errors, {}
+
+        pending = {
+            asyncio.ensure_future(self._atimed_instance(self._awith_deadline(call(server)), health)): server
+            for server, health in servers
+        }
+        n = 0
+        while pending:
+            done, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                del pending[task]
+                exc = task.exception()
+                if exc is None:
+                    results.append(task.result())
+                    if results[-1]:
+                        n += 1
+                elif isinstance(exc, redis_exceptions.RedisError):
+                    redis_errors.append(exc)
+                else:
+                    for straggler in pending:
+                        self._adopt_background_task(straggler)
+                    raise exc
+            if quorum is not None and (n >= quorum or n + len(pending) < quorum):
+                break
+        for straggler in pending:
+            self._adopt_background_task(straggler)
+        return results, redis_errors, pending
+
+    async def _arelease_straggler(
+            self,
+            straggler: asyncio.Future,
+            server: aio_redis.Redis,
+            release: Callable[[aio_redis.Redis], Awaitable[Any]]
+        ) -> None:
+        """
+        Wait for an in-flight acquisition command to finish, then release whatever it may have acquired.
+        """
+        try:
+            await straggler
+        except Exception:
+            pass
+        try:
+            await self._awith_deadline(release(server))
+        except Exception:
+            pass
+
+    async def _arelease_instance(
+            self,
+            server: aio_redis.Redis,
+            release: Callable[[aio_redis.Redis], Awaitable[Any]],
+            stragglers: Dict[asyncio.Future, aio_redis.Redis]
+        ) -> None:
+        """
+        Release a failed acquisition on one node, deferring nodes whose command is still in flight.
+        """
+        for straggler, straggler_server in stragglers.items():
+            if straggler_server is server:
+                self._adopt_background_task(asyncio.ensure_future(
+                    self._arelease_straggler(straggler, server, release)
+                ))
+                return
+        try:
+            await release(server)
+        except Exception:
+            pass
+
+    def _get_executor(self) -> futures.ThreadPoolExecutor:
+        """
+        Get the fan-out thread pool, creating it on first use.
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = futures.ThreadPoolExecutor(
+                        max_workers=self._max_workers,
+                        thread_name_prefix="redlock"
+                    )
+        return self._executor
+
+    def _call_servers(
+            self,
+            call: Callable[[redis.Redis], Any],
+            quorum: Optional[int] = None
+        ) -> Tuple[List[Any], List[Exception], Dict[futures.Future, redis.Redis]]:
+        """
+        Run a per-node command against all servers.
+
+        Args:
+            call (Callable[[redis.Redis], Any]): The per-node command.
+            quorum (Optional[int], optional): In fan-out mode, return as soon as this many nodes replied
+                with a truthy result, or as soon as that became impossible. Defaults to None (wait for all).
+
+        Returns:
+            Tuple[List[Any], List[Exception], Dict[futures.Future, redis.Redis]]: The replies of the
+            nodes that answered, the Redis errors raised by the nodes that failed, and the commands still
+            in flight (mapped to their server) when returning early.
+        """
+        results = []
+        redis_errors = []
+        servers = []
+        for server, health in zip(self._servers, self._health):
+            if self._skip_instance(server, health):
+                redis_errors.append(CircuitOpenError(f"Redlock node circuit is {health.state}"))
+            else:
+                servers.append((server, health))
+        if not self._fan_out:
+            for server, health in servers:
+                try:
+                    results.append(self._timed_instance(call, server, health))
+                except redis_exceptions.RedisError as e:
+                    redis_errors.append(e)
+            return results, redis_errors, {}
+
+        executor = self._get_executor()
+        pending = {executor.submit(self._timed_instance, call, server, health): server for server, health in servers}
+        deadline = None if self._node_timeout is None else time.monotonic() + self._node_timeout
+        n = 0
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = futures.wait(pending.keys(), timeout=timeout, return_when=futures.FIRST_COMPLETED)
+            if not done:
+                # Threads cannot be interrupted, so the nodes which missed their deadline
+                # count as failed votes and are left running as stragglers.
+                for _ in pending:
+                    redis_errors.append(
+                        redis_exceptions.TimeoutError(f"Redlock node deadline of {self._node_timeout}s exceeded")
+                    )
+                break
+            for future in done:
+                del pending[future]
+                exc = future.exception()
+                if exc is None:
+                    results.append(future.result())
+                    if results[-1]:
+                        n += 1
+                elif isinstance(exc, redis_exceptions.RedisError):
+                    redis_errors.append(exc)
+                else:
+                    raise exc
+            if quorum is not None and (n >= quorum or n + len(pending) < quorum):
+                break
+        return results, redis_errors, pending
+
+    def _release_instance(
+            self,
+            server: redis.Redis,
+            release: Callable[[redis.Redis], Any],
+            stragglers: Dict[futures.Future, redis.Redis]
+        ) -> None:
+        """
+        Release a failed acquisition on one node, deferring nodes whose command is still in flight.
+        """
+        for straggler, straggler_server in stragglers.items():
+            if straggler_server is server:
+                straggler.add_done_callback(lambda _: self._release_instance(server, release, {}))
+                return
+        try:
+            release(server)
+        except Exception:
+            pass
+
+    def script_stats(self) -> Dict[str, int]:
+        """
+        Get the counters of the Lua script cache.
+
+        Returns:
+            Dict[str, int]: The number of EVALSHA hits, NOSCRIPT misses and SCRIPT LOAD calls.
+        """
+        return self._scripts.stats()
+
+    def health_stats(self) -> List[Dict[str, Any]]:
+        """
+        Get the health of the nodes.
+
+        Returns:
+            List[Dict[str, Any]]: The circuit state, latency moving average in seconds and error counts of each node,
+            in the order of the connections.
+        """
+        return [health.stats() for health in self._health]
+
+    def close(self) -> None:
         """
-        CHARACTERS = string.ascii_letters + string.digits
-        return "".join([random.choice(CHARACTERS) for _ in range(22)])
+        Release the resources owned by the Redlock instance, i.e. the fan-out thread pool
+        and the release notification subscriptions.
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self._release_listeners is not None:
+                for listener in self._release_listeners:
+                    listener.close()
+                self._release_listeners = None
+
+    async def aclose(self) -> None:
+        """
+        Release the resources owned by the Redlock instance asynchronously, i.e. the fan-out thread pool,
+        the release notification subscriptions and the pipelines of the multiplexers.
+        """
+        if self._multiplexers is not None:
+            for multiplexer in self._multiplexers.values():
+                await multiplexer.aclose()
+        if self._aio_release_listeners is not None:
+            for listener in self._aio_release_listeners:
+                await listener.close()
+            self._aio_release_listeners = None
+        self.close()
 
-    async def alock(self, resource: str, ttl: int) -> Tuple[bool, Optional[Lock]]:
+    async def alock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
         """
         Acquire a lock on a resource asynchronously.
 
         Args:
-            resource (str): Resource to lock.
+            resource (Union[str, bytes]): Resource to lock.
             ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
 
         Returns:
             Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully and an optional Lock object.
@@ -228,100 +1039,304 @@ end"""
                    it is essential to have a solid "fallback" strategy at the resource layer.
                    The design approach can take inspiration from the concept of "fencing tokens" menthioned by Martin Kleppmann,
                    where data is updated at the database layer using versioning to avoid concurrent conflicts.
+                   With fencing=True every lock carries such a token (Lock.fence), to be checked by the database layer.
+
+            ----------------------------
+            Blocking acquisition
+
+                In blocking mode a waiter subscribes to the release channel of the resource on every node
+                (one subscription connection per node is shared by all the waiters of the Redlock instance),
+                and retries as soon as a release is published, so a contended lock is handed over within about one round-trip.
+                Release notifications require release_channel_prefix to be set on the Redlock instances which release the lock;
+                without them, or when a notification is missed, the waiter falls back to polling after each backoff delay.
             """
-        retry = 0
-        val = self._get_unique_id()
+        if self._coalesce_local:
+            return await self._alock_coalesced(resource, ttl, blocking, timeout)
+        return await self._alock(resource, ttl, blocking, timeout)
 
+    async def _alock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None,
+            val: Optional[Union[str, bytes]] = None,
+            acquire: Optional[Callable[[aio_redis.Redis, Union[str, bytes], bytes], Awaitable[bool]]] = None,
+            wake: Optional[Union[str, bytes]] = None,
+            new_val: Optional[Callable[[], Union[str, bytes]]] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a lock on a resource asynchronously, bypassing the local queue,
+        with a fresh value per attempt, from new_val() if given, unless val is given (then every attempt waits for
+        all the nodes, even in fan-out mode), and by SET NX unless acquire(server, val, ttl) is given.
+        A blocking waiter is woken up by the releases published for the wake key, which defaults to the resource.
+        """
         # Add 2 milliseconds to the drift to account for Redis expires
         # precision, which is 1 millisecond, plus 1 millisecond min
         # drift for small TTLs.
         clock_drift = int(ttl * self._clock_drift_factor) + 2
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ttl_arg = self._encode_ttl(ttl)
+        span = None if self._metrics is None else self._metrics.start_span(
+            "redlock.acquire", {"resource": resource, "ttl": ttl, "blocking": blocking}
+        )
 
-        redis_errors = []
-        restart_attempt = True
-        while restart_attempt:
-            n = 0
-            del redis_errors[:]
-
-            t1 = int(time.time() * 1000)
-            for server in self._servers:
-                try:
-                    ok = await self._alock_instance(server, resource, val, ttl)
-                    if ok:
-                        n += 1
-                except redis_exceptions.RedisError as e:
-                    redis_errors.append(e)
-            t2 = int(time.time() * 1000)
-            
-            validity = int(ttl - (t2 - t1) - clock_drift)
-            if n >= self._quorum and validity > 0:
-                if len(redis_errors) > 0:
-                    loguru_logger.error(f"Redlock Lock Error:{MultipleRedlockException(redis_errors)}")
-                return (True, Lock(validity, resource, val))
-            else:
-                for server in self._servers:
+        retry = 0
+        delay = 0.0
+        waiter = None
+        lock = None
+        error = None
+        try:
+            while True:
+                if waiter is not None:
+                    waiter.clear()
+                lock = await self._alock_attempt(
+                    resource, ttl, ttl_arg, clock_drift, val=val, acquire=acquire, new_val=new_val
+                )
+                if lock is not None:
+                    return (True, lock)
+                retry += 1
+                if not blocking and retry >= self.retry_count:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                delay = self._next_delay(retry, delay, remaining)
+                if blocking and waiter is None:
+                    waiter = await self._asubscribe_release(resource if wake is None else wake)
+                if waiter is None:
+                    await asyncio.sleep(delay)
+                else:
+                    # Woken up by a release notification, or poll once the delay elapsed.
                     try:
-                        await self._aunlock_instance(server, resource, val)
-                    except Exception:
+                        await asyncio.wait_for(waiter.wait(), delay)
+                    except asyncio.TimeoutError:
                         pass
-                retry += 1
-                restart_attempt = retry < self.retry_count
-                if restart_attempt:
-                    await asyncio.sleep(self.retry_delay)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            if waiter is not None:
+                await self._aunsubscribe_release(resource if wake is None else wake, waiter)
+            if span is not None:
+                self._end_acquire(span, resource, lock, retry if lock is None else retry + 1, error)
         return (False, None)
 
-    def lock(self, resource: str, ttl: int) -> Tuple[bool, Optional[Lock]]:
+    async def _alock_attempt(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            ttl_arg: bytes,
+            clock_drift: int,
+            previous: Optional[Union[str, bytes]] = None,
+            val: Optional[Union[str, bytes]] = None,
+            acquire: Optional[Callable[[aio_redis.Redis, Union[str, bytes], bytes], Awaitable[bool]]] = None,
+            new_val: Optional[Callable[[], Union[str, bytes]]] = None
+        ) -> Optional[Lock]:
+        """
+        Make a single attempt to acquire a lock on a quorum of the nodes asynchronously,
+        or to take it over from the previous value of a lock handed off locally.
+        """
+        # A fresh value per attempt, so that stragglers of a failed attempt which are released
+        # in the background can never delete a key set by the next attempt. A given value is the
+        # same across attempts, so every node is waited for and a failed attempt leaves no straggler.
+        quorum = self._quorum
+        if val is None:
+            val = self._get_unique_id() if new_val is None else new_val()
+        else:
+            quorum = None
+
+        t1 = time.monotonic_ns()
+        fenced = self._fencing and acquire is None
+        if fenced:
+            call = functools.partial(
+                self._afenced_lock_instance, resource=resource, previous=previous, val=val, ttl=ttl_arg
+            )
+        elif previous is not None:
+            call = functools.partial(self._aswap_instance, resource=resource, previous=previous, val=val, ttl=ttl_arg)
+        elif acquire is not None:
+            async def call(server: aio_redis.Redis) -> bool:
+                return await acquire(server, val, ttl_arg)
+        else:
+            call = functools.partial(self._alock_instance, resource=resource, val=val, ttl=ttl_arg)
+        results, redis_errors, stragglers = await self._acall_servers(call, quorum=quorum)
+        n = sum(1 for ok in results if ok)
+        fence = None
+        if fenced and n >= self._quorum:
+            fence = await self._araise_fence(resource, [ok for ok in results if ok])
+
+        # The keys were set after t1, so none of them expires before the deadline, minus the clock drift.
+        deadline = t1 + (ttl - clock_drift) * 1000000
+        validity = (deadline - time.monotonic_ns()) // 1000000
+        if self._metrics is not None:
+            self._metrics.on_quorum("acquire", resource, n - self._quorum)
+        if n >= self._quorum and (fence is not None or not fenced) and validity > 0:
+            if len(redis_errors) > 0:
+                loguru_logger.error(f"Redlock Lock Error:{MultipleRedlockException(redis_errors)}")
+            if self._metrics is not None:
+                self._metrics.on_validity(resource, ttl, validity)
+            return Lock(validity, resource, val, deadline, fence)
+
+        async def release(server: aio_redis.Redis) -> None:
+            await self._aunlock_instance(server, resource, val)
+            if previous is not None:
+                # Nodes where the handoff failed are left with the previous value.
+                await self._aunlock_instance(server, resource, previous)
+
+        await self._acall_servers(lambda server: self._arelease_instance(server, release, stragglers))
+        return None
+
+    def lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
         """
         Acquire a lock on a resource.
 
         Args:
-            resource (str): Resource to lock.
+            resource (Union[str, bytes]): Resource to lock.
             ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
 
         Returns:
             Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully and an optional Lock object.
         """
-        retry = 0
-        val = self._get_unique_id()
+        if self._coalesce_local:
+            return self._lock_coalesced(resource, ttl, blocking, timeout)
+        return self._lock(resource, ttl, blocking, timeout)
 
-        # Add 2 milliseconds to the drift to account for Redis expires
-        # precision, which is 1 millisecond, plus 1 millisecond min
-        # drift for small TTLs.
+    def _lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None,
+            val: Optional[Union[str, bytes]] = None,
+            acquire: Optional[Callable[[redis.Redis, Union[str, bytes], bytes], bool]] = None,
+            wake: Optional[Union[str, bytes]] = None,
+            new_val: Optional[Callable[[], Union[str, bytes]]] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a lock on a resource, bypassing the local queue,
+        with a fresh value per attempt, from new_val() if given, unless val is given (then every attempt waits for
+        all the nodes, even in fan-out mode), and by SET NX unless acquire(server, val, ttl) is given.
+        A blocking waiter is woken up by the releases published for the wake key, which defaults to the resource.
+        """
+        # See Redlock.alock.
         clock_drift = int(ttl * self._clock_drift_factor) + 2
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ttl_arg = self._encode_ttl(ttl)
+        span = None if self._metrics is None else self._metrics.start_span(
+            "redlock.acquire", {"resource": resource, "ttl": ttl, "blocking": blocking}
+        )
 
-        redis_errors = []
-        restart_attempt = True
-        while restart_attempt:
-            n = 0
-            del redis_errors[:]
-
-            t1 = int(time.time() * 1000)
-            for server in self._servers:
-                try:
-                    ok = self._lock_instance(server, resource, val, ttl)
-                    if ok:
-                        n += 1
-                except redis_exceptions.RedisError as e:
-                    redis_errors.append(e)
-            t2 = int(time.time() * 1000)
-            
-            validity = int(ttl - (t2 - t1) - clock_drift)
-            if n >= self._quorum and validity > 0:
-                if len(redis_errors) > 0:
-                    loguru_logger.error(f"Redlock Lock Error:{MultipleRedlockException(redis_errors)}")
-                return (True, Lock(validity, resource, val))
-            else:
-                for server in self._servers:
-                    try:
-                        self._unlock_instance(server, resource, val)
-                    except Exception:
-                        pass
+        retry = 0
+        delay = 0.0
+        waiter = None
+        lock = None
+        error = None
+        try:
+            while True:
+                if waiter is not None:
+                    waiter.clear()
+                lock = self._lock_attempt(
+                    resource, ttl, ttl_arg, clock_drift, val=val, acquire=acquire, new_val=new_val
+                )
+                if lock is not None:
+                    return (True, lock)
                 retry += 1
-                restart_attempt = retry < self.retry_count
-                if restart_attempt:
-                    time.sleep(self.retry_delay)
+                if not blocking and retry >= self.retry_count:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                delay = self._next_delay(retry, delay, remaining)
+                if blocking and waiter is None:
+                    waiter = self._subscribe_release(resource if wake is None else wake)
+                if waiter is None:
+                    time.sleep(delay)
+                else:
+                    # Woken up by a release notification, or poll once the delay elapsed.
+                    waiter.wait(delay)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            if waiter is not None:
+                self._unsubscribe_release(resource if wake is None else wake, waiter)
+            if span is not None:
+                self._end_acquire(span, resource, lock, retry if lock is None else retry + 1, error)
         return (False, None)
 
+    def _lock_attempt(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            ttl_arg: bytes,
+            clock_drift: int,
+            previous: Optional[Union[str, bytes]] = None,
+            val: Optional[Union[str, bytes]] = None,
+            acquire: Optional[Callable[[redis.Redis, Union[str, bytes], bytes], bool]] = None,
+            new_val: Optional[Callable[[], Union[str, bytes]]] = None
+        ) -> Optional[Lock]:
+        """
+        Make a single attempt to acquire a lock on a quorum of the nodes,
+        or to take it over from the previous value of a lock handed off locally.
+        """
+        # A fresh value per attempt, so that stragglers of a failed attempt which are released
+        # in the background can never delete a key set by the next attempt. A given value is the
+        # same across attempts, so every node is waited for and a failed attempt leaves no straggler.
+        quorum = self._quorum
+        if val is None:
+            val = self._get_unique_id() if new_val is None else new_val()
+        else:
+            quorum = None
+
+        t1 = time.monotonic_ns()
+        fenced = self._fencing and acquire is None
+        if fenced:
+            call = functools.partial(
+                self._fenced_lock_instance, resource=resource, previous=previous, val=val, ttl=ttl_arg
+            )
+        elif previous is not None:
+            call = functools.partial(self._swap_instance, resource=resource, previous=previous, val=val, ttl=ttl_arg)
+        elif acquire is not None:
+            def call(server: redis.Redis) -> bool:
+                return acquire(server, val, ttl_arg)
+        else:
+            call = functools.partial(self._lock_instance, resource=resource, val=val, ttl=ttl_arg)
+        results, redis_errors, stragglers = self._call_servers(call, quorum=quorum)
+        n = sum(1 for ok in results if ok)
+        fence = None
+        if fenced and n >= self._quorum:
+            fence = self._raise_fence(resource, [ok for ok in results if ok])
+
+        # The keys were set after t1, so none of them expires before the deadline, minus the clock drift.
+        deadline = t1 + (ttl - clock_drift) * 1000000
+        validity = (deadline - time.monotonic_ns()) // 1000000
+        if self._metrics is not None:
+            self._metrics.on_quorum("acquire", resource, n - self._quorum)
+        if n >= self._quorum and (fence is not None or not fenced) and validity > 0:
+            if len(redis_errors) > 0:
+                loguru_logger.error(f"Redlock Lock Error:{MultipleRedlockException(redis_errors)}")
+            if self._metrics is not None:
+                self._metrics.on_validity(resource, ttl, validity)
+            return Lock(validity, resource, val, deadline, fence)
+
+        def release(server: redis.Redis) -> None:
+            self._unlock_instance(server, resource, val)
+            if previous is not None:
+                # Nodes where the handoff failed are left with the previous value.
+                self._unlock_instance(server, resource, previous)
+
+        self._call_servers(lambda server: self._release_instance(server, release, stragglers))
+        return None
+
     async def aunlock(self, lock: Lock) -> bool:
         """
         Release a lock on a resource asynchronously.
@@ -332,16 +1347,26 @@ end"""
         Returns:
             bool: True if the lock is released successfully, False otherwise.
         """
-        redis_errors = []
-        for server in self._servers:
-            try:
-                await self._aunlock_instance(server, lock.resource, lock.val)
-            except redis_exceptions.RedisError as e:
-                redis_errors.append(e)
-        if len(redis_errors) > 0:
+        if self._coalesce_local:
+            return await self._aunlock_coalesced(lock)
+        return await self._aunlock(lock)
+
+    async def _aunlock(self, lock: Lock) -> bool:
+        """
+        Release a lock on a resource asynchronously, bypassing the local queue.
+        """
+        span = None if self._metrics is None else self._metrics.start_span(
+            "redlock.release", {"resource": lock.resource}
+        )
+        _, redis_errors, _ = await self._acall_servers(
+            lambda server: self._aunlock_instance(server, lock.resource, lock.val)
+        )
+        released = len(redis_errors) == 0
+        if not released:
             loguru_logger.error(f"Redlock Unlock Error:{MultipleRedlockException(redis_errors)}")
-            return False
-        return True
+        if span is not None:
+            self._end_span(span, self._metrics.on_release, lock, released)
+        return released
 
     def unlock(self, lock: Lock) -> bool:
         """
@@ -353,16 +1378,184 @@ end"""
         Returns:
             bool: True if the lock is released successfully, False otherwise.
         """
-        redis_errors = []
-        for server in self._servers:
-            try:
-                self._unlock_instance(server, lock.resource, lock.val)
-            except redis_exceptions.RedisError as e:
-                redis_errors.append(e)
-        if len(redis_errors) > 0:
+        if self._coalesce_local:
+            return self._unlock_coalesced(lock)
+        return self._unlock(lock)
+
+    def _unlock(self, lock: Lock) -> bool:
+        """
+        Release a lock on a resource, bypassing the local queue.
+        """
+        span = None if self._metrics is None else self._metrics.start_span(
+            "redlock.release", {"resource": lock.resource}
+        )
+        _, redis_errors, _ = self._call_servers(
+            lambda server: self._unlock_instance(server, lock.resource, lock.val)
+        )
+        released = len(redis_errors) == 0
+        if not released:
             loguru_logger.error(f"Redlock Unlock Error:{MultipleRedlockException(redis_errors)}")
-            return False
-        return True
+        if span is not None:
+            self._end_span(span, self._metrics.on_release, lock, released)
+        return released
+
+    def _local_wait(self, blocking: bool, timeout: Optional[float]) -> Optional[float]:
+        """
+        Get how long a contender may wait in the local queue.
+        """
+        if blocking:
+            return timeout
+        budget = self.retry_count * self.retry_delay
+        return budget if timeout is None else min(budget, timeout)
+
+    def _join_gate(self, resource: Union[str, bytes], factory: Callable[[], Any]) -> Union[LocalGate, AioLocalGate]:
+        with self._local_gates_lock:
+            gate = self._local_gates.get(resource)
+            if gate is None:
+                gate = self._local_gates[resource] = factory()
+            gate.waiters += 1
+            return gate
+
+    def _leave_gate(self, resource: Union[str, bytes], gate: Union[LocalGate, AioLocalGate], acquired: bool) -> Optional[Lock]:
+        """
+        Stop waiting for a local gate. A contender which gave up returns the lock handed off to it, if nobody else
+        is left to take it over, so that it is released instead of lingering until it expires.
+        """
+        with self._local_gates_lock:
+            gate.waiters -= 1
+            handoff = None
+            if acquired:
+                handoff, gate.handoff = gate.handoff, None
+            elif gate.handoff is not None and gate.waiters == 0 and not gate.lock.locked():
+                handoff, gate.handoff = gate.handoff, None
+            if gate.idle() and self._local_gates.get(resource) is gate:
+                del self._local_gates[resource]
+            return handoff
+
+    def _hold_gate(self, gate: Union[LocalGate, AioLocalGate], lock: Lock) -> None:
+        with self._local_gates_lock:
+            gate.holder = lock
+
+    def _release_gate(self, resource: Union[str, bytes], gate: Union[LocalGate, AioLocalGate]) -> None:
+        with self._local_gates_lock:
+            gate.holder = None
+            gate.lock.release()
+            if gate.idle() and self._local_gates.get(resource) is gate:
+                del self._local_gates[resource]
+
+    def _detach_gate(self, lock: Lock) -> Tuple[Optional[Union[LocalGate, AioLocalGate]], bool]:
+        """
+        Detach a lock being released from its local gate. The lock is handed off to the next local contender
+        if there is one, otherwise the gate is returned, to be released once the lock is released on the nodes.
+        """
+        with self._local_gates_lock:
+            gate = self._local_gates.get(lock.resource)
+            if gate is None or gate.holder is None or gate.holder.val != lock.val:
+                return None, False
+            gate.holder = None
+            if gate.waiters > 0:
+                gate.handoff = lock
+                gate.lock.release()
+                return None, True
+            return gate, False
+
+    async def _alock_coalesced(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool,
+            timeout: Optional[float]
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a lock on a resource asynchronously, behind the local queue of the resource.
+        """
+        started = time.monotonic()
+        gate = self._join_gate(resource, AioLocalGate)
+        try:
+            await asyncio.wait_for(gate.lock.acquire(), self._local_wait(blocking, timeout))
+        except BaseException as exc:
+            handoff = self._leave_gate(resource, gate, False)
+            if handoff is not None:
+                self._adopt_background_task(asyncio.ensure_future(self._aunlock(handoff)))
+            if isinstance(exc, asyncio.TimeoutError):
+                return (False, None)
+            raise
+        lock = None
+        try:
+            handoff = self._leave_gate(resource, gate, True)
+            if handoff is not None and not handoff.is_expired():
+                # See Redlock.alock.
+                clock_drift = int(ttl * self._clock_drift_factor) + 2
+                lock = await self._alock_attempt(resource, ttl, self._encode_ttl(ttl), clock_drift, previous=handoff.val)
+            if lock is None:
+                remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+                _, lock = await self._alock(resource, ttl, blocking, remaining)
+        finally:
+            if lock is None:
+                self._release_gate(resource, gate)
+        if lock is None:
+            return (False, None)
+        self._hold_gate(gate, lock)
+        return (True, lock)
+
+    def _lock_coalesced(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool,
+            timeout: Optional[float]
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a lock on a resource, behind the local queue of the resource.
+        """
+        started = time.monotonic()
+        gate = self._join_gate(resource, LocalGate)
+        wait = self._local_wait(blocking, timeout)
+        acquired = False
+        try:
+            acquired = gate.lock.acquire(timeout=-1 if wait is None else wait)
+        finally:
+            handoff = self._leave_gate(resource, gate, acquired)
+            if not acquired and handoff is not None:
+                self._unlock(handoff)
+        if not acquired:
+            return (False, None)
+        lock = None
+        try:
+            if handoff is not None and not handoff.is_expired():
+                # See Redlock.alock.
+                clock_drift = int(ttl * self._clock_drift_factor) + 2
+                lock = self._lock_attempt(resource, ttl, self._encode_ttl(ttl), clock_drift, previous=handoff.val)
+            if lock is None:
+                remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+                _, lock = self._lock(resource, ttl, blocking, remaining)
+        finally:
+            if lock is None:
+                self._release_gate(resource, gate)
+        if lock is None:
+            return (False, None)
+        self._hold_gate(gate, lock)
+        return (True, lock)
+
+    async def _aunlock_coalesced(self, lock: Lock) -> bool:
+        gate, handed_off = self._detach_gate(lock)
+        if handed_off:
+            return True
+        try:
+            return await self._aunlock(lock)
+        finally:
+            if gate is not None:
+                self._release_gate(lock.resource, gate)
+
+    def _unlock_coalesced(self, lock: Lock) -> bool:
+        gate, handed_off = self._detach_gate(lock)
+        if handed_off:
+            return True
+        try:
+            return self._unlock(lock)
+        finally:
+            if gate is not None:
+                self._release_gate(lock.resource, gate)
 
     async def aextend(self, lock: Lock, ttl: int) -> bool:
         """
@@ -375,17 +1568,19 @@ end"""
         Returns:
             bool: True if the lock is extended successfully, False otherwise.
         """
-        redis_errors = []
-        n = 0
-        for server in self._servers:
-            try:
-                ok = await self._aextend_instance(server, lock.resource, lock.val, ttl)
-                if ok:
-                    n += 1
-            except redis_exceptions.RedisError as e:
-                redis_errors.append(e)
+        span = None if self._metrics is None else self._metrics.start_span(
+            "redlock.extend", {"resource": lock.resource, "ttl": ttl}
+        )
+        results, redis_errors, _ = await self._acall_servers(
+            lambda server: self._aextend_instance(server, lock.resource, lock.val, ttl),
+            quorum=self._quorum
+        )
+        n = sum(1 for ok in results if ok)
         if len(redis_errors) > 0:
             loguru_logger.error(f"Redlock Extend Error:{MultipleRedlockException(redis_errors)}")
+        if span is not None:
+            self._metrics.on_quorum("extend", lock.resource, n - self._quorum)
+            self._end_span(span, self._metrics.on_extend, lock, n >= self._quorum)
         return n >= self._quorum
 
     def extend(self, lock: Lock, ttl: int) -> bool:
@@ -399,15 +1594,215 @@ end"""
         Returns:
             bool: True if the lock is extended successfully, False otherwise.
         """
-        redis_errors = []
-        n = 0
-        for server in self._servers:
-            try:
-                ok = self._extend_instance(server, lock.resource, lock.val, ttl)
-                if ok:
-                    n += 1
-            except redis_exceptions.RedisError as e:
-                redis_errors.append(e)
+        span = None if self._metrics is None else self._metrics.start_span(
+            "redlock.extend", {"resource": lock.resource, "ttl": ttl}
+        )
+        results, redis_errors, _ = self._call_servers(
+            lambda server: self._extend_instance(server, lock.resource, lock.val, ttl),
+            quorum=self._quorum
+        )
+        n = sum(1 for ok in results if ok)
         if len(redis_errors) > 0:
             loguru_logger.error(f"Redlock Extend Error:{MultipleRedlockException(redis_errors)}")
+        if span is not None:
+            self._metrics.on_quorum("extend", lock.resource, n - self._quorum)
+            self._end_span(span, self._metrics.on_extend, lock, n >= self._quorum)
         return n >= self._quorum
+
+    def _tally_lock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            results: List[Any],
+            all_or_nothing: bool
+        ) -> List[Union[str, bytes]]:
+        """
+        Find the resources which were acquired on a quorum of the nodes.
+        """
+        if all_or_nothing:
+            return resources if sum(1 for ok in results if ok) >= self._quorum else []
+        votes = [0] * len(resources)
+        for acquired in results:
+            for i, ok in enumerate(acquired):
+                votes[i] += ok
+        return [resource for resource, n in zip(resources, votes) if n >= self._quorum]
+
+    async def alock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Acquire locks on a set of resources asynchronously, with a single script call per node.
+
+        Args:
+            resources (List[Union[str, bytes]]): Resources to lock.
+            ttl (int): Time-to-live for the locks in milliseconds.
+            all_or_nothing (bool, optional): Whether each node must grant all of the resources or none of them.
+                Otherwise each resource is voted on by the quorum independently. Defaults to True.
+
+        Returns:
+            Tuple[bool, List[Lock]]: A tuple containing a boolean indicating whether the locks are acquired successfully
+            and the acquired Lock objects, which share the same validity.
+
+        Notes:
+            In all-or-nothing mode a node grants the set only if none of the resources is held there, and the set is
+            acquired when a quorum of the nodes granted it. Otherwise every resource which reached the quorum is kept,
+            the others are rolled back, and the attempt succeeds if at least one resource was acquired;
+            compare the returned locks with the requested resources to find out which ones are held.
+        """
+        resources = list(dict.fromkeys(resources))
+        if len(resources) == 0:
+            raise ValueError("resources must not be empty")
+        ttl_arg = self._encode_ttl(ttl)
+        retry = 0
+        delay = 0.0
+
+        # See Redlock.alock.
+        clock_drift = int(ttl * self._clock_drift_factor) + 2
+
+        restart_attempt = True
+        while restart_attempt:
+            val = self._get_unique_id()
+
+            t1 = time.monotonic_ns()
+            results, redis_errors, stragglers = await self._acall_servers(
+                functools.partial(
+                    self._alock_many_instance,
+                    resources=resources, val=val, ttl=ttl_arg, all_or_nothing=all_or_nothing
+                ),
+                quorum=self._quorum if all_or_nothing else None
+            )
+            acquired = self._tally_lock_many(resources, results, all_or_nothing)
+
+            deadline = t1 + (ttl - clock_drift) * 1000000
+            validity = (deadline - time.monotonic_ns()) // 1000000
+            released = [resource for resource in resources if resource not in acquired] if validity > 0 else resources
+            if len(released) > 0:
+                # Bound now, as the release of a straggler runs once it replied, possibly during the next attempt.
+                release = functools.partial(self._aunlock_many_instance, resources=released, val=val)
+                await self._acall_servers(
+                    functools.partial(self._arelease_instance, release=release, stragglers=stragglers)
+                )
+            if len(released) < len(resources):
+                if len(redis_errors) > 0:
+                    loguru_logger.error(f"Redlock Lock Error:{MultipleRedlockException(redis_errors)}")
+                return (True, [Lock(validity, resource, val, deadline) for resource in acquired])
+            retry += 1
+            restart_attempt = retry < self.retry_count
+            if restart_attempt:
+                delay = self._next_delay(retry, delay, None)
+                await asyncio.sleep(delay)
+        return (False, [])
+
+    def lock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Acquire locks on a set of resources, with a single script call per node.
+
+        Args:
+            resources (List[Union[str, bytes]]): Resources to lock.
+            ttl (int): Time-to-live for the locks in milliseconds.
+            all_or_nothing (bool, optional): Whether each node must grant all of the resources or none of them.
+                Otherwise each resource is voted on by the quorum independently. Defaults to True.
+
+        Returns:
+            Tuple[bool, List[Lock]]: A tuple containing a boolean indicating whether the locks are acquired successfully
+            and the acquired Lock objects, which share the same validity.
+        """
+        resources = list(dict.fromkeys(resources))
+        if len(resources) == 0:
+            raise ValueError("resources must not be empty")
+        ttl_arg = self._encode_ttl(ttl)
+        retry = 0
+        delay = 0.0
+
+        # See Redlock.alock.
+        clock_drift = int(ttl * self._clock_drift_factor) + 2
+
+        restart_attempt = True
+        while restart_attempt:
+            val = self._get_unique_id()
+
+            t1 = time.monotonic_ns()
+            results, redis_errors, stragglers = self._call_servers(
+                functools.partial(
+                    self._lock_many_instance,
+                    resources=resources, val=val, ttl=ttl_arg, all_or_nothing=all_or_nothing
+                ),
+                quorum=self._quorum if all_or_nothing else None
+            )
+            acquired = self._tally_lock_many(resources, results, all_or_nothing)
+
+            deadline = t1 + (ttl - clock_drift) * 1000000
+            validity = (deadline - time.monotonic_ns()) // 1000000
+            released = [resource for resource in resources if resource not in acquired] if validity > 0 else resources
+            if len(released) > 0:
+                # Bound now, as the release of a straggler runs once it replied, possibly during the next attempt.
+                release = functools.partial(self._unlock_many_instance, resources=released, val=val)
+                self._call_servers(
+                    functools.partial(self._release_instance, release=release, stragglers=stragglers)
+                )
+            if len(released) < len(resources):
+                if len(redis_errors) > 0:
+                    loguru_logger.error(f"Redlock Lock Error:{MultipleRedlockException(redis_errors)}")
+                return (True, [Lock(validity, resource, val, deadline) for resource in acquired])
+            retry += 1
+            restart_attempt = retry < self.retry_count
+            if restart_attempt:
+                delay = self._next_delay(retry, delay, None)
+                time.sleep(delay)
+        return (False, [])
+
+    async def aunlock_many(self, locks: List[Lock]) -> bool:
+        """
+        Release locks on a set of resources asynchronously, with a single script call per node and lock value.
+
+        Args:
+            locks (List[Lock]): Lock objects to release.
+
+        Returns:
+            bool: True if the locks are released successfully, False otherwise.
+        """
+        redis_errors = []
+        for val, resources in self._group_by_val(locks).items():
+            _, errors, _ = await self._acall_servers(
+                lambda server: self._aunlock_many_instance(server, resources, val)
+            )
+            redis_errors.extend(errors)
+        if len(redis_errors) > 0:
+            loguru_logger.error(f"Redlock Unlock Error:{MultipleRedlockException(redis_errors)}")
+            return False
+        return True
+
+    def unlock_many(self, locks: List[Lock]) -> bool:
+        """
+        Release locks on a set of resources, with a single script call per node and lock value.
+
+        Args:
+            locks (List[Lock]): Lock objects to release.
+
+        Returns:
+            bool: True if the locks are released successfully, False otherwise.
+        """
+        redis_errors = []
+        for val, resources in self._group_by_val(locks).items():
+            _, errors, _ = self._call_servers(
+                lambda server: self._unlock_many_instance(server, resources, val)
+            )
+            redis_errors.extend(errors)
+        if len(redis_errors) > 0:
+            loguru_logger.error(f"Redlock Unlock Error:{MultipleRedlockException(redis_errors)}")
+            return False
+        return True
+
+    @staticmethod
+    def _group_by_val(locks: List[Lock]) -> Dict[Union[str, bytes], List[Union[str, bytes]]]:
+        groups = {}
+        for lock in locks:
+            groups.setdefault(lock.val, []).append(lock.resource)
+        return groups
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import redis
+import redis.asyncio as aio_redis
+import threading
+import time
+import weakref
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .redlock import Lock, Redlock
+
+
+class _Hold(object):
+    """A reentrant lock held by one owner through a ReentrantRedlock."""
+
+    __slots__ = ("lock", "count", "remote")
+
+    def __init__(self, lock: Lock) -> None:
+        self.lock = lock
+        # Number of holds, and how many of them were counted on the nodes.
+        self.count = 0
+        self.remote = 0
+
+
+class ReentrantRedlock(Redlock):
+    """A distributed lock which can be acquired again by the owner which holds it."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Initialize the ReentrantRedlock, see Redlock for the arguments.
+
+        Attributes:
+            _holds (Dict[Tuple[Union[str, bytes], Union[str, bytes]], _Hold]): The locks held through this instance
+                by (resource, owner).
+            _thread_owners (threading.local): The owner token of each thread.
+            _task_owners (weakref.WeakKeyDictionary): The owner token of each asyncio task.
+            _reentrant_lock_script (str): Lua script to acquire, or re-acquire, a lock for an owner.
+            _reentrant_unlock_script (str): Lua script to release one hold of a lock.
+            _reentrant_extend_script (str): Lua script to extend a lock held by an owner.
+
+        Notes:
+            A lock is a hash on each node, mapping its owner to the number of times the owner holds it,
+            like the reentrant lock of Redisson. The owner is the calling thread for lock/unlock and the calling
+            task for alock/aunlock, or any token passed as owner, e.g. to share a lock across processes.
+            Acquiring a lock which the owner already holds through this instance, and whose validity has not
+            elapsed, only increments a local counter; otherwise the acquisition runs the quorum protocol with
+            a script which increments the count of the owner and resets the ttl. Releasing decrements the counter,
+            and the lock is deleted, and its release published, once the count of the owner drops to 0.
+            extend/aextend push the local validity forward, but renewals by a watchdog do not, so a lock kept alive
+            by a watchdog past its first validity is acquired again through the nodes.
+
+            The resources of reentrant locks must not be locked by a plain Redlock, which stores a string under
+            the key; for the same reason lock_many/alock_many raise ValueError.
+            Local coalescing is not supported, as the local queue is not reentrant, and neither are fencing tokens.
+        """
+        super(ReentrantRedlock, self).__init__(*args, **kwargs)
+        if self._coalesce_local:
+            raise ValueError("coalesce_local is not supported by ReentrantRedlock")
+        if self._fencing:
+            raise ValueError("fencing is not supported by ReentrantRedlock")
+        self._holds: Dict[Tuple[Union[str, bytes], Union[str, bytes]], _Hold] = {}
+        self._holds_lock = threading.Lock()
+        self._thread_owners = threading.local()
+        self._task_owners = weakref.WeakKeyDictionary()
+
+        self._reentrant_lock_script = """if redis.call("EXISTS",KEYS[1]) == 0 or redis.call("HEXISTS",KEYS[1],ARGV[1]) == 1 then
+    local n = redis.call("HINCRBY",KEYS[1],ARGV[1],1)
+    redis.call("PEXPIRE",KEYS[1],ARGV[2])
+    return n
+else
+    return 0
+end"""
+        self._reentrant_unlock_script = """if redis.call("HEXISTS",KEYS[1],ARGV[1]) == 0 then
+    return 0
+end
+if redis.call("HINCRBY",KEYS[1],ARGV[1],-1) > 0 then
+    return 1
+end
+redis.call("DEL",KEYS[1])
+if ARGV[2] then
+    redis.call("PUBLISH",ARGV[2]..KEYS[1],KEYS[1])
+end
+return 1"""
+        self._reentrant_extend_script = """if redis.call("HEXISTS",KEYS[1],ARGV[1]) == 1 then
+    return redis.call("PEXPIRE",KEYS[1],ARGV[2])
+else
+    return 0
+end"""
+        self._scripts.register("reentrant_lock", self._reentrant_lock_script)
+        self._scripts.register("reentrant_unlock", self._reentrant_unlock_script)
+        self._scripts.register("reentrant_extend", self._reentrant_extend_script)
+
+    async def _alock_instance(
+            self,
+            server: aio_redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: bytes
+        ) -> bool:
+        return bool(await self._scripts.aexecute(server, "reentrant_lock", (resource,), (val, ttl)))
+
+    def _lock_instance(
+            self,
+            server: redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: bytes
+        ) -> bool:
+        return bool(self._scripts.execute(server, "reentrant_lock", (resource,), (val, ttl)))
+
+    async def _aunlock_instance(
+            self,
+            server: aio_redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes]
+        ) -> bool:
+        return await self._scripts.aexecute(server, "reentrant_unlock", (resource,), self._unlock_args(val)) == 1
+
+    def _unlock_instance(
+            self,
+            server: redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes]
+        ) -> bool:
+        return self._scripts.execute(server, "reentrant_unlock", (resource,), self._unlock_args(val)) == 1
+
+    async def _aextend_instance(
+            self,
+            server: aio_redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: int
+        ) -> bool:
+        return await self._scripts.aexecute(server, "reentrant_extend", (resource,), (val, ttl)) == 1
+
+    def _extend_instance(
+            self,
+            server: redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: int
+        ) -> bool:
+        return self._scripts.execute(server, "reentrant_extend", (resource,), (val, ttl)) == 1
+
+    def _extend_command(self, lock: Lock, ttl: int) -> Tuple[str, Tuple[Any, ...], Tuple[Any, ...]]:
+        return ("reentrant_extend", (lock.resource,), (lock.val, ttl))
+
+    def _thread_owner(self) -> Union[str, bytes]:
+        owner = getattr(self._thread_owners, "owner", None)
+        if owner is None:
+            owner = self._thread_owners.owner = self._get_unique_id()
+        return owner
+
+    def _task_owner(self) -> Union[str, bytes]:
+        task = asyncio.current_task()
+        owner = self._task_owners.get(task)
+        if owner is None:
+            owner = self._task_owners[task] = self._get_unique_id()
+        return owner
+
+    def _reenter(self, resource: Union[str, bytes], owner: Union[str, bytes]) -> Optional[Lock]:
+        """
+        Take one more hold of a lock the owner holds through this instance, without talking to Redis,
+        unless its validity has elapsed.
+        """
+        with self._holds_lock:
+            hold = self._holds.get((resource, owner))
+            if hold is None or hold.lock.is_expired():
+                return None
+            hold.count += 1
+            return hold.lock
+
+    def _enter(self, lock: Lock) -> None:
+        with self._holds_lock:
+            hold = self._holds.get((lock.resource, lock.val))
+            if hold is None:
+                hold = self._holds[(lock.resource, lock.val)] = _Hold(lock)
+            hold.lock = lock
+            hold.count += 1
+            hold.remote += 1
+
+    def _exit(self, lock: Lock) -> bool:
+        """
+        Drop one hold of a lock, and tell whether it has to be released on the nodes.
+        """
+        with self._holds_lock:
+            hold = self._holds.get((lock.resource, lock.val))
+            if hold is None:
+                return True
+            hold.count -= 1
+            if hold.count == 0:
+                del self._holds[(lock.resource, lock.val)]
+            if hold.count < hold.remote:
+                hold.remote -= 1
+                return True
+            return False
+
+    def _refresh(self, lock: Lock, ttl: int, started: int) -> None:
+        # See Redlock.alock.
+        deadline = started + (ttl - int(ttl * self._clock_drift_factor) - 2) * 1000000
+        with self._holds_lock:
+            hold = self._holds.get((lock.resource, lock.val))
+            if hold is not None:
+                hold.lock = hold.lock._replace(
+                    validity=max(0, (deadline - time.monotonic_ns()) // 1000000),
+                    deadline=deadline
+                )
+
+    async def alock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None,
+            owner: Optional[Union[str, bytes]] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a lock on a resource asynchronously, or acquire it again if the owner already holds it.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+            owner (Optional[Union[str, bytes]], optional): The owner of the lock. Defaults to None (the current task).
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully
+            and an optional Lock object, whose val is the owner. A lock acquired again locally is the Lock object
+            of the outer acquisition.
+        """
+        if owner is None:
+            owner = self._task_owner()
+        lock = self._reenter(resource, owner)
+        if lock is not None:
+            return (True, lock)
+        success, lock = await self._alock(resource, ttl, blocking, timeout, val=owner)
+        if success:
+            self._enter(lock)
+        return (success, lock)
+
+    def lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None,
+            owner: Optional[Union[str, bytes]] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a lock on a resource, or acquire it again if the owner already holds it.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+            owner (Optional[Union[str, bytes]], optional): The owner of the lock. Defaults to None (the current thread).
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully
+            and an optional Lock object, whose val is the owner. A lock acquired again locally is the Lock object
+            of the outer acquisition.
+        """
+        if owner is None:
+            owner = self._thread_owner()
+        lock = self._reenter(resource, owner)
+        if lock is not None:
+            return (True, lock)
+        success, lock = self._lock(resource, ttl, blocking, timeout, val=owner)
+        if success:
+            self._enter(lock)
+        return (success, lock)
+
+    async def aunlock(self, lock: Lock) -> bool:
+        """
+        Release one hold of a lock on a resource asynchronously.
+
+        Args:
+            lock (Lock): Lock object to release.
+
+        Returns:
+            bool: True if the hold is released successfully, False otherwise.
+        """
+        if not self._exit(lock):
+            return True
+        return await self._aunlock(lock)
+
+    def unlock(self, lock: Lock) -> bool:
+        """
+        Release one hold of a lock on a resource.
+
+        Args:
+            lock (Lock): Lock object to release.
+
+        Returns:
+            bool: True if the hold is released successfully, False otherwise.
+        """
+        if not self._exit(lock):
+            return True
+        return self._unlock(lock)
+
+    async def aextend(self, lock: Lock, ttl: int) -> bool:
+        """
+        Extend the validity of a lock on a resource asynchronously, for all the holds of its owner.
+
+        Args:
+            lock (Lock): Lock object to extend.
+            ttl (int): New time-to-live for the lock in milliseconds.
+
+        Returns:
+            bool: True if the lock is extended successfully, False otherwise.
+        """
+        started = time.monotonic_ns()
+        extended = await super(ReentrantRedlock, self).aextend(lock, ttl)
+        if extended:
+            self._refresh(lock, ttl, started)
+        return extended
+
+    def extend(self, lock: Lock, ttl: int) -> bool:
+        """
+        Extend the validity of a lock on a resource, for all the holds of its owner.
+
+        Args:
+            lock (Lock): Lock object to extend.
+            ttl (int): New time-to-live for the lock in milliseconds.
+
+        Returns:
+            bool: True if the lock is extended successfully, False otherwise.
+        """
+        started = time.monotonic_ns()
+        extended = super(ReentrantRedlock, self).extend(lock, ttl)
+        if extended:
+            self._refresh(lock, ttl, started)
+        return extended
+
+    async def alock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Not supported by ReentrantRedlock, as it would store plain lock values under the keys of the resources.
+
+        Raises:
+            ValueError: Always.
+        """
+        raise ValueError("lock_many is not supported by ReentrantRedlock")
+
+    def lock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Not supported by ReentrantRedlock, as it would store plain lock values under the keys of the resources.
+
+        Raises:
+            ValueError: Always.
+        """
+        raise ValueError("lock_many is not supported by ReentrantRedlock")
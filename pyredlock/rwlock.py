@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+import functools
+import redis
+import redis.asyncio as aio_redis
+
+from typing import Any, List, Optional, Tuple, Union
+
+from .redlock import Lock, Redlock
+
+
+class RedlockRW(Redlock):
+    """A distributed read-write lock: shared read locks and exclusive write locks."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Initialize the RedlockRW, see Redlock for the arguments.
+
+        Attributes:
+            _read_lock_script (str): Lua script to acquire a read lock.
+            _write_lock_script (str): Lua script to acquire a write lock.
+            _rw_unlock_script (str): Lua script to release a read or a write lock.
+            _rw_extend_script (str): Lua script to extend a read or a write lock.
+            _rw_abandon_script (str): Lua script to withdraw the intent of a writer which gave up.
+
+        Notes:
+            On each node a resource is made of three keys: the resource itself, holding the value of the write lock
+            like a plain Redlock, "<resource>:readers", a sorted set of the values of the read locks scored by
+            their expiry time in milliseconds (on the clock of the node), and "<resource>:writer-waiting",
+            the intent of a writer. Each lock is acquired on a quorum of the nodes with the usual clock drift
+            accounting, so any number of readers hold the resource at once, and a writer holds it alone.
+
+            Writers are preferred, so that a steady stream of readers cannot starve them: a write attempt
+            which fails sets the intent of the writer for the ttl, and no read lock is granted while it is set.
+            The intent is cleared when a writer gets the lock, or by the writer which set it when it gives up.
+            The scripts read the clock of the node with TIME before writing, which requires Redis 5 or later.
+
+            Releasing the write lock, or the last read lock, publishes on the release channel of the resource,
+            see release_channel_prefix. lock/alock acquire the write lock. lock_many/alock_many raise
+            ValueError, and local coalescing and fencing tokens are not supported.
+        """
+        super(RedlockRW, self).__init__(*args, **kwargs)
+        if self._coalesce_local:
+            raise ValueError("coalesce_local is not supported by RedlockRW")
+        if self._fencing:
+            raise ValueError("fencing is not supported by RedlockRW")
+
+        self._read_lock_script = """if redis.call("EXISTS",KEYS[1]) == 1 or redis.call("EXISTS",KEYS[3]) == 1 then
+    return 0
+end
+local now = redis.call("TIME")
+now = now[1] * 1000 + math.floor(now[2] / 1000)
+redis.call("ZREMRANGEBYSCORE",KEYS[2],"-inf",now)
+redis.call("ZADD",KEYS[2],now + ARGV[2],ARGV[1])
+if redis.call("PTTL",KEYS[2]) < tonumber(ARGV[2]) then
+    redis.call("PEXPIRE",KEYS[2],ARGV[2])
+end
+return 1"""
+        self._write_lock_script = """local now = redis.call("TIME")
+now = now[1] * 1000 + math.floor(now[2] / 1000)
+redis.call("ZREMRANGEBYSCORE",KEYS[2],"-inf",now)
+if redis.call("EXISTS",KEYS[2]) == 0 and redis.call("SET",KEYS[1],ARGV[1],"NX","PX",ARGV[2]) then
+    redis.call("DEL",KEYS[3])
+    return 1
+end
+redis.call("SET",KEYS[3],ARGV[1],"PX",ARGV[2])
+return 0"""
+        self._rw_unlock_script = """local n
+if redis.call("GET",KEYS[1]) == ARGV[1] then
+    n = redis.call("DEL",KEYS[1])
+else
+    n = redis.call("ZREM",KEYS[2],ARGV[1])
+    if n == 1 and redis.call("ZCARD",KEYS[2]) > 0 then
+        return n
+    end
+end
+if n == 1 and ARGV[2] then
+    redis.call("PUBLISH",ARGV[2]..KEYS[1],KEYS[1])
+end
+return n"""
+        self._rw_extend_script = """if redis.call("GET",KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE",KEYS[1],ARGV[2])
+end
+local now = redis.call("TIME")
+now = now[1] * 1000 + math.floor(now[2] / 1000)
+local expires = redis.call("ZSCORE",KEYS[2],ARGV[1])
+if not expires or tonumber(expires) <= now then
+    return 0
+end
+redis.call("ZADD",KEYS[2],now + ARGV[2],ARGV[1])
+if redis.call("PTTL",KEYS[2]) < tonumber(ARGV[2]) then
+    redis.call("PEXPIRE",KEYS[2],ARGV[2])
+end
+return 1"""
+        self._rw_abandon_script = """local intent = redis.call("GET",KEYS[3])
+for i = 2, #ARGV do
+    if intent == ARGV[i] then
+        redis.call("DEL",KEYS[3])
+        if ARGV[1] ~= "" then
+            redis.call("PUBLISH",ARGV[1]..KEYS[1],KEYS[1])
+        end
+        return 1
+    end
+end
+return 0"""
+        self._scripts.register("read_lock", self._read_lock_script)
+        self._scripts.register("write_lock", self._write_lock_script)
+        self._scripts.register("rw_unlock", self._rw_unlock_script)
+        self._scripts.register("rw_extend", self._rw_extend_script)
+        self._scripts.register("rw_abandon", self._rw_abandon_script)
+
+    @staticmethod
+    def _rw_keys(resource: Union[str, bytes]) -> Tuple[Union[str, bytes], ...]:
+        """
+        Get the keys of a resource: the write lock, the read locks and the intent of a waiting writer.
+        """
+        if isinstance(resource, bytes):
+            return (resource, resource + b":readers", resource + b":writer-waiting")
+        return (resource, resource + ":readers", resource + ":writer-waiting")
+
+    async def _aunlock_instance(
+            self,
+            server: aio_redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes]
+        ) -> bool:
+        return await self._scripts.aexecute(server, "rw_unlock", self._rw_keys(resource), self._unlock_args(val)) == 1
+
+    def _unlock_instance(
+            self,
+            server: redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes]
+        ) -> bool:
+        return self._scripts.execute(server, "rw_unlock", self._rw_keys(resource), self._unlock_args(val)) == 1
+
+    async def _aextend_instance(
+            self,
+            server: aio_redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: int
+        ) -> bool:
+        return await self._scripts.aexecute(server, "rw_extend", self._rw_keys(resource), (val, ttl)) == 1
+
+    def _extend_instance(
+            self,
+            server: redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: int
+        ) -> bool:
+        return self._scripts.execute(server, "rw_extend", self._rw_keys(resource), (val, ttl)) == 1
+
+    def _extend_command(self, lock: Lock, ttl: int) -> Tuple[str, Tuple[Any, ...], Tuple[Any, ...]]:
+        return ("rw_extend", self._rw_keys(lock.resource), (lock.val, ttl))
+
+    def _abandon_args(self, vals: List[bytes]) -> Tuple[Any, ...]:
+        """
+        Get the arguments of rw_abandon: the release channel prefix, or "", then the values of the attempts of a writer.
+        """
+        prefix = "" if self._release_channel_prefix is None else self._release_channel_prefix
+        return (prefix, *vals)
+
+    def _recorded_val(self, vals: List[bytes]) -> bytes:
+        """
+        Generate the value of a write attempt, recording it so that the writer can withdraw its own intent only.
+        """
+        val = self._get_unique_id()
+        vals.append(val)
+        return val
+
+    async def aread_lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a read lock on a resource asynchronously, shared with the other readers.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully and an optional Lock object.
+        """
+        keys = self._rw_keys(resource)
+        return await self._alock(
+            resource, ttl, blocking, timeout,
+            acquire=lambda server, val, ttl_arg: self._scripts.aexecute(server, "read_lock", keys, (val, ttl_arg))
+        )
+
+    def read_lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a read lock on a resource, shared with the other readers.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully and an optional Lock object.
+        """
+        keys = self._rw_keys(resource)
+        return self._lock(
+            resource, ttl, blocking, timeout,
+            acquire=lambda server, val, ttl_arg: self._scripts.execute(server, "read_lock", keys, (val, ttl_arg))
+        )
+
+    async def awrite_lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire the write lock on a resource asynchronously, once the readers released it.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully and an optional Lock object.
+        """
+        keys = self._rw_keys(resource)
+        vals = []
+        success, lock = await self._alock(
+            resource, ttl, blocking, timeout, new_val=functools.partial(self._recorded_val, vals),
+            acquire=lambda server, val, ttl_arg: self._scripts.aexecute(server, "write_lock", keys, (val, ttl_arg))
+        )
+        if not success:
+            # Let the readers in again, unless another writer set the intent since.
+            args = self._abandon_args(vals)
+            await self._acall_servers(lambda server: self._scripts.aexecute(server, "rw_abandon", keys, args))
+        return (success, lock)
+
+    def write_lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire the write lock on a resource, once the readers released it.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully and an optional Lock object.
+        """
+        keys = self._rw_keys(resource)
+        vals = []
+        success, lock = self._lock(
+            resource, ttl, blocking, timeout, new_val=functools.partial(self._recorded_val, vals),
+            acquire=lambda server, val, ttl_arg: self._scripts.execute(server, "write_lock", keys, (val, ttl_arg))
+        )
+        if not success:
+            # Let the readers in again, unless another writer set the intent since.
+            args = self._abandon_args(vals)
+            self._call_servers(lambda server: self._scripts.execute(server, "rw_abandon", keys, args))
+        return (success, lock)
+
+    async def alock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire the write lock on a resource asynchronously, see RedlockRW.awrite_lock.
+        """
+        return await self.awrite_lock(resource, ttl, blocking, timeout)
+
+    def lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire the write lock on a resource, see RedlockRW.write_lock.
+        """
+        return self.write_lock(resource, ttl, blocking, timeout)
+
+    async def alock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Not supported by RedlockRW, as it would store plain lock values under the keys of the resources.
+
+        Raises:
+            ValueError: Always.
+        """
+        raise ValueError("lock_many is not supported by RedlockRW")
+
+    def lock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Not supported by RedlockRW, as it would store plain lock values under the keys of the resources.
+
+        Raises:
+            ValueError: Always.
+        """
+        raise ValueError("lock_many is not supported by RedlockRW")
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import redis
+import redis.asyncio as aio_redis
+import redis.exceptions as redis_exceptions
+
+from collections import namedtuple
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+Script = namedtuple("Script", ("name", "source", "sha"))
+
+
+class ScriptRegistry(object):
+    """A registry of Lua scripts which are invoked by EVALSHA instead of shipping their source on every call."""
+
+    def __init__(self) -> None:
+        """
+        Initialize the ScriptRegistry.
+
+        Attributes:
+            _scripts (Dict[str, Script]): Registered scripts by name.
+            _loaded (Dict[int, Set[str]]): Names of the scripts loaded into each connection, by connection id.
+            hits (int): Number of calls served by EVALSHA.
+            misses (int): Number of calls which hit NOSCRIPT and fell back to EVAL.
+            loads (int): Number of SCRIPT LOAD calls issued.
+
+        Notes:
+            A script is loaded with SCRIPT LOAD the first time it is used on a connection, and invoked by
+            its SHA1 digest afterwards. When the server has lost its script cache (after a failover, a restart
+            or a SCRIPT FLUSH) EVALSHA fails with NOSCRIPT; the call is then transparently retried with EVAL,
+            which also puts the script back into the server's cache.
+        """
+        self._scripts: Dict[str, Script] = {}
+        self._loaded: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def register(self, name: str, source: str) -> Script:
+        """
+        Register a Lua script.
+
+        Args:
+            name (str): Name of the script.
+            source (str): Lua source of the script.
+
+        Returns:
+            Script: The registered script.
+        """
+        script = Script(name, source, hashlib.sha1(source.encode("utf-8")).hexdigest())
+        self._scripts[name] = script
+        return script
+
+    def get(self, name: str) -> Script:
+        """
+        Get a registered script by name.
+
+        Args:
+            name (str): Name of the script.
+
+        Returns:
+            Script: The registered script.
+        """
+        return self._scripts[name]
+
+    def is_loaded(self, server: Any, name: str) -> bool:
+        """
+        Check whether a script is known to be loaded into a connection.
+        """
+        return name in self._loaded.get(id(server), ())
+
+    def mark_loaded(self, server: Any, name: str) -> None:
+        self._loaded.setdefault(id(server), set()).add(name)
+
+    def mark_unloaded(self, server: Any, name: str) -> None:
+        self._loaded.get(id(server), set()).discard(name)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the script cache counters.
+
+        Returns:
+            Dict[str, int]: The number of EVALSHA hits, NOSCRIPT misses and SCRIPT LOAD calls.
+        """
+        return {"hits": self.hits, "misses": self.misses, "loads": self.loads}
+
+    async def aexecute(
+            self,
+            server: aio_redis.Redis,
+            name: str,
+            keys: Sequence[Any],
+            args: Sequence[Any]
+        ) -> Any:
+        """
+        Run a registered script on a connection asynchronously.
+
+        Args:
+            server (aio_redis.Redis): The Redis connection.
+            name (str): Name of the script.
+            keys (Sequence[Any]): The KEYS of the script.
+            args (Sequence[Any]): The ARGV of the script.
+
+        Returns:
+            Any: The reply of the script.
+        """
+        script = self._scripts[name]
+        if not self.is_loaded(server, name):
+            await server.execute_command("SCRIPT", "LOAD", script.source)
+            self.loads += 1
+            self.mark_loaded(server, name)
+        try:
+            reply = await server.execute_command("EVALSHA", script.sha, len(keys), *keys, *args)
+            self.hits += 1
+            return reply
+        except redis_exceptions.NoScriptError:
+            self.misses += 1
+            return await server.execute_command("EVAL", script.source, len(keys), *keys, *args)
+
+    def execute(
+            self,
+            server: redis.Redis,
+            name: str,
+            keys: Sequence[Any],
+            args: Sequence[Any]
+        ) -> Any:
+        """
+        Run a registered script on a connection.
+
+        Args:
+            server (redis.Redis): The Redis connection.
+            name (str): Name of the script.
+            keys (Sequence[Any]): The KEYS of the script.
+            args (Sequence[Any]): The ARGV of the script.
+
+        Returns:
+            Any: The reply of the script.
+        """
+        script = self._scripts[name]
+        if not self.is_loaded(server, name):
+            server.execute_command("SCRIPT", "LOAD", script.source)
+            self.loads += 1
+            self.mark_loaded(server, name)
+        try:
+            reply = server.execute_command("EVALSHA", script.sha, len(keys), *keys, *args)
+            self.hits += 1
+            return reply
+        except redis_exceptions.NoScriptError:
+            self.misses += 1
+            return server.execute_command("EVAL", script.source, len(keys), *keys, *args)
+
+    async def aexecute_many(
+            self,
+            server: aio_redis.Redis,
+            calls: Sequence[Tuple[str, Sequence[Any], Sequence[Any]]]
+        ) -> List[Any]:
+        """
+        Run a batch of registered scripts on a connection asynchronously, in a single pipeline.
+
+        Args:
+            server (aio_redis.Redis): The Redis connection.
+            calls (Sequence[Tuple[str, Sequence[Any], Sequence[Any]]]): The (name, keys, args) of each script call.
+
+        Returns:
+            List[Any]: The reply of each script call; a failed call is replied by its exception.
+        """
+        for name in {name for name, _, _ in calls}:
+            if not self.is_loaded(server, name):
+                await server.execute_command("SCRIPT", "LOAD", self._scripts[name].source)
+                self.loads += 1
+                self.mark_loaded(server, name)
+        async with server.pipeline(transaction=False) as pipe:
+            for name, keys, args in calls:
+                pipe.execute_command("EVALSHA", self._scripts[name].sha, len(keys), *keys, *args)
+            replies = await pipe.execute(raise_on_error=False)
+        missed = [i for i, reply in enumerate(replies) if isinstance(reply, redis_exceptions.NoScriptError)]
+        self.hits += len(replies) - len(missed)
+        if len(missed) > 0:
+            self.misses += len(missed)
+            async with server.pipeline(transaction=False) as pipe:
+                for i in missed:
+                    name, keys, args = calls[i]
+                    pipe.execute_command("EVAL", self._scripts[name].source, len(keys), *keys, *args)
+                for i, reply in zip(missed, await pipe.execute(raise_on_error=False)):
+                    replies[i] = reply
+        return replies
+
+    def execute_many(
+            self,
+            server: redis.Redis,
+            calls: Sequence[Tuple[str, Sequence[Any], Sequence[Any]]]
+        ) -> List[Any]:
+        """
+        Run a batch of registered scripts on a connection, in a single pipeline.
+
+        Args:
+            server (redis.Redis): The Redis connection.
+            calls (Sequence[Tuple[str, Sequence[Any], Sequence[Any]]]): The (name, keys, args) of each script call.
+
+        Returns:
+            List[Any]: The reply of each script call; a failed call is replied by its exception.
+        """
+        for name in {name for name, _, _ in calls}:
+            if not self.is_loaded(server, name):
+                server.execute_command("SCRIPT", "LOAD", self._scripts[name].source)
+                self.loads += 1
+                self.mark_loaded(server, name)
+        with server.pipeline(transaction=False) as pipe:
+            for name, keys, args in calls:
+                pipe.execute_command("EVALSHA", self._scripts[name].sha, len(keys), *keys, *args)
+            replies = pipe.execute(raise_on_error=False)
+        missed = [i for i, reply in enumerate(replies) if isinstance(reply, redis_exceptions.NoScriptError)]
+        self.hits += len(replies) - len(missed)
+        if len(missed) > 0:
+            self.misses += len(missed)
+            with server.pipeline(transaction=False) as pipe:
+                for i in missed:
+                    name, keys, args = calls[i]
+                    pipe.execute_command("EVAL", self._scripts[name].source, len(keys), *keys, *args)
+                for i, reply in zip(missed, pipe.execute(raise_on_error=False)):
+                    replies[i] = reply
+        return replies
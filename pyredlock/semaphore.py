@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+import functools
+import redis
+import redis.asyncio as aio_redis
+
+from typing import Any, List, Optional, Tuple, Union
+
+from .redlock import Lock, Redlock
+
+
+class RedlockSemaphore(Redlock):
+    """A distributed counting semaphore: at most a given number of permits of a resource are held at once."""
+
+    def __init__(self, *args: Any, permits: int = 1, majority: bool = False, **kwargs: Any) -> None:
+        """
+        Initialize the RedlockSemaphore, see Redlock for the other arguments.
+
+        Args:
+            permits (int, optional): Number of permits of each resource. Defaults to 1.
+            majority (bool, optional): Whether permits are held once a majority of the nodes granted them,
+                instead of all of them, trading the exact cap for availability. Defaults to False.
+
+        Attributes:
+            permits (int): Number of permits of each resource.
+            majority (bool): Whether permits are held once a majority of the nodes granted them.
+            _semaphore_acquire_script (str): Lua script to acquire permits.
+            _semaphore_release_script (str): Lua script to release permits.
+            _semaphore_extend_script (str): Lua script to extend permits.
+
+        Notes:
+            On each node a resource is a sorted set with one member per held permit, scored by its expiry time
+            in milliseconds (on the clock of the node), so that the permits of a holder which died expire
+            like a lock. Acquiring k permits adds k members at once if no more than permits - k live members
+            are left, and the permits are held once every node granted them, with the usual clock
+            drift accounting. Each attempt draws fresh member names, so that the release of a failed attempt,
+            which may run in the background in fan-out mode, never removes the permits of the next one.
+            The Lock object returned stands for all the permits of one acquisition; its val ends with "#<k>",
+            from which the scripts derive the members "<val>:1" to "<val>:<k>". Releasing publishes on the release
+            channel of the resource, see release_channel_prefix.
+
+            Since every node counts every permit held, no more than permits are held at once, as long as no node
+            loses its data; the price is that acquiring and extending fail while any node is unreachable.
+            With majority=True they only need a majority of the nodes, which keeps them available when a minority
+            of the nodes fails, but then no node counts every permit: with n nodes and a majority q, up to
+            floor(n * permits / q) permits can be held at once, e.g. 3 with 3 nodes and permits=2, which stays
+            below 2 * permits.
+
+            The scripts read the clock of the node with TIME before writing, which requires Redis 5 or later.
+            lock_many/alock_many raise ValueError, and local coalescing and fencing tokens are not supported.
+        """
+        super(RedlockSemaphore, self).__init__(*args, **kwargs)
+        if self._coalesce_local:
+            raise ValueError("coalesce_local is not supported by RedlockSemaphore")
+        if self._fencing:
+            raise ValueError("fencing is not supported by RedlockSemaphore")
+        if permits < 1:
+            raise ValueError("permits {} is not positive".format(permits))
+        self.permits = permits
+        self.majority = majority
+        if not majority:
+            self._quorum = len(self._servers)
+
+        self._semaphore_acquire_script = """local now = redis.call("TIME")
+now = now[1] * 1000 + math.floor(now[2] / 1000)
+local n = tonumber(string.match(ARGV[1],"#(%d+)$"))
+redis.call("ZREMRANGEBYSCORE",KEYS[1],"-inf",now)
+local held = redis.call("ZCARD",KEYS[1])
+for i = 1, n do
+    if redis.call("ZSCORE",KEYS[1],ARGV[1]..":"..i) then
+        held = held - 1
+    end
+end
+if held + n > tonumber(ARGV[3]) then
+    return 0
+end
+for i = 1, n do
+    redis.call("ZADD",KEYS[1],now + ARGV[2],ARGV[1]..":"..i)
+end
+if redis.call("PTTL",KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call("PEXPIRE",KEYS[1],ARGV[2])
+end
+return 1"""
+        self._semaphore_release_script = """local n = tonumber(string.match(ARGV[1],"#(%d+)$"))
+local members = {}
+for i = 1, n do
+    members[i] = ARGV[1]..":"..i
+end
+if redis.call("ZREM",KEYS[1],unpack(members)) == 0 then
+    return 0
+end
+if ARGV[2] then
+    redis.call("PUBLISH",ARGV[2]..KEYS[1],KEYS[1])
+end
+return 1"""
+        self._semaphore_extend_script = """local now = redis.call("TIME")
+now = now[1] * 1000 + math.floor(now[2] / 1000)
+local n = tonumber(string.match(ARGV[1],"#(%d+)$"))
+for i = 1, n do
+    local expires = redis.call("ZSCORE",KEYS[1],ARGV[1]..":"..i)
+    if not expires or tonumber(expires) <= now then
+        return 0
+    end
+end
+for i = 1, n do
+    redis.call("ZADD",KEYS[1],now + ARGV[2],ARGV[1]..":"..i)
+end
+if redis.call("PTTL",KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call("PEXPIRE",KEYS[1],ARGV[2])
+end
+return 1"""
+        self._scripts.register("semaphore_acquire", self._semaphore_acquire_script)
+        self._scripts.register("semaphore_release", self._semaphore_release_script)
+        self._scripts.register("semaphore_extend", self._semaphore_extend_script)
+
+    def _check_count(self, count: int) -> None:
+        if not 0 < count <= self.permits:
+            raise ValueError("count {} is not in [1, {}]".format(count, self.permits))
+
+    def _permit_id(self, count: int) -> bytes:
+        """
+        Generate the unique value of an attempt to acquire count permits.
+        """
+        val = self._get_unique_id()
+        if isinstance(val, str):
+            val = val.encode("utf-8")
+        return val + b"#%d" % count
+
+    async def _aunlock_instance(
+            self,
+            server: aio_redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes]
+        ) -> bool:
+        return await self._scripts.aexecute(server, "semaphore_release", (resource,), self._unlock_args(val)) == 1
+
+    def _unlock_instance(
+            self,
+            server: redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes]
+        ) -> bool:
+        return self._scripts.execute(server, "semaphore_release", (resource,), self._unlock_args(val)) == 1
+
+    async def _aextend_instance(
+            self,
+            server: aio_redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: int
+        ) -> bool:
+        return await self._scripts.aexecute(server, "semaphore_extend", (resource,), (val, ttl)) == 1
+
+    def _extend_instance(
+            self,
+            server: redis.Redis,
+            resource: Union[str, bytes],
+            val: Union[str, bytes],
+            ttl: int
+        ) -> bool:
+        return self._scripts.execute(server, "semaphore_extend", (resource,), (val, ttl)) == 1
+
+    def _extend_command(self, lock: Lock, ttl: int) -> Tuple[str, Tuple[Any, ...], Tuple[Any, ...]]:
+        return ("semaphore_extend", (lock.resource,), (lock.val, ttl))
+
+    async def alock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None,
+            count: int = 1
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire permits of a resource asynchronously.
+
+        Args:
+            resource (Union[str, bytes]): Resource to acquire permits of.
+            ttl (int): Time-to-live for the permits in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the permits are acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the permits. Defaults to None.
+            count (int, optional): Number of permits to acquire, all or none. Defaults to 1.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the permits are acquired successfully
+            and an optional Lock object, which releases or extends all of them.
+        """
+        self._check_count(count)
+        return await self._alock(
+            resource, ttl, blocking, timeout, new_val=functools.partial(self._permit_id, count),
+            acquire=lambda server, val, ttl_arg: self._scripts.aexecute(
+                server, "semaphore_acquire", (resource,), (val, ttl_arg, self.permits)
+            )
+        )
+
+    def lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None,
+            count: int = 1
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire permits of a resource.
+
+        Args:
+            resource (Union[str, bytes]): Resource to acquire permits of.
+            ttl (int): Time-to-live for the permits in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the permits are acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the permits. Defaults to None.
+            count (int, optional): Number of permits to acquire, all or none. Defaults to 1.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the permits are acquired successfully
+            and an optional Lock object, which releases or extends all of them.
+        """
+        self._check_count(count)
+        return self._lock(
+            resource, ttl, blocking, timeout, new_val=functools.partial(self._permit_id, count),
+            acquire=lambda server, val, ttl_arg: self._scripts.execute(
+                server, "semaphore_acquire", (resource,), (val, ttl_arg, self.permits)
+            )
+        )
+
+    async def alock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Not supported by RedlockSemaphore, as it would store plain lock values under the keys of the resources.
+
+        Raises:
+            ValueError: Always.
+        """
+        raise ValueError("lock_many is not supported by RedlockSemaphore")
+
+    def lock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Not supported by RedlockSemaphore, as it would store plain lock values under the keys of the resources.
+
+        Raises:
+            ValueError: Always.
+        """
+        raise ValueError("lock_many is not supported by RedlockSemaphore")
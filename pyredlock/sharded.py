@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import bisect
+import hashlib
+import redis
+import redis.asyncio as aio_redis
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from .redlock import Lock, Redlock
+from .striped import StripedRedlock
+
+
+class ShardedRedlock(object):
+    """Distributed locks spread over several independent groups of Redis nodes by consistent hashing."""
+
+    def __init__(
+            self,
+            groups: Sequence[List[Union[redis.Redis, aio_redis.Redis]]],
+            async_mode: bool = True,
+            names: Optional[Sequence[str]] = None,
+            vnodes: int = 128,
+            redlock_class: Type[Redlock] = Redlock,
+            **kwargs: Any
+        ) -> None:
+        """
+        Initialize the ShardedRedlock.
+
+        Args:
+            groups (Sequence[List[Union[redis.Redis, aio_redis.Redis]]]): The Redis connections of each group of nodes.
+            async_mode (bool, optional): Whether to use asynchronous mode. Defaults to True.
+            names (Optional[Sequence[str]], optional): Names of the groups, which place them on the hash ring.
+                Defaults to None ("group0", "group1", ...).
+            vnodes (int, optional): Number of points of each group on the hash ring. Defaults to 128.
+            redlock_class (Type[Redlock], optional): The lock of each group: Redlock or one of its subclasses
+                in this package, e.g. FairRedlock, RedlockSemaphore or StripedRedlock. Defaults to Redlock.
+            **kwargs: The other arguments of the lock of each group, see Redlock.
+
+        Attributes:
+            redlocks (List[Redlock]): The lock of each group, in the order of the groups.
+            names (List[str]): The names of the groups.
+            _ring (List[int]): The sorted hashes of the points of the groups on the ring.
+            _owners (List[int]): The index of the group of each point of the ring.
+            _striped (Optional[StripedRedlock]): The lock of the first group, if the groups stripe their resources.
+
+        Notes:
+            Each group is a Redlock of its own, with its own quorum, and a resource is locked on the group which owns
+            it only: the group of the first point of the ring at or after the hash of the resource. Every resource
+            thus costs one quorum of one group, whatever the number of groups, and the throughput grows with it.
+            The vnodes points per group even out the share of the resources of each group.
+
+            The resources are placed on the ring by the key their Lock objects name, so that unlock and extend,
+            which only know the Lock object, reach the group which granted it: a resource itself, or the key of its
+            stripe with StripedRedlock, whose stripes are then spread over the groups. A subclass whose Lock objects
+            name another key than these is not supported.
+
+            A group is placed on the ring by its name, so the resources only move between groups when the groups
+            change: adding a group to n groups moves about 1/(n+1) of the resources, all of them to the new group,
+            and removing one moves its own resources only. While the processes of a deployment do not agree on the
+            groups, a moved resource may be locked on both its old and its new group at once, so change the groups
+            while the moved resources are idle, or roll the change out after the longest ttl elapsed, and keep the
+            names of the groups (and vnodes) the same on every process.
+        """
+        if len(groups) == 0:
+            raise ValueError("no groups of nodes")
+        names = [f"group{i}" for i in range(len(groups))] if names is None else list(names)
+        if len(names) != len(groups) or len(set(names)) != len(names):
+            raise ValueError("names {} do not name each group once".format(names))
+        if vnodes < 1:
+            raise ValueError("vnodes {} is not positive".format(vnodes))
+        self._async_mode = async_mode
+        self.names = names
+        self.redlocks = [redlock_class(connections, async_mode=async_mode, **kwargs) for connections in groups]
+        points = sorted(
+            (self._hash(f"{name}#{i}"), index) for index, name in enumerate(names) for i in range(vnodes)
+        )
+        self._ring = [point for point, _ in points]
+        self._owners = [index for _, index in points]
+        self._striped = self.redlocks[0] if isinstance(self.redlocks[0], StripedRedlock) else None
+
+    @staticmethod
+    def _hash(key: Union[str, bytes]) -> int:
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+    def _lock_key(self, resource: Union[str, bytes]) -> Union[str, bytes]:
+        """
+        Get the key which the Lock objects of a resource name.
+        """
+        if self._striped is not None:
+            return self._striped.stripe_of(resource)
+        return resource
+
+    def _owner_of(self, key: Union[str, bytes]) -> int:
+        i = bisect.bisect_left(self._ring, self._hash(key))
+        return self._owners[i if i < len(self._ring) else 0]
+
+    def group_of(self, resource: Union[str, bytes]) -> int:
+        """
+        Get the group which owns a resource.
+
+        Args:
+            resource (Union[str, bytes]): The resource.
+
+        Returns:
+            int: The index of the group in groups.
+        """
+        return self._owner_of(self._lock_key(resource))
+
+    def redlock_for(self, resource: Union[str, bytes]) -> Redlock:
+        """
+        Get the lock of the group which owns a resource, e.g. to call the methods specific to redlock_class.
+
+        Args:
+            resource (Union[str, bytes]): The resource.
+
+        Returns:
+            Redlock: The lock of the group.
+        """
+        return self.redlocks[self.group_of(resource)]
+
+    def _redlock_of(self, lock: Lock) -> Redlock:
+        """
+        Get the lock of the group which granted a Lock object.
+        """
+        return self.redlocks[self._owner_of(lock.resource)]
+
+    def _partition(self, items: Sequence[Any], key_of: Callable[[Any], Union[str, bytes]]) -> Dict[int, List[Any]]:
+        """
+        Group items by the group which owns their key, keeping their order.
+        """
+        parts: Dict[int, List[Any]] = {}
+        for item in items:
+            parts.setdefault(self._owner_of(key_of(item)), []).append(item)
+        return parts
+
+    def script_stats(self) -> Dict[str, int]:
+        """
+        Get the counters of the Lua script caches of all the groups.
+
+        Returns:
+            Dict[str, int]: The number of EVALSHA hits, NOSCRIPT misses and SCRIPT LOAD calls.
+        """
+        stats: Dict[str, int] = {}
+        for redlock in self.redlocks:
+            for key, value in redlock.script_stats().items():
+                stats[key] = stats.get(key, 0) + value
+        return stats
+
+    def health_stats(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the health of the nodes of each group.
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: The health of the nodes by group name, see Redlock.health_stats.
+        """
+        return {name: redlock.health_stats() for name, redlock in zip(self.names, self.redlocks)}
+
+    def close(self) -> None:
+        """
+        Release the resources owned by the locks of the groups.
+        """
+        for redlock in self.redlocks:
+            redlock.close()
+
+    async def aclose(self) -> None:
+        """
+        Release the resources owned by the locks of the groups asynchronously.
+        """
+        for redlock in self.redlocks:
+            await redlock.aclose()
+
+    async def alock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None,
+            **kwargs: Any
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a lock on a resource asynchronously, on the group which owns it.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+            **kwargs: The other arguments of the alock method of redlock_class, e.g. count for RedlockSemaphore.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully and an optional Lock object.
+        """
+        return await self.redlock_for(resource).alock(resource, ttl, blocking, timeout, **kwargs)
+
+    def lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None,
+            **kwargs: Any
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire a lock on a resource, on the group which owns it.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+            **kwargs: The other arguments of the lock method of redlock_class, e.g. count for RedlockSemaphore.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully and an optional Lock object.
+        """
+        return self.redlock_for(resource).lock(resource, ttl, blocking, timeout, **kwargs)
+
+    async def aunlock(self, lock: Lock) -> bool:
+        """
+        Release a lock asynchronously.
+
+        Args:
+            lock (Lock): Lock object to release.
+
+        Returns:
+            bool: True if the lock is released successfully, False otherwise.
+        """
+        return await self._redlock_of(lock).aunlock(lock)
+
+    def unlock(self, lock: Lock) -> bool:
+        """
+        Release a lock.
+
+        Args:
+            lock (Lock): Lock object to release.
+
+        Returns:
+            bool: True if the lock is released successfully, False otherwise.
+        """
+        return self._redlock_of(lock).unlock(lock)
+
+    async def aextend(self, lock: Lock, ttl: int) -> bool:
+        """
+        Extend a lock asynchronously.
+
+        Args:
+            lock (Lock): Lock object to extend.
+            ttl (int): New time-to-live for the lock in milliseconds.
+
+        Returns:
+            bool: True if the lock is extended successfully, False otherwise.
+        """
+        return await self._redlock_of(lock).aextend(lock, ttl)
+
+    def extend(self, lock: Lock, ttl: int) -> bool:
+        """
+        Extend a lock.
+
+        Args:
+            lock (Lock): Lock object to extend.
+            ttl (int): New time-to-live for the lock in milliseconds.
+
+        Returns:
+            bool: True if the lock is extended successfully, False otherwise.
+        """
+        return self._redlock_of(lock).extend(lock, ttl)
+
+    async def alock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Acquire locks on a set of resources asynchronously, with one lock_many call per group, concurrently.
+
+        Args:
+            resources (List[Union[str, bytes]]): Resources to lock.
+            ttl (int): Time-to-live for the locks in milliseconds.
+            all_or_nothing (bool, optional): Whether all of the resources must be acquired, or none of them.
+                Otherwise every resource acquired is kept. Defaults to True.
+
+        Returns:
+            Tuple[bool, List[Lock]]: A tuple containing a boolean indicating whether the locks are acquired successfully
+            and the acquired Lock objects, by group.
+        """
+        parts = self._partition(resources, self._lock_key)
+        results = await asyncio.gather(*[
+            self.redlocks[index].alock_many(part, ttl, all_or_nothing) for index, part in parts.items()
+        ])
+        success = all(ok for ok, _ in results)
+        locks = [lock for _, part in results for lock in part]
+        if all_or_nothing and not success:
+            # The groups which granted their resources release them.
+            await self.aunlock_many(locks)
+            return (False, [])
+        return (success, locks)
+
+    def lock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Acquire locks on a set of resources, with one lock_many call per group.
+
+        Args:
+            resources (List[Union[str, bytes]]): Resources to lock.
+            ttl (int): Time-to-live for the locks in milliseconds.
+            all_or_nothing (bool, optional): Whether all of the resources must be acquired, or none of them.
+                Otherwise every resource acquired is kept. Defaults to True.
+
+        Returns:
+            Tuple[bool, List[Lock]]: A tuple containing a boolean indicating whether the locks are acquired successfully
+            and the acquired Lock objects, by group.
+        """
+        success = True
+        locks: List[Lock] = []
+        for index, part in self._partition(resources, self._lock_key).items():
+            ok, acquired = self.redlocks[index].lock_many(part, ttl, all_or_nothing)
+            success = success and ok
+            locks.extend(acquired)
+            if all_or_nothing and not ok:
+                # The groups which granted their resources release them.
+                self.unlock_many(locks)
+                return (False, [])
+        return (success, locks)
+
+    async def aunlock_many(self, locks: List[Lock]) -> bool:
+        """
+        Release locks on a set of resources asynchronously, with one unlock_many call per group, concurrently.
+
+        Args:
+            locks (List[Lock]): Lock objects to release.
+
+        Returns:
+            bool: True if the locks are released successfully, False otherwise.
+        """
+        parts = self._partition(locks, lambda lock: lock.resource)
+        results = await asyncio.gather(*[self.redlocks[index].aunlock_many(part) for index, part in parts.items()])
+        return all(results)
+
+    def unlock_many(self, locks: List[Lock]) -> bool:
+        """
+        Release locks on a set of resources, with one unlock_many call per group.
+
+        Args:
+            locks (List[Lock]): Lock objects to release.
+
+        Returns:
+            bool: True if the locks are released successfully, False otherwise.
+        """
+        results = [
+            self.redlocks[index].unlock_many(part)
+            for index, part in self._partition(locks, lambda lock: lock.resource).items()
+        ]
+        return all(results)
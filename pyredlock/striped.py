@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import hashlib
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .redlock import Lock, Redlock
+
+
+class StripedRedlock(Redlock):
+    """Locks of an unbounded resource space mapped onto a fixed number of stripe keys."""
+
+    def __init__(self, *args: Any, stripes: int = 65536, prefix: str = "redlock:stripe:", **kwargs: Any) -> None:
+        """
+        Initialize the StripedRedlock, see Redlock for the other arguments.
+
+        Args:
+            stripes (int, optional): Number of stripes, i.e. of keys per node. Defaults to 65536.
+            prefix (str, optional): Prefix of the stripe keys, "<prefix><stripe>". Defaults to "redlock:stripe:".
+
+        Attributes:
+            stripes (int): Number of stripes.
+            prefix (str): Prefix of the stripe keys.
+
+        Notes:
+            A resource is locked through the key of its stripe, picked by a hash of its name which is the same
+            in every process, so that however many distinct resources are locked, each node holds at most stripes
+            lock keys, and the memory and the expiry work of the nodes stay bounded. The price is false contention:
+            two resources of the same stripe exclude each other, and a holder of one of them which tries to lock the
+            other fails, or waits for its own lock when blocking. Size the stripes with collision_rate, from the
+            number of locks held at once: about concurrency / (2 * stripes) of the acquisitions contend falsely.
+
+            The Lock objects name the stripe key as their resource, and unlock and extend work on it as usual.
+            lock_many locks the distinct stripes of the resources, so a set never contends with itself.
+            Local coalescing and fencing tokens apply to the stripes, and ShardedRedlock spreads the stripes,
+            rather than the resources, over its groups.
+        """
+        super(StripedRedlock, self).__init__(*args, **kwargs)
+        if stripes < 1:
+            raise ValueError("stripes {} is not positive".format(stripes))
+        self.stripes = stripes
+        self.prefix = prefix
+
+    @staticmethod
+    def _stripe(resource: Union[str, bytes], stripes: int) -> int:
+        if isinstance(resource, str):
+            resource = resource.encode("utf-8")
+        return int.from_bytes(hashlib.blake2b(resource, digest_size=8).digest(), "big") % stripes
+
+    def stripe_of(self, resource: Union[str, bytes]) -> str:
+        """
+        Get the stripe key which locks a resource.
+
+        Args:
+            resource (Union[str, bytes]): The resource.
+
+        Returns:
+            str: The key of the stripe of the resource.
+        """
+        return f"{self.prefix}{self._stripe(resource, self.stripes)}"
+
+    def _stripes_of(self, resources: List[Union[str, bytes]]) -> List[str]:
+        """
+        Get the distinct stripe keys of a set of resources.
+        """
+        return list(dict.fromkeys(self.stripe_of(resource) for resource in resources))
+
+    @staticmethod
+    def collision_rate(resources: Iterable[Union[str, bytes]], stripes: int, concurrency: int) -> Dict[str, float]:
+        """
+        Measure the false contention of a stripe count on a sample of resource names.
+
+        Args:
+            resources (Iterable[Union[str, bytes]]): Resource names, e.g. from a trace of the acquisitions;
+                each run of concurrency consecutive distinct names is taken as held at once.
+            stripes (int): Number of stripes.
+            concurrency (int): Number of locks held at once.
+
+        Returns:
+            Dict[str, float]: "measured", the fraction of the acquisitions whose stripe was held for another
+            resource of their run, "expected", the same fraction for uniformly hashed names, and "acquisitions",
+            the number of acquisitions measured.
+        """
+        if stripes < 1 or concurrency < 1:
+            raise ValueError("stripes {} and concurrency {} must be positive".format(stripes, concurrency))
+        run = set()
+        held = set()
+        total = 0
+        collisions = 0
+        for resource in resources:
+            if resource in run:
+                continue
+            if len(run) == concurrency:
+                run.clear()
+                held.clear()
+            run.add(resource)
+            stripe = StripedRedlock._stripe(resource, stripes)
+            if stripe in held:
+                collisions += 1
+            held.add(stripe)
+            total += 1
+        # The expected number of distinct stripes among k uniformly hashed names is m * (1 - (1 - 1/m)^k).
+        k = min(concurrency, max(total, 1))
+        expected = 1.0 - stripes * (1.0 - (1.0 - 1.0 / stripes) ** k) / k
+        return {"measured": collisions / total if total > 0 else 0.0, "expected": expected, "acquisitions": float(total)}
+
+    async def alock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire the lock of the stripe of a resource asynchronously.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully
+            and an optional Lock object on the stripe key.
+        """
+        return await super(StripedRedlock, self).alock(self.stripe_of(resource), ttl, blocking, timeout)
+
+    def lock(
+            self,
+            resource: Union[str, bytes],
+            ttl: int,
+            blocking: bool = False,
+            timeout: Optional[float] = None
+        ) -> Tuple[bool, Optional[Lock]]:
+        """
+        Acquire the lock of the stripe of a resource.
+
+        Args:
+            resource (Union[str, bytes]): Resource to lock.
+            ttl (int): Time-to-live for the lock in milliseconds.
+            blocking (bool, optional): Whether to keep retrying until the lock is acquired or the timeout elapsed,
+                instead of giving up after retry_count attempts. Defaults to False.
+            timeout (Optional[float], optional): Maximum time in seconds to spend acquiring the lock. Defaults to None.
+
+        Returns:
+            Tuple[bool, Optional[Lock]]: A tuple containing a boolean indicating whether the lock is acquired successfully
+            and an optional Lock object on the stripe key.
+        """
+        return super(StripedRedlock, self).lock(self.stripe_of(resource), ttl, blocking, timeout)
+
+    async def alock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Acquire the locks of the stripes of a set of resources asynchronously, see Redlock.alock_many.
+
+        Returns:
+            Tuple[bool, List[Lock]]: A tuple containing a boolean indicating whether the locks are acquired successfully
+            and the acquired Lock objects, one per distinct stripe.
+        """
+        return await super(StripedRedlock, self).alock_many(self._stripes_of(resources), ttl, all_or_nothing)
+
+    def lock_many(
+            self,
+            resources: List[Union[str, bytes]],
+            ttl: int,
+            all_or_nothing: bool = True
+        ) -> Tuple[bool, List[Lock]]:
+        """
+        Acquire the locks of the stripes of a set of resources, see Redlock.lock_many.
+
+        Returns:
+            Tuple[bool, List[Lock]]: A tuple containing a boolean indicating whether the locks are acquired successfully
+            and the acquired Lock objects, one per distinct stripe.
+        """
+        return super(StripedRedlock, self).lock_many(self._stripes_of(resources), ttl, all_or_nothing)
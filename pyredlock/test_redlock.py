@@ -4,10 +4,28 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import logging
+import redis
+import threading
+import time
 import unittest
 
-from pyredlock import RedisClient
+from unittest import mock
+
+from pyredlock import RedisClient, RedisClientManager, RedisClientSetupException
 from pyredlock import Redlock, Lock
+from pyredlock import ReentrantRedlock
+from pyredlock import RedlockRW
+from pyredlock import FairRedlock
+from pyredlock import RedlockSemaphore
+from pyredlock import OptimisticRedlock
+from pyredlock import ShardedRedlock
+from pyredlock import StripedRedlock
+from pyredlock import LockWatchdog
+from pyredlock import RespConnection
+from pyredlock import TokenGenerator
+from pyredlock import NodeHealth
+from pyredlock import InMemoryMetrics
+from pyredlock import BackoffStrategy, DeadlineAwareBackoff, DecorrelatedJitterBackoff, ExponentialBackoff, FullJitterBackoff
 
 
 class RedlockTestCase(unittest.TestCase):
@@ -39,8 +57,24 @@ class RedlockTestCase(unittest.TestCase):
         self.assertIsInstance(lock, Lock)
         self.assertTrue(lock.validity > 0)
         self.assertTrue(lock.resource == "test_resource")
+        self.assertTrue(0 < lock.remaining_ms() <= lock.validity)
+        self.assertFalse(lock.is_expired())
+        success = self.redlock.unlock(lock)
+        self.assertTrue(success)
+
+    def test_binary_resource(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        resource = b"test resource \xff"
+        ttl = 2000
+        success, lock = self.redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        self.assertTrue(lock.resource == resource)
+        self.assertEqual(self.redis_client.get_connection().get(resource), lock.val)
         success = self.redlock.unlock(lock)
         self.assertTrue(success)
+        with self.assertRaises(ValueError):
+            self.redlock.lock(resource, 1.5)
 
     def test_extend(self):
         if self.redlock is None:
@@ -58,6 +92,618 @@ class RedlockTestCase(unittest.TestCase):
         success = self.redlock.unlock(lock)
         self.assertTrue(success)
 
+    def test_fan_out(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = Redlock(connections=[self.redis_client.get_connection()], async_mode=False, fan_out=True, node_timeout=0.5)
+        resource = "test_resource_3"
+        ttl = 2000
+        success, lock = redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        self.assertIsInstance(lock, Lock)
+        self.assertTrue(lock.validity > 0)
+        success, _ = redlock.lock(resource, ttl)
+        self.assertFalse(success)
+        success = redlock.extend(lock, ttl)
+        self.assertTrue(success)
+        success = redlock.unlock(lock)
+        self.assertTrue(success)
+        redlock.close()
+
+    def test_script_cache(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        resource = "test_resource_4"
+        ttl = 2000
+        success, lock = self.redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        success = self.redlock.extend(lock, ttl)
+        self.assertTrue(success)
+        # The node lost its script cache, e.g. after a restart: the next EVALSHA replies NOSCRIPT.
+        connection = self.redis_client.get_connection()
+        execute_command = connection.execute_command
+        evicted = []
+
+        def evict_once(*args, **options):
+            if args[0] == "EVALSHA" and len(evicted) == 0:
+                evicted.append(args[1])
+                raise redis.exceptions.NoScriptError("No matching script. Please use EVAL.")
+            return execute_command(*args, **options)
+
+        with mock.patch.object(connection, "execute_command", side_effect=evict_once) as patched:
+            success = self.redlock.extend(lock, ttl)
+        self.assertTrue(success)
+        self.assertEqual(len(evicted), 1)
+        self.assertEqual([call.args[0] for call in patched.call_args_list], ["EVALSHA", "EVAL"])
+        success = self.redlock.unlock(lock)
+        self.assertTrue(success)
+        stats = self.redlock.script_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 2)
+
+    def test_lock_many(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        resources = ["test_resource_5", "test_resource_6", "test_resource_7"]
+        ttl = 2000
+        success, locks = self.redlock.lock_many(resources, ttl)
+        self.assertTrue(success)
+        self.assertEqual([lock.resource for lock in locks], resources)
+        self.assertTrue(all(lock.validity > 0 for lock in locks))
+        success, _ = self.redlock.lock_many(["test_resource_7", "test_resource_8"], ttl)
+        self.assertFalse(success)
+        success, partial = self.redlock.lock_many(["test_resource_7", "test_resource_8"], ttl, all_or_nothing=False)
+        self.assertTrue(success)
+        self.assertEqual([lock.resource for lock in partial], ["test_resource_8"])
+        success = self.redlock.unlock_many(locks + partial)
+        self.assertTrue(success)
+
+    def test_lock_many_fan_out(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+
+        class SlowRedis(redis.Redis):
+            def execute_command(self, *args, **options):
+                if args[0] == "EVALSHA":
+                    time.sleep(0.3)
+                return super(SlowRedis, self).execute_command(*args, **options)
+
+        kwargs = {"host": "localhost", "port": 6379, "password": "sOmE_sEcUrE_pAsS", "socket_timeout": 1.0}
+        connections = [redis.Redis(db=0, **kwargs), redis.Redis(db=1, **kwargs), SlowRedis(db=2, **kwargs)]
+        resources = ["test_resource_20", "test_resource_21"]
+        ttl = 5000
+        for connection in connections:
+            connection.delete(*resources)
+        # Held on the fast nodes, so that every attempt fails there at once and leaves the slow node in flight.
+        for connection in connections[:2]:
+            connection.set(resources[0], "another holder", px=ttl)
+        redlock = Redlock(
+            connections=connections, async_mode=False, fan_out=True, node_timeout=1.0, retry_count=3, retry_delay=0.05
+        )
+        success, _ = redlock.lock_many(resources, ttl)
+        self.assertFalse(success)
+        # Each attempt rolls back its own keys on the slow node, once the node replied.
+        time.sleep(1.0)
+        self.assertEqual(connections[2].exists(*resources), 0)
+        for connection in connections:
+            connection.delete(*resources)
+        redlock.close()
+
+    def test_watchdog(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        watchdog = LockWatchdog(self.redlock)
+        watchdog.start()
+        resource = "test_resource_9"
+        ttl = 300
+        success, lock = self.redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        lost = []
+        watchdog.watch(lock, ttl, on_lost=lost.append)
+        # A read-write lock is renewed with its own scripts, and a renewal which cannot even be sent
+        # loses its lease only.
+        rwlock = RedlockRW(connections=[self.redis_client.get_connection()], async_mode=False)
+        _, write_lock = rwlock.write_lock(resource + ":rw", ttl)
+        watchdog.watch(write_lock, ttl, on_lost=lost.append, owner=rwlock)
+
+        class BrokenRedlock(Redlock):
+            def _extend_command(self, lock, ttl):
+                return ("no_such_script", (lock.resource,), (lock.val, ttl))
+
+        broken = BrokenRedlock(connections=[self.redis_client.get_connection()], async_mode=False)
+        _, broken_lock = broken.lock(resource + ":broken", ttl)
+        watchdog.watch(broken_lock, ttl, on_lost=lost.append, owner=broken)
+        time.sleep(1)
+        self.assertEqual([lock.resource for lock in lost], [resource + ":broken"])
+        success, _ = self.redlock.lock(resource, ttl)
+        self.assertFalse(success)
+        self.assertFalse(rwlock.read_lock(resource + ":rw", ttl)[0])
+        watchdog.unwatch(lock)
+        watchdog.unwatch(write_lock)
+        watchdog.stop()
+        success = self.redlock.unlock(lock)
+        self.assertTrue(success)
+        self.assertTrue(rwlock.unlock(write_lock))
+
+    def test_blocking_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = Redlock(connections=[self.redis_client.get_connection()], async_mode=False, retry_delay=5, release_channel_prefix="redlock:release:")
+        resource = "test_resource_10"
+        ttl = 2000
+        success, lock = redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        threading.Timer(0.2, redlock.unlock, args=(lock,)).start()
+        t = time.monotonic()
+        success, lock = redlock.lock(resource, ttl, blocking=True, timeout=3)
+        self.assertTrue(success)
+        self.assertTrue(time.monotonic() - t < 1)
+        success, _ = redlock.lock(resource, ttl, blocking=True, timeout=0.2)
+        self.assertFalse(success)
+        success = redlock.unlock(lock)
+        self.assertTrue(success)
+        redlock.close()
+
+    def test_backoff(self):
+        for backoff in (ExponentialBackoff(), FullJitterBackoff(), DecorrelatedJitterBackoff(), DeadlineAwareBackoff()):
+            delay = 0.0
+            for attempt in range(1, 20):
+                delay = backoff(attempt, delay, None)
+                self.assertTrue(0 <= delay <= 2.0)
+                self.assertTrue(0 <= backoff(attempt, delay, 0.01) <= 0.01)
+        with self.assertRaises(TypeError):
+            BackoffStrategy()
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = Redlock(connections=[self.redis_client.get_connection()], async_mode=False, backoff=FullJitterBackoff(base=0.01))
+        resource = "test_resource_11"
+        ttl = 2000
+        success, lock = redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        t = time.monotonic()
+        success, _ = redlock.lock(resource, ttl, blocking=True, timeout=0.3)
+        self.assertFalse(success)
+        self.assertTrue(time.monotonic() - t < 0.5)
+        success = redlock.unlock(lock)
+        self.assertTrue(success)
+
+    def test_lock_deadline(self):
+        lock = Lock(100, "test_resource", b"val", time.monotonic_ns() + 50 * 1000000)
+        self.assertTrue(0 < lock.remaining_ms() <= 50)
+        self.assertFalse(lock.is_expired())
+        time.sleep(0.06)
+        self.assertEqual(lock.remaining_ms(), 0)
+        self.assertTrue(lock.is_expired())
+        # A lock built without a deadline keeps its relative validity.
+        self.assertEqual(Lock(100, "test_resource", b"val").remaining_ms(), 100)
+
+    def test_node_health(self):
+        health = NodeHealth(failure_threshold=2, recovery_timeout=0.05)
+        health.record(redis.exceptions.ResponseError("WRONGTYPE"), 0.001)
+        self.assertTrue(health.allow())
+        health.record(redis.exceptions.TimeoutError(), 0.5)
+        health.record(redis.exceptions.ConnectionError(), 0.5)
+        self.assertFalse(health.allow())
+        self.assertFalse(health.should_probe())
+        time.sleep(0.06)
+        self.assertTrue(health.should_probe())
+        self.assertFalse(health.should_probe())
+        health.record(None, 0.001)
+        self.assertTrue(health.allow())
+        stats = health.stats()
+        self.assertEqual((stats["successes"], stats["failures"], stats["consecutive_failures"]), (2, 2, 0))
+
+    def test_metrics(self):
+        metrics = InMemoryMetrics()
+        metrics.on_acquire("orders:1", True, 0.002, 1)
+        metrics.on_acquire("orders:2", True, 0.3, 3)
+        metrics.on_validity("orders:1", 1000, 985)
+        self.assertEqual(metrics.contention_rate(), {"orders": 0.5})
+        self.assertEqual(metrics.acquire_latency.percentile(50), 0.0025)
+        self.assertEqual(metrics.acquire_latency.percentile(99), 0.3)
+        self.assertEqual(metrics.snapshot()["validity_lost"]["max"], 15)
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = Redlock(connections=[self.redis_client.get_connection()], async_mode=False, metrics=metrics)
+        success, lock = redlock.lock("test_resource", 2000)
+        self.assertTrue(success)
+        self.assertTrue(redlock.extend(lock, 2000))
+        self.assertTrue(redlock.unlock(lock))
+        self.assertEqual([span.name for span in metrics.spans], ["redlock.acquire", "redlock.extend", "redlock.release"])
+        self.assertEqual(metrics.quorum_margin[("acquire", 0)], 1)
+        self.assertEqual(sum(histogram.count for histogram in metrics.node_rtt.values()), 3)
+        # An exception being handled by the caller is not the error of the acquisition.
+        try:
+            raise RuntimeError("unrelated")
+        except RuntimeError:
+            success, lock = redlock.lock("test_resource", 2000)
+        self.assertTrue(success)
+        self.assertTrue(redlock.unlock(lock))
+        self.assertIsNone(metrics.spans[-2].error)
+
+    def test_local_coalescing(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = Redlock(connections=[self.redis_client.get_connection()], async_mode=False, coalesce_local=True)
+        resource = "test_resource"
+        success, lock = redlock.lock(resource, 2000)
+        self.assertTrue(success)
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(redlock.lock(resource, 2000, blocking=True, timeout=3)))
+        waiter.start()
+        time.sleep(0.1)
+        # Handed off to the local waiter without deleting the key.
+        self.assertTrue(redlock.unlock(lock))
+        waiter.join()
+        success, handed_off = acquired[0]
+        self.assertTrue(success)
+        self.assertNotEqual(handed_off.val, lock.val)
+        self.assertFalse(redlock.extend(lock, 2000))
+        self.assertTrue(redlock.unlock(handed_off))
+        self.assertEqual(redlock._local_gates, {})
+        redlock.close()
+
+    def test_reentrant_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        connection = self.redis_client.get_connection()
+        redlock = ReentrantRedlock(connections=[connection], async_mode=False, retry_count=1)
+        resource = "test_resource_11"
+        with self.assertRaises(ValueError):
+            redlock.lock_many([resource], 2000)
+        ttl = 2000
+        success, lock = redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        # Acquired again locally, without a round-trip.
+        success, nested = redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        self.assertEqual(nested, lock)
+        self.assertEqual(connection.hget(resource, lock.val), b"1")
+        # Another thread is another owner.
+        acquired = []
+        contender = threading.Thread(target=lambda: acquired.append(redlock.lock(resource, ttl)[0]))
+        contender.start()
+        contender.join()
+        self.assertEqual(acquired, [False])
+        # The same owner through another instance is counted on the nodes.
+        other = ReentrantRedlock(connections=[connection], async_mode=False)
+        success, remote = other.lock(resource, ttl, owner=lock.val)
+        self.assertTrue(success)
+        self.assertEqual(connection.hget(resource, lock.val), b"2")
+        self.assertTrue(other.unlock(remote))
+        self.assertTrue(redlock.unlock(nested))
+        self.assertTrue(redlock.extend(lock, ttl))
+        self.assertEqual(connection.exists(resource), 1)
+        self.assertTrue(redlock.unlock(lock))
+        self.assertEqual(connection.exists(resource), 0)
+
+    def test_read_write_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = RedlockRW(connections=[self.redis_client.get_connection()], async_mode=False, retry_count=1)
+        resource = "test_resource_12"
+        ttl = 2000
+        readers = [redlock.read_lock(resource, ttl) for _ in range(3)]
+        self.assertTrue(all(success for success, _ in readers))
+        success, _ = redlock.write_lock(resource, ttl)
+        self.assertFalse(success)
+        for _, lock in readers:
+            self.assertTrue(redlock.extend(lock, ttl))
+            self.assertTrue(redlock.unlock(lock))
+        success, writer = redlock.write_lock(resource, ttl)
+        self.assertTrue(success)
+        success, _ = redlock.read_lock(resource, ttl)
+        self.assertFalse(success)
+        self.assertTrue(redlock.unlock(writer))
+        # A waiting writer keeps the new readers out.
+        success, reader = redlock.read_lock(resource, ttl)
+        self.assertTrue(success)
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(redlock.write_lock(resource, ttl, blocking=True, timeout=3)))
+        waiter.start()
+        time.sleep(0.1)
+        success, _ = redlock.read_lock(resource, ttl)
+        self.assertFalse(success)
+        self.assertTrue(redlock.unlock(reader))
+        waiter.join()
+        success, writer = acquired[0]
+        self.assertTrue(success)
+        self.assertTrue(redlock.unlock(writer))
+        # A writer which gives up withdraws its own intent, and leaves that of another writer alone.
+        success, reader = redlock.read_lock(resource, ttl)
+        self.assertTrue(success)
+        connection = self.redis_client.get_connection()
+        connection.set(resource + ":writer-waiting", "another writer", px=ttl)
+        success, _ = redlock.write_lock(resource, ttl)
+        self.assertFalse(success)
+        self.assertEqual(connection.exists(resource + ":writer-waiting"), 0)
+        connection.set(resource + ":writer-waiting", "another writer", px=ttl)
+        redlock._scripts.execute(connection, "rw_abandon", redlock._rw_keys(resource), redlock._abandon_args([b"mine"]))
+        self.assertEqual(connection.get(resource + ":writer-waiting"), b"another writer")
+        connection.delete(resource + ":writer-waiting")
+        self.assertTrue(redlock.unlock(reader))
+        with self.assertRaises(ValueError):
+            redlock.lock_many([resource], ttl)
+
+    def test_fair_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = FairRedlock(
+            connections=[self.redis_client.get_connection()], async_mode=False, retry_count=1,
+            release_channel_prefix="test:released:"
+        )
+        resource = "test_resource_13"
+        with self.assertRaises(ValueError):
+            redlock.lock_many([resource], 2000)
+        ttl = 2000
+        success, lock = redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        # The waiters get the lock in their order of arrival.
+        acquired = []
+
+        def wait(i):
+            success, lock = redlock.lock(resource, ttl, blocking=True, timeout=5)
+            acquired.append((i, success))
+            time.sleep(0.02)
+            redlock.unlock(lock)
+
+        waiters = []
+        for i in range(3):
+            waiters.append(threading.Thread(target=wait, args=(i,)))
+            waiters[-1].start()
+            time.sleep(0.1)
+        self.assertTrue(redlock.unlock(lock))
+        for waiter in waiters:
+            waiter.join()
+        self.assertEqual(acquired, [(0, True), (1, True), (2, True)])
+        # A waiter which gave up leaves the queue.
+        success, lock = redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        success, _ = redlock.lock(resource, ttl)
+        self.assertFalse(success)
+        self.assertTrue(redlock.unlock(lock))
+        success, lock = redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        self.assertTrue(redlock.unlock(lock))
+        redlock.close()
+
+    def test_semaphore(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = RedlockSemaphore(connections=[self.redis_client.get_connection()], async_mode=False, retry_count=1, permits=3)
+        resource = "test_resource_14"
+        with self.assertRaises(ValueError):
+            redlock.lock_many([resource], 2000)
+        ttl = 2000
+        success, one = redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        success, two = redlock.lock(resource, ttl, count=2)
+        self.assertTrue(success)
+        success, _ = redlock.lock(resource, ttl)
+        self.assertFalse(success)
+        self.assertTrue(redlock.extend(two, ttl))
+        self.assertTrue(redlock.unlock(two))
+        success, other = redlock.lock(resource, ttl, count=2)
+        self.assertTrue(success)
+        with self.assertRaises(ValueError):
+            redlock.lock(resource, ttl, count=4)
+        self.assertTrue(redlock.unlock(one))
+        self.assertTrue(redlock.unlock(other))
+        # By default every node must grant the permits, so a holder counted by a single node still counts.
+        connections = [
+            redis.Redis(host="localhost", port=6379, password="sOmE_sEcUrE_pAsS", db=db, socket_timeout=0.5)
+            for db in range(3)
+        ]
+        for connection in connections:
+            connection.delete(resource)
+        seconds, microseconds = connections[0].time()
+        connections[0].zadd(resource, {"another holder#1:1": seconds * 1000 + microseconds // 1000 + ttl})
+        redlock = RedlockSemaphore(connections=connections, async_mode=False, retry_count=1, permits=1)
+        success, _ = redlock.lock(resource, ttl)
+        self.assertFalse(success)
+        redlock = RedlockSemaphore(connections=connections, async_mode=False, retry_count=1, permits=1, majority=True)
+        success, permit = redlock.lock(resource, ttl)
+        self.assertTrue(success)
+        self.assertTrue(redlock.unlock(permit))
+        connections[0].delete(resource)
+
+    def test_fencing(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        resource = "test_resource_15"
+        ttl = 2000
+        _, lock = self.redlock.lock(resource, ttl)
+        self.assertIsNone(lock.fence)
+        self.assertTrue(self.redlock.unlock(lock))
+        # Three nodes on three databases, one of them ahead of the others.
+        connections = [
+            redis.Redis(host="localhost", port=6379, password="sOmE_sEcUrE_pAsS", db=db, socket_timeout=0.5)
+            for db in range(3)
+        ]
+        for connection in connections:
+            connection.delete(resource + ":fence")
+        connections[0].set(resource + ":fence", 100)
+        redlock = Redlock(connections=connections, async_mode=False, retry_count=1, fencing=True)
+        fences = []
+        for _ in range(3):
+            success, lock = redlock.lock(resource, ttl)
+            self.assertTrue(success)
+            fences.append(lock.fence)
+            self.assertTrue(redlock.unlock(lock))
+        self.assertEqual(fences, [101, 102, 103])
+        self.assertEqual([int(connection.get(resource + ":fence")) for connection in connections], [103, 103, 103])
+        for connection in connections:
+            connection.delete(resource + ":fence")
+            connection.close()
+
+    def test_optimistic_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        connection = self.redis_client.get_connection()
+        redlock = OptimisticRedlock(connections=[connection], async_mode=False, retry_count=3, retry_delay=0.01)
+        resource = "test_resource_16"
+        connection.delete(resource + ":version")
+        success, result, version = redlock.run(resource, lambda version: version * 10)
+        self.assertEqual((success, result, version), (True, 0, 1))
+        # Another instance commits, the cached version is stale and the work runs again.
+        other = OptimisticRedlock(connections=[connection], async_mode=False)
+        self.assertEqual(other.commit(resource, other.read_version(resource)), (True, 2))
+        runs = []
+        success, result, version = redlock.run(resource, lambda version: runs.append(version) or version)
+        self.assertEqual((success, result, version), (True, 2, 3))
+        self.assertEqual(runs, [1, 2])
+        self.assertEqual(other.commit(resource, 2), (False, 3))
+        connection.delete(resource + ":version")
+
+    def test_resp_transport(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        connection = RespConnection(port=6379, password="sOmE_sEcUrE_pAsS", socket_timeout=0.5)
+        self.assertTrue(connection.ping())
+        redlock = Redlock(connections=[connection], async_mode=False, retry_count=1)
+        resource = "test_resource_18"
+        success, lock = redlock.lock(resource, 2000)
+        self.assertTrue(success)
+        self.assertEqual(connection.get(resource), lock.val)
+        self.assertFalse(redlock.lock(resource, 2000)[0])
+        self.assertTrue(redlock.extend(lock, 2000))
+        self.assertTrue(redlock.unlock(lock))
+        self.assertIsNone(connection.get(resource))
+        with self.assertRaises(redis.exceptions.AuthenticationError):
+            RespConnection(port=6379, password="wrong").ping()
+        connection.close()
+
+    def test_sharded_ring(self):
+        with self.assertRaises(ValueError):
+            ShardedRedlock([[None], [None]], async_mode=False, names=["a", "a"])
+        resources = [f"test_resource_19:{i}" for i in range(10000)]
+        sharded = ShardedRedlock([[None] for _ in range(4)], async_mode=False)
+        before = [sharded.group_of(resource) for resource in resources]
+        self.assertTrue(all(count > 1500 for count in (before.count(group) for group in range(4))))
+        # Adding a group only moves resources to it, about a fifth of them.
+        sharded = ShardedRedlock([[None] for _ in range(5)], async_mode=False)
+        after = [sharded.group_of(resource) for resource in resources]
+        moved = [group for old, group in zip(before, after) if old != group]
+        self.assertEqual(set(moved), {4})
+        self.assertLess(abs(len(moved) / len(resources) - 0.2), 0.05)
+
+    def test_sharded_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        # Three groups of one node each, on three databases.
+        connections = [
+            redis.Redis(host="localhost", port=6379, password="sOmE_sEcUrE_pAsS", db=db, socket_timeout=0.5)
+            for db in range(3)
+        ]
+        sharded = ShardedRedlock([[connection] for connection in connections], async_mode=False, retry_count=1)
+        resources = [f"test_resource_19:{i}" for i in range(30)]
+        locks = []
+        for resource in resources:
+            success, lock = sharded.lock(resource, 2000)
+            self.assertTrue(success)
+            self.assertFalse(sharded.lock(resource, 2000)[0])
+            self.assertTrue(sharded.extend(lock, 2000))
+            locks.append(lock)
+        for resource in resources:
+            group = sharded.group_of(resource)
+            self.assertEqual([connection.exists(resource) for connection in connections],
+                             [int(i == group) for i in range(3)])
+        self.assertEqual(len({sharded.group_of(resource) for resource in resources}), 3)
+        self.assertTrue(all(sharded.unlock(lock) for lock in locks))
+        success, locks = sharded.lock_many(resources, 2000)
+        self.assertTrue(success)
+        self.assertEqual(len(locks), len(resources))
+        self.assertTrue(sharded.unlock_many(locks))
+        self.assertFalse(any(connection.exists(*resources) for connection in connections))
+        sharded.close()
+        # Striped groups: the stripes are spread over the groups, and released where they were granted.
+        sharded = ShardedRedlock([[connection] for connection in connections], async_mode=False, retry_count=1,
+                                 redlock_class=StripedRedlock, stripes=16, prefix="test_resource_19:stripe:")
+        for resource in resources:
+            success, lock = sharded.lock(resource, 2000)
+            self.assertTrue(success)
+            group = sharded.group_of(resource)
+            self.assertEqual(connections[group].get(lock.resource), lock.val)
+            self.assertTrue(sharded.extend(lock, 2000))
+            self.assertTrue(sharded.unlock(lock))
+            self.assertEqual(connections[group].exists(lock.resource), 0)
+        success, locks = sharded.lock_many(resources, 2000)
+        self.assertTrue(success)
+        self.assertTrue(sharded.unlock_many(locks))
+        self.assertFalse(any(connection.keys("test_resource_19:stripe:*") for connection in connections))
+        sharded.close()
+        for connection in connections:
+            connection.close()
+
+    def test_striped_collision_rate(self):
+        resources = [f"test_resource_20:{i}" for i in range(20000)]
+        rate = StripedRedlock.collision_rate(resources + resources[:10], 4096, 100)
+        self.assertEqual(rate["acquisitions"], 20010)
+        self.assertLess(abs(rate["measured"] - rate["expected"]), 0.005)
+        self.assertEqual(StripedRedlock.collision_rate(resources, 1, 100)["measured"], 0.99)
+        self.assertEqual(StripedRedlock.collision_rate(resources, 1 << 40, 100)["measured"], 0.0)
+
+    def test_striped_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        connection = self.redis_client.get_connection()
+        redlock = StripedRedlock(connections=[connection], async_mode=False, retry_count=1, stripes=4,
+                                 prefix="test_resource_20:")
+        resources = [f"row:{i}" for i in range(20)]
+        # Four stripes for twenty rows: the rows of a held stripe contend, the others do not.
+        success, lock = redlock.lock(resources[0], 2000)
+        self.assertTrue(success)
+        self.assertEqual(lock.resource, redlock.stripe_of(resources[0]))
+        for resource in resources[1:]:
+            success, other = redlock.lock(resource, 2000)
+            self.assertEqual(success, redlock.stripe_of(resource) != lock.resource)
+            if success:
+                self.assertTrue(redlock.unlock(other))
+        self.assertTrue(redlock.extend(lock, 2000))
+        self.assertTrue(redlock.unlock(lock))
+        success, locks = redlock.lock_many(resources, 2000)
+        self.assertTrue(success)
+        self.assertEqual(sorted(lock.resource for lock in locks), [f"test_resource_20:{i}" for i in range(4)])
+        self.assertTrue(redlock.unlock_many(locks))
+        self.assertEqual(connection.exists(*[f"test_resource_20:{i}" for i in range(4)]), 0)
+
+    def test_token_generator(self):
+        generator = TokenGenerator(prefix="svc:", owner_prefix=True, buffer_size=64)
+        tokens = [generator() for _ in range(1000)]
+        self.assertEqual(len(set(tokens)), len(tokens))
+        self.assertTrue(all(token.startswith(generator.prefix) for token in tokens))
+        self.assertTrue(generator.prefix.startswith(b"svc:"))
+        self.assertEqual(len(tokens[0]), len(generator.prefix) + 20)
+
+    def test_client_manager(self):
+        conf = {
+            "endpoint": "localhost:6379",
+            "password": "sOmE_sEcUrE_pAsS",
+            "db": 0,
+            "socket_timeout": 0.5,
+            "socket_connect_timeout": 0.25
+        }
+        with self.assertRaises(RedisClientSetupException):
+            RedisClientManager([conf, conf])
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        manager = RedisClientManager([conf], max_connections=2)
+        self.assertEqual(manager.health(), {"localhost:6379": True})
+        stats = manager.stats()["localhost:6379"]
+        self.assertEqual(stats["max_connections"], 2)
+        self.assertEqual((stats["created"], stats["available"], stats["in_use"]), (1, 1, 0))
+        # The counts come from private attributes of redis-py, checked here against a connection checked out.
+        pool = manager._pools[0]
+        connection = pool.get_connection("PING")
+        self.assertEqual(manager.stats()["localhost:6379"], {"max_connections": 2, "created": 1, "available": 0, "in_use": 1})
+        pool.release(connection)
+        self.assertEqual(manager.stats()["localhost:6379"]["in_use"], 0)
+        redlock = manager.redlock()
+        success, lock = redlock.lock("test_resource", 2000)
+        self.assertTrue(success)
+        self.assertTrue(redlock.unlock(lock))
+        manager.close()
+
     def tearDown(self):
         if self.redlock is not None:
             self.redis_client.close()
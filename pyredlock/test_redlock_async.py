@@ -3,11 +3,25 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import asyncio
 import logging
+import redis.asyncio as aio_redis
+import redis.exceptions
+import time
 import unittest
 
-from pyredlock import AioRedisClient
+from pyredlock import AioRedisClient, AioRedisClientManager
 from pyredlock import Redlock, Lock
+from pyredlock import ReentrantRedlock
+from pyredlock import RedlockRW
+from pyredlock import FairRedlock
+from pyredlock import RedlockSemaphore
+from pyredlock import OptimisticRedlock
+from pyredlock import ShardedRedlock
+from pyredlock import StripedRedlock
+from pyredlock import AioLockWatchdog
+from pyredlock import AioRespConnection
+from pyredlock import AioCommandMultiplexer
 
 
 class RedlockTestCase(unittest.IsolatedAsyncioTestCase):
@@ -39,6 +53,8 @@ class RedlockTestCase(unittest.IsolatedAsyncioTestCase):
         self.assertIsInstance(lock, Lock)
         self.assertTrue(lock.validity > 0)
         self.assertTrue(lock.resource == "test_resource")
+        self.assertTrue(0 < lock.remaining_ms() <= lock.validity)
+        self.assertFalse(lock.is_expired())
         success = await self.redlock.aunlock(lock)
         self.assertTrue(success)
 
@@ -58,6 +74,393 @@ class RedlockTestCase(unittest.IsolatedAsyncioTestCase):
         success = await self.redlock.aunlock(lock)
         self.assertTrue(success)
 
+    async def test_fan_out(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = Redlock(connections=[self.redis_client.get_connection()], async_mode=True, fan_out=True, node_timeout=0.5)
+        resource = "test_resource_3"
+        ttl = 2000
+        success, lock = await redlock.alock(resource, ttl)
+        self.assertTrue(success)
+        self.assertIsInstance(lock, Lock)
+        self.assertTrue(lock.validity > 0)
+        success, _ = await redlock.alock(resource, ttl)
+        self.assertFalse(success)
+        success = await redlock.aextend(lock, ttl)
+        self.assertTrue(success)
+        success = await redlock.aunlock(lock)
+        self.assertTrue(success)
+
+    async def test_lock_many(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        resources = ["test_resource_5", "test_resource_6", "test_resource_7"]
+        ttl = 2000
+        success, locks = await self.redlock.alock_many(resources, ttl)
+        self.assertTrue(success)
+        self.assertEqual([lock.resource for lock in locks], resources)
+        self.assertTrue(all(lock.validity > 0 for lock in locks))
+        success, _ = await self.redlock.alock_many(["test_resource_7", "test_resource_8"], ttl)
+        self.assertFalse(success)
+        success, partial = await self.redlock.alock_many(["test_resource_7", "test_resource_8"], ttl, all_or_nothing=False)
+        self.assertTrue(success)
+        self.assertEqual([lock.resource for lock in partial], ["test_resource_8"])
+        success = await self.redlock.aunlock_many(locks + partial)
+        self.assertTrue(success)
+
+    async def test_lock_many_fan_out(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+
+        class SlowRedis(aio_redis.Redis):
+            async def execute_command(self, *args, **options):
+                if args[0] == "EVALSHA":
+                    await asyncio.sleep(0.3)
+                return await super(SlowRedis, self).execute_command(*args, **options)
+
+        kwargs = {"host": "localhost", "port": 6379, "password": "sOmE_sEcUrE_pAsS", "socket_timeout": 1.0}
+        connections = [aio_redis.Redis(db=0, **kwargs), aio_redis.Redis(db=1, **kwargs), SlowRedis(db=2, **kwargs)]
+        resources = ["test_resource_20", "test_resource_21"]
+        ttl = 5000
+        for connection in connections:
+            await connection.delete(*resources)
+        # Held on the fast nodes, so that every attempt fails there at once and leaves the slow node in flight.
+        for connection in connections[:2]:
+            await connection.set(resources[0], "another holder", px=ttl)
+        redlock = Redlock(
+            connections=connections, async_mode=True, fan_out=True, node_timeout=1.0, retry_count=3, retry_delay=0.05
+        )
+        success, _ = await redlock.alock_many(resources, ttl)
+        self.assertFalse(success)
+        # Each attempt rolls back its own keys on the slow node, once the node replied.
+        await asyncio.sleep(1.0)
+        self.assertEqual(await connections[2].exists(*resources), 0)
+        for connection in connections:
+            await connection.delete(*resources)
+            await connection.aclose()
+
+    async def test_watchdog(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        watchdog = AioLockWatchdog(self.redlock)
+        watchdog.start()
+        resource = "test_resource_9"
+        ttl = 300
+        success, lock = await self.redlock.alock(resource, ttl)
+        self.assertTrue(success)
+        lost = []
+        watchdog.watch(lock, ttl, on_lost=lost.append)
+
+        class BrokenRedlock(Redlock):
+            def _extend_command(self, lock, ttl):
+                return ("no_such_script", (lock.resource,), (lock.val, ttl))
+
+        broken = BrokenRedlock(connections=[self.redis_client.get_connection()], async_mode=True)
+        _, broken_lock = await broken.alock(resource + ":broken", ttl)
+        watchdog.watch(broken_lock, ttl, on_lost=lost.append, owner=broken)
+        await asyncio.sleep(1)
+        # The renewal which could not be sent lost its lease only.
+        self.assertEqual([lock.resource for lock in lost], [resource + ":broken"])
+        success, _ = await self.redlock.alock(resource, ttl)
+        self.assertFalse(success)
+        watchdog.unwatch(lock)
+        await watchdog.stop()
+        success = await self.redlock.aunlock(lock)
+        self.assertTrue(success)
+
+    async def test_blocking_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = Redlock(connections=[self.redis_client.get_connection()], async_mode=True, retry_delay=5, release_channel_prefix="redlock:release:")
+        resource = "test_resource_10"
+        ttl = 2000
+        success, lock = await redlock.alock(resource, ttl)
+        self.assertTrue(success)
+        asyncio.get_running_loop().call_later(0.2, asyncio.ensure_future, redlock.aunlock(lock))
+        t = time.monotonic()
+        success, lock = await redlock.alock(resource, ttl, blocking=True, timeout=3)
+        self.assertTrue(success)
+        self.assertTrue(time.monotonic() - t < 1)
+        success, _ = await redlock.alock(resource, ttl, blocking=True, timeout=0.2)
+        self.assertFalse(success)
+        success = await redlock.aunlock(lock)
+        self.assertTrue(success)
+        await redlock.aclose()
+
+    async def test_local_coalescing(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = Redlock(connections=[self.redis_client.get_connection()], async_mode=True, coalesce_local=True)
+        resource = "test_resource"
+        counter = {"holders": 0, "max": 0}
+
+        async def worker():
+            for _ in range(5):
+                success, lock = await redlock.alock(resource, 2000, blocking=True, timeout=5)
+                self.assertTrue(success)
+                counter["holders"] += 1
+                counter["max"] = max(counter["max"], counter["holders"])
+                await asyncio.sleep(0.001)
+                counter["holders"] -= 1
+                self.assertTrue(await redlock.aunlock(lock))
+
+        await asyncio.gather(*[worker() for _ in range(10)])
+        self.assertEqual(counter["max"], 1)
+        self.assertEqual(redlock._local_gates, {})
+        await redlock.aclose()
+
+    async def test_reentrant_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        connection = self.redis_client.get_connection()
+        redlock = ReentrantRedlock(connections=[connection], async_mode=True, retry_count=1)
+        resource = "test_resource_11"
+        with self.assertRaises(ValueError):
+            await redlock.alock_many([resource], 2000)
+        ttl = 2000
+        success, lock = await redlock.alock(resource, ttl)
+        self.assertTrue(success)
+        success, nested = await redlock.alock(resource, ttl)
+        self.assertTrue(success)
+        self.assertEqual(nested, lock)
+        self.assertEqual(await connection.hget(resource, lock.val), b"1")
+        # Another task is another owner.
+        success, _ = await asyncio.ensure_future(redlock.alock(resource, ttl))
+        self.assertFalse(success)
+        self.assertTrue(await redlock.aunlock(nested))
+        self.assertTrue(await redlock.aextend(lock, ttl))
+        self.assertEqual(await connection.exists(resource), 1)
+        self.assertTrue(await redlock.aunlock(lock))
+        self.assertEqual(await connection.exists(resource), 0)
+
+    async def test_read_write_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = RedlockRW(connections=[self.redis_client.get_connection()], async_mode=True, retry_count=1)
+        resource = "test_resource_12"
+        ttl = 2000
+        readers = await asyncio.gather(*[redlock.aread_lock(resource, ttl) for _ in range(3)])
+        self.assertTrue(all(success for success, _ in readers))
+        success, _ = await redlock.awrite_lock(resource, ttl)
+        self.assertFalse(success)
+        for _, lock in readers:
+            self.assertTrue(await redlock.aextend(lock, ttl))
+            self.assertTrue(await redlock.aunlock(lock))
+        success, writer = await redlock.awrite_lock(resource, ttl)
+        self.assertTrue(success)
+        success, _ = await redlock.aread_lock(resource, ttl)
+        self.assertFalse(success)
+        self.assertTrue(await redlock.aunlock(writer))
+        with self.assertRaises(ValueError):
+            await redlock.alock_many([resource], ttl)
+
+    async def test_fair_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = FairRedlock(
+            connections=[self.redis_client.get_connection()], async_mode=True, retry_count=1,
+            release_channel_prefix="test:released:"
+        )
+        resource = "test_resource_13"
+        with self.assertRaises(ValueError):
+            await redlock.alock_many([resource], 2000)
+        ttl = 2000
+        success, lock = await redlock.alock(resource, ttl)
+        self.assertTrue(success)
+        # The waiters get the lock in their order of arrival.
+        acquired = []
+
+        async def wait(i):
+            success, lock = await redlock.alock(resource, ttl, blocking=True, timeout=5)
+            acquired.append((i, success))
+            await asyncio.sleep(0.02)
+            await redlock.aunlock(lock)
+
+        waiters = []
+        for i in range(3):
+            waiters.append(asyncio.create_task(wait(i)))
+            await asyncio.sleep(0.1)
+        self.assertTrue(await redlock.aunlock(lock))
+        await asyncio.gather(*waiters)
+        self.assertEqual(acquired, [(0, True), (1, True), (2, True)])
+        await redlock.aclose()
+
+    async def test_semaphore(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = RedlockSemaphore(connections=[self.redis_client.get_connection()], async_mode=True, retry_count=1, permits=3)
+        resource = "test_resource_14"
+        with self.assertRaises(ValueError):
+            await redlock.alock_many([resource], 2000)
+        ttl = 2000
+        results = await asyncio.gather(*[redlock.alock(resource, ttl) for _ in range(4)])
+        self.assertEqual(sorted(success for success, _ in results), [False, True, True, True])
+        for success, lock in results:
+            if success:
+                self.assertTrue(await redlock.aextend(lock, ttl))
+                self.assertTrue(await redlock.aunlock(lock))
+        success, lock = await redlock.alock(resource, ttl, count=3)
+        self.assertTrue(success)
+        self.assertTrue(await redlock.aunlock(lock))
+
+    async def test_fencing(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        redlock = Redlock(connections=[self.redis_client.get_connection()], async_mode=True, retry_count=1, fencing=True)
+        resource = "test_resource_15"
+        ttl = 2000
+        fences = []
+        for _ in range(3):
+            success, lock = await redlock.alock(resource, ttl)
+            self.assertTrue(success)
+            fences.append(lock.fence)
+            self.assertTrue(await redlock.aunlock(lock))
+        self.assertEqual(fences, list(range(fences[0], fences[0] + 3)))
+
+    async def test_optimistic_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        connection = self.redis_client.get_connection()
+        redlock = OptimisticRedlock(connections=[connection], async_mode=True, retry_count=100, retry_delay=0.001)
+        resource = "test_resource_16"
+        await connection.delete(resource + ":version")
+        committed = []
+
+        async def worker():
+            for _ in range(5):
+                success, based_on, version = await redlock.arun(resource, lambda version: version)
+                self.assertTrue(success)
+                self.assertEqual(version, based_on + 1)
+                committed.append(version)
+
+        # Every commit moved the version by one.
+        await asyncio.gather(*[worker() for _ in range(4)])
+        self.assertEqual(sorted(committed), list(range(1, 21)))
+        self.assertEqual(await redlock.aread_version(resource), 20)
+        await connection.delete(resource + ":version")
+
+    async def test_multiplex(self):
+        with self.assertRaises(ValueError):
+            Redlock(connections=[], async_mode=False, multiplex=True)
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        connection = self.redis_client.get_connection()
+        redlock = Redlock(connections=[connection], async_mode=True, retry_count=1, multiplex=True)
+        ttl = 2000
+        locks = await asyncio.gather(*[redlock.alock(f"test_resource_17:{i}", ttl) for i in range(100)])
+        self.assertTrue(all(success for success, _ in locks))
+        success, _ = await redlock.alock("test_resource_17:0", ttl)
+        self.assertFalse(success)
+        extended = await asyncio.gather(*[redlock.aextend(lock, ttl) for _, lock in locks])
+        self.assertTrue(all(extended))
+        released = await asyncio.gather(*[redlock.aunlock(lock) for _, lock in locks])
+        self.assertTrue(all(released))
+        multiplexer = redlock._multiplexers[id(connection)]
+        # 100 locks, extends and unlocks, plus the failed attempt and its release,
+        # and each batch of concurrent commands went out as one pipeline.
+        self.assertEqual(multiplexer.commands, 302)
+        self.assertLess(multiplexer.batches, 10)
+        # A batch flushed once full does not cut the window of the next batch short.
+        multiplexer = AioCommandMultiplexer(connection, redlock._scripts, window=0.2, max_batch=3)
+        await asyncio.gather(*[multiplexer.execute_command("PING") for _ in range(3)])
+        await asyncio.sleep(0.1)
+        started = time.monotonic()
+        self.assertTrue(await multiplexer.execute_command("PING"))
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+        self.assertEqual(multiplexer.batches, 2)
+        await redlock.aclose()
+
+    async def test_resp_transport(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        connection = AioRespConnection(port=6379, password="sOmE_sEcUrE_pAsS", socket_timeout=0.5)
+        self.assertTrue(await connection.ping())
+        redlock = Redlock(connections=[connection], async_mode=True, retry_count=1)
+        resource = "test_resource_18"
+        # The concurrent commands are pipelined on the one connection.
+        locks = await asyncio.gather(*[redlock.alock(resource, 2000) for _ in range(10)])
+        self.assertEqual(sum(1 for success, _ in locks if success), 1)
+        lock = next(lock for success, lock in locks if success)
+        self.assertEqual(await connection.get(resource), lock.val)
+        self.assertTrue(await redlock.aextend(lock, 2000))
+        self.assertTrue(await redlock.aunlock(lock))
+        self.assertIsNone(await connection.get(resource))
+        with self.assertRaises(redis.exceptions.AuthenticationError):
+            await AioRespConnection(port=6379, password="wrong").ping()
+        await connection.aclose()
+
+    async def test_sharded_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        connections = [
+            aio_redis.Redis(host="localhost", port=6379, password="sOmE_sEcUrE_pAsS", db=db, socket_timeout=0.5)
+            for db in range(3)
+        ]
+        sharded = ShardedRedlock([[connection] for connection in connections], async_mode=True, retry_count=1)
+        resources = [f"test_resource_19:{i}" for i in range(30)]
+        locks = [await sharded.alock(resource, 2000) for resource in resources]
+        self.assertTrue(all(success for success, _ in locks))
+        for resource in resources:
+            self.assertEqual(await connections[sharded.group_of(resource)].exists(resource), 1)
+        for _, lock in locks:
+            self.assertTrue(await sharded.aextend(lock, 2000))
+        # lock_many fails on the group holding the first resource, and the other groups release theirs.
+        success, many = await sharded.alock_many(resources[:1] + [f"test_resource_19:free:{i}" for i in range(10)], 2000)
+        self.assertEqual((success, many), (False, []))
+        for _, lock in locks:
+            self.assertTrue(await sharded.aunlock(lock))
+        for connection in connections:
+            self.assertEqual(await connection.exists(*resources, *[f"test_resource_19:free:{i}" for i in range(10)]), 0)
+            await connection.aclose()
+        await sharded.aclose()
+
+    async def test_striped_lock(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        connection = self.redis_client.get_connection()
+        redlock = StripedRedlock(connections=[connection], async_mode=True, retry_count=1, stripes=4,
+                                 prefix="test_resource_20:")
+        resources = [f"row:{i}" for i in range(100)]
+        locks = [await redlock.alock(resource, 10000) for resource in resources]
+        # A hundred rows, but no more than one lock key per stripe.
+        self.assertEqual(sum(1 for success, _ in locks if success), 4)
+        self.assertEqual(len(await connection.keys("test_resource_20:*")), 4)
+        held = [lock for success, lock in locks if success]
+        for lock in held:
+            self.assertTrue(await redlock.aextend(lock, 10000))
+            self.assertTrue(await redlock.aunlock(lock))
+        success, many = await redlock.alock_many(resources, 10000)
+        self.assertTrue(success)
+        self.assertEqual(len(many), 4)
+        self.assertTrue(await redlock.aunlock_many(many))
+
+    async def test_client_manager(self):
+        if self.redlock is None:
+            self.skipTest("Redis connection failed.")
+        manager = AioRedisClientManager([{
+            "endpoint": "localhost:6379",
+            "password": "sOmE_sEcUrE_pAsS",
+            "db": 0,
+            "socket_timeout": 0.5,
+            "socket_connect_timeout": 0.25,
+            "max_connections": 2
+        }])
+        self.assertEqual(await manager.health(), {"localhost:6379": True})
+        stats = manager.stats()["localhost:6379"]
+        self.assertEqual(stats["max_connections"], 2)
+        self.assertEqual((stats["created"], stats["available"], stats["in_use"]), (1, 1, 0))
+        # The counts come from private attributes of redis-py, checked here against a connection checked out.
+        pool = manager._pools[0]
+        connection = await pool.get_connection("PING")
+        self.assertEqual(manager.stats()["localhost:6379"], {"max_connections": 2, "created": 1, "available": 0, "in_use": 1})
+        await pool.release(connection)
+        self.assertEqual(manager.stats()["localhost:6379"]["in_use"], 0)
+        redlock = manager.redlock()
+        success, lock = await redlock.alock("test_resource", 2000)
+        self.assertTrue(success)
+        self.assertTrue(await redlock.aunlock(lock))
+        await manager.close()
+
     async def asyncTearDown(self):
         if self.redlock is not None:
             await self.redis_client.close()
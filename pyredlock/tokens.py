@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import base64
+import os
+import socket
+import threading
+import weakref
+
+from typing import Optional, Union
+
+_generators = weakref.WeakSet()
+
+
+def _reset_after_fork() -> None:
+    # A forked child must never hand out the random bytes buffered by its parent.
+    for generator in list(_generators):
+        generator._reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class TokenGenerator(object):
+    """A generator of unique lock values, drawn from buffered OS entropy."""
+
+    def __init__(
+            self,
+            prefix: Optional[Union[str, bytes]] = None,
+            owner_prefix: bool = False,
+            nbytes: int = 15,
+            buffer_size: int = 4096
+        ) -> None:
+        """
+        Initialize the TokenGenerator.
+
+        Args:
+            prefix (Optional[Union[str, bytes]], optional): A constant prefix of every token,
+                e.g. the name of the service. Defaults to None.
+            owner_prefix (bool, optional): Whether to prefix every token with "<hostname>:<pid>:",
+                so that a lock can be traced back to the process holding it. Defaults to False.
+            nbytes (int, optional): Number of random bytes per token, a multiple of 3. Defaults to 15.
+            buffer_size (int, optional): Number of random bytes read from the OS at once. Defaults to 4096.
+
+        Notes:
+            The random bytes come from os.urandom, which is suitable for cryptographic use,
+            and are read ahead in a buffer so that a single system call serves buffer_size // nbytes tokens.
+            The whole buffer is encoded with URL-safe base64 at once; since nbytes is a multiple of 3,
+            every token is a plain slice of the encoded buffer, e.g. 15 random bytes (120 bits) give 20 bytes.
+            The buffer is discarded in a forked child, so parent and child never share tokens.
+        """
+        if nbytes < 9 or nbytes % 3 != 0:
+            raise ValueError("nbytes {} is not a multiple of 3 greater than 8".format(nbytes))
+        self._prefix = prefix.encode("utf-8") if isinstance(prefix, str) else (prefix or b"")
+        self._owner_prefix = owner_prefix
+        self._token_size = nbytes // 3 * 4
+        self._buffer_size = max(buffer_size - buffer_size % nbytes, nbytes)
+        self._reset()
+        _generators.add(self)
+
+    def _reset(self) -> None:
+        self._lock = threading.Lock()
+        self._buffer = b""
+        self._offset = 0
+        self._full_prefix = self._prefix
+        if self._owner_prefix:
+            self._full_prefix += f"{socket.gethostname()}:{os.getpid()}:".encode("utf-8")
+
+    @property
+    def prefix(self) -> bytes:
+        """
+        The prefix of every token.
+        """
+        return self._full_prefix
+
+    def __call__(self) -> bytes:
+        """
+        Generate a unique token.
+
+        Returns:
+            bytes: The token.
+        """
+        with self._lock:
+            offset = self._offset
+            if offset >= len(self._buffer):
+                self._buffer = base64.urlsafe_b64encode(os.urandom(self._buffer_size))
+                offset = 0
+            self._offset = offset + self._token_size
+            return self._full_prefix + self._buffer[offset:self._offset]
@@ -0,0 +1,486 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import collections
+import redis.exceptions as redis_exceptions
+import socket
+import threading
+
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+
+# Encoded bulk strings of the str arguments, i.e. the command names and the script digests,
+# bounded since the resources may be str as well.
+_BULK_CACHE: Dict[str, bytes] = {}
+_BULK_CACHE_SIZE = 1024
+
+
+def _bulk(arg: Union[bytes, str, int, float]) -> bytes:
+    if isinstance(arg, bytes):
+        return b"$%d\r\n%b\r\n" % (len(arg), arg)
+    if isinstance(arg, str):
+        frame = _BULK_CACHE.get(arg)
+        if frame is None:
+            data = arg.encode("utf-8")
+            frame = b"$%d\r\n%b\r\n" % (len(data), data)
+            if len(_BULK_CACHE) < _BULK_CACHE_SIZE:
+                _BULK_CACHE[arg] = frame
+        return frame
+    if isinstance(arg, int):
+        data = b"%d" % arg
+    else:
+        data = repr(arg).encode("ascii")
+    return b"$%d\r\n%b\r\n" % (len(data), data)
+
+
+def encode_command(args: Sequence[Any]) -> bytes:
+    """
+    Encode a command as a RESP array of bulk strings.
+
+    Args:
+        args (Sequence[Any]): The command and its arguments, as bytes, str, int or float.
+
+    Returns:
+        bytes: The RESP frame of the command.
+    """
+    return b"*%d\r\n%b" % (len(args), b"".join([_bulk(arg) for arg in args]))
+
+
+def _error(message: str) -> redis_exceptions.RedisError:
+    if message.startswith("NOSCRIPT"):
+        return redis_exceptions.NoScriptError(message)
+    if message.startswith(("NOAUTH", "WRONGPASS")) or "invalid password" in message:
+        return redis_exceptions.AuthenticationError(message)
+    return redis_exceptions.ResponseError(message)
+
+
+def parse_reply(buf: Union[bytes, bytearray], pos: int) -> Optional[Tuple[Any, int]]:
+    """
+    Parse a RESP2 reply.
+
+    Args:
+        buf (Union[bytes, bytearray]): The data received.
+        pos (int): Offset of the reply in buf.
+
+    Returns:
+        Optional[Tuple[Any, int]]: The reply and the offset past it, None if buf does not hold all of it yet.
+        Simple and bulk strings are bytes, error replies are RedisError instances, nil replies are None.
+    """
+    end = buf.find(b"\r\n", pos)
+    if end < 0:
+        return None
+    kind = buf[pos]
+    if kind == 36:  # "$"
+        n = int(buf[pos + 1:end])
+        if n < 0:
+            return (None, end + 2)
+        if len(buf) < end + 4 + n:
+            return None
+        return (bytes(buf[end + 2:end + 2 + n]), end + 4 + n)
+    if kind == 58:  # ":"
+        return (int(buf[pos + 1:end]), end + 2)
+    if kind == 43:  # "+"
+        return (bytes(buf[pos + 1:end]), end + 2)
+    if kind == 45:  # "-"
+        return (_error(buf[pos + 1:end].decode("utf-8", "replace")), end + 2)
+    if kind == 42:  # "*"
+        n = int(buf[pos + 1:end])
+        if n < 0:
+            return (None, end + 2)
+        items = []
+        pos = end + 2
+        for _ in range(n):
+            parsed = parse_reply(buf, pos)
+            if parsed is None:
+                return None
+            item, pos = parsed
+            items.append(item)
+        return (items, pos)
+    raise redis_exceptions.InvalidResponse(f"Protocol error, got {chr(kind)!r} as reply type byte")
+
+
+def _handshake(password: Optional[str], db: int) -> List[bytes]:
+    frames = []
+    if password:
+        frames.append(encode_command(("AUTH", password)))
+    if db:
+        frames.append(encode_command(("SELECT", db)))
+    return frames
+
+
+class _Socket(object):
+    """A blocking connection to a Redis server, with its receive buffer."""
+
+    __slots__ = ("sock", "buf")
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.buf = bytearray()
+
+    def read(self, n: int) -> List[Any]:
+        replies = []
+        pos = 0
+        while len(replies) < n:
+            parsed = parse_reply(self.buf, pos) if pos < len(self.buf) else None
+            if parsed is None:
+                data = self.sock.recv(65536)
+                if not data:
+                    raise redis_exceptions.ConnectionError("Connection closed by server.")
+                self.buf += data
+                continue
+            reply, pos = parsed
+            replies.append(reply)
+        del self.buf[:pos]
+        return replies
+
+
+class _Pipeline(object):
+    """The commands of a pipeline, sent in a single write."""
+
+    def __init__(self, connection: Any) -> None:
+        self._connection = connection
+        self._frames: List[bytes] = []
+
+    def execute_command(self, *args: Any) -> "_Pipeline":
+        self._frames.append(encode_command(args))
+        return self
+
+    def _settle(self, replies: List[Any], raise_on_error: bool) -> List[Any]:
+        self._frames = []
+        if raise_on_error:
+            for reply in replies:
+                if isinstance(reply, redis_exceptions.RedisError):
+                    raise reply
+        return replies
+
+
+class RespPipeline(_Pipeline):
+    """A pipeline of a RespConnection."""
+
+    def __enter__(self) -> "RespPipeline":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._frames = []
+
+    def execute(self, raise_on_error: bool = True) -> List[Any]:
+        if len(self._frames) == 0:
+            return []
+        replies = self._connection._roundtrip(b"".join(self._frames), len(self._frames))
+        return self._settle(replies, raise_on_error)
+
+
+class AioRespPipeline(_Pipeline):
+    """A pipeline of an AioRespConnection."""
+
+    async def __aenter__(self) -> "AioRespPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._frames = []
+
+    async def execute(self, raise_on_error: bool = True) -> List[Any]:
+        if len(self._frames) == 0:
+            return []
+        replies = await self._connection._roundtrip(b"".join(self._frames), len(self._frames))
+        return self._settle(replies, raise_on_error)
+
+
+class RespConnection(object):
+    """A minimal blocking Redis client for the commands of Redlock, usable in place of redis.Redis."""
+
+    def __init__(
+            self,
+            host: str = "localhost",
+            port: int = 6379,
+            db: int = 0,
+            password: Optional[str] = None,
+            socket_timeout: Optional[float] = None,
+            socket_connect_timeout: Optional[float] = None
+        ) -> None:
+        """
+        Initialize the RespConnection.
+
+        Args:
+            host (str, optional): Host of the Redis server. Defaults to "localhost".
+            port (int, optional): Port of the Redis server. Defaults to 6379.
+            db (int, optional): Database number. Defaults to 0.
+            password (Optional[str], optional): Password of the Redis server. Defaults to None.
+            socket_timeout (Optional[float], optional): Timeout of a command in seconds. Defaults to None.
+            socket_connect_timeout (Optional[float], optional): Timeout of a connection in seconds. Defaults to None.
+
+        Attributes:
+            connection_kwargs (Dict[str, Any]): The address of the server, like redis-py connection pools.
+            _free (List[_Socket]): The idle connections.
+
+        Notes:
+            The commands are encoded straight into RESP frames, the str arguments (command names, script digests)
+            from a cache, and the replies are parsed without the response callbacks of redis-py: simple and bulk
+            strings are returned as bytes, integers as int, and nil as None, which is all Redlock looks at.
+            Every call checks out an idle connection, or opens one, so that threads do not wait for each other;
+            a connection which failed is closed instead of being reused. Errors are raised as the exceptions of
+            redis-py, so that a failed node counts as a failed vote. Publish/subscribe is not supported,
+            so the blocking waiters poll.
+        """
+        self.connection_kwargs: Dict[str, Any] = {"host": host, "port": port, "db": db}
+        self._address = (host, port)
+        self._handshake = _handshake(password, db)
+        self._socket_timeout = socket_timeout
+        self._socket_connect_timeout = socket_connect_timeout
+        self._free: List[_Socket] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> _Socket:
+        try:
+            sock = socket.create_connection(self._address, timeout=self._socket_connect_timeout)
+        except socket.timeout as exc:
+            raise redis_exceptions.TimeoutError(f"Timeout connecting to {self._address}") from exc
+        except OSError as exc:
+            raise redis_exceptions.ConnectionError(f"Error connecting to {self._address}: {exc}") from exc
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self._socket_timeout)
+        conn = _Socket(sock)
+        if len(self._handshake) > 0:
+            try:
+                sock.sendall(b"".join(self._handshake))
+                replies = conn.read(len(self._handshake))
+            except BaseException:
+                sock.close()
+                raise
+            for reply in replies:
+                if isinstance(reply, redis_exceptions.RedisError):
+                    sock.close()
+                    raise reply
+        return conn
+
+    def _roundtrip(self, frames: bytes, n: int) -> List[Any]:
+        with self._lock:
+            conn = self._free.pop() if len(self._free) > 0 else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            conn.sock.sendall(frames)
+            replies = conn.read(n)
+        except socket.timeout as exc:
+            conn.sock.close()
+            raise redis_exceptions.TimeoutError("Timeout reading from socket") from exc
+        except OSError as exc:
+            conn.sock.close()
+            raise redis_exceptions.ConnectionError(f"Error while talking to {self._address}: {exc}") from exc
+        except BaseException:
+            conn.sock.close()
+            raise
+        with self._lock:
+            self._free.append(conn)
+        return replies
+
+    def execute_command(self, *args: Any) -> Any:
+        """
+        Run a command.
+
+        Returns:
+            Any: The reply of the command.
+
+        Raises:
+            redis.exceptions.RedisError: On an error reply, or when the server cannot be reached.
+        """
+        reply = self._roundtrip(encode_command(args), 1)[0]
+        if isinstance(reply, redis_exceptions.RedisError):
+            raise reply
+        return reply
+
+    def pipeline(self, transaction: bool = False) -> RespPipeline:
+        """
+        Create a pipeline, whose commands are sent in a single write. Only non-transactional pipelines are supported.
+        """
+        if transaction:
+            raise ValueError("transactions are not supported by RespConnection")
+        return RespPipeline(self)
+
+    def ping(self) -> bool:
+        return self.execute_command("PING") == b"PONG"
+
+    def get(self, key: Union[str, bytes]) -> Optional[bytes]:
+        return self.execute_command("GET", key)
+
+    def close(self) -> None:
+        """
+        Close the idle connections.
+        """
+        with self._lock:
+            free, self._free = self._free, []
+        for conn in free:
+            conn.sock.close()
+
+
+class _RespProtocol(asyncio.Protocol):
+    """A connection to a Redis server, matching the replies to the requests in order."""
+
+    def __init__(self) -> None:
+        self._transport: Optional[asyncio.Transport] = None
+        self._buf = bytearray()
+        # [future, number of replies expected, replies] of each request, in the order they were written.
+        self._waiters: Deque[List[Any]] = collections.deque()
+        self.closed = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        self._buf += data
+        buf = self._buf
+        pos = 0
+        while len(self._waiters) > 0 and pos < len(buf):
+            parsed = parse_reply(buf, pos)
+            if parsed is None:
+                break
+            reply, pos = parsed
+            waiter = self._waiters[0]
+            waiter[2].append(reply)
+            if len(waiter[2]) == waiter[1]:
+                self._waiters.popleft()
+                if not waiter[0].done():
+                    waiter[0].set_result(waiter[2])
+        del buf[:pos]
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.closed = True
+        error = redis_exceptions.ConnectionError("Connection closed by server.")
+        while len(self._waiters) > 0:
+            future = self._waiters.popleft()[0]
+            if not future.done():
+                future.set_exception(error)
+
+    def request(self, frames: bytes, n: int) -> asyncio.Future:
+        if self.closed:
+            raise redis_exceptions.ConnectionError("Connection closed by server.")
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append([future, n, []])
+        self._transport.write(frames)
+        return future
+
+    def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+
+
+class AioRespConnection(object):
+    """A minimal asynchronous Redis client for the commands of Redlock, usable in place of redis.asyncio.Redis."""
+
+    def __init__(
+            self,
+            host: str = "localhost",
+            port: int = 6379,
+            db: int = 0,
+            password: Optional[str] = None,
+            socket_timeout: Optional[float] = None,
+            socket_connect_timeout: Optional[float] = None
+        ) -> None:
+        """
+        Initialize the AioRespConnection, see RespConnection for the arguments.
+
+        Attributes:
+            connection_kwargs (Dict[str, Any]): The address of the server, like redis-py connection pools.
+            _protocol (Optional[_RespProtocol]): The connection to the server, opened on first use.
+
+        Notes:
+            All the coroutines share one connection per server, on which their requests are pipelined:
+            a request is written as soon as it is issued, and the replies, which Redis sends in the same order,
+            are handed to the requests in turn by an asyncio Protocol, without a connection pool or a reader task.
+            A command which times out closes the connection, failing the other requests in flight,
+            since its reply could no longer be told apart; the next command reconnects.
+            The replies are those of RespConnection. Publish/subscribe is not supported, so the blocking waiters poll.
+        """
+        self.connection_kwargs: Dict[str, Any] = {"host": host, "port": port, "db": db}
+        self._address = (host, port)
+        self._handshake = _handshake(password, db)
+        self._socket_timeout = socket_timeout
+        self._socket_connect_timeout = socket_connect_timeout
+        self._protocol: Optional[_RespProtocol] = None
+        self._connecting: Optional[asyncio.Future] = None
+
+    async def _connect(self) -> _RespProtocol:
+        loop = asyncio.get_running_loop()
+        try:
+            _, protocol = await asyncio.wait_for(
+                loop.create_connection(_RespProtocol, *self._address), self._socket_connect_timeout
+            )
+        except asyncio.TimeoutError as exc:
+            raise redis_exceptions.TimeoutError(f"Timeout connecting to {self._address}") from exc
+        except OSError as exc:
+            raise redis_exceptions.ConnectionError(f"Error connecting to {self._address}: {exc}") from exc
+        if len(self._handshake) > 0:
+            try:
+                replies = await self._wait(protocol, protocol.request(b"".join(self._handshake), len(self._handshake)))
+            except BaseException:
+                protocol.close()
+                raise
+            for reply in replies:
+                if isinstance(reply, redis_exceptions.RedisError):
+                    protocol.close()
+                    raise reply
+        return protocol
+
+    async def _get_protocol(self) -> _RespProtocol:
+        protocol = self._protocol
+        if protocol is not None and not protocol.closed:
+            return protocol
+        # The coroutines which need the connection while it is being opened wait for the same attempt.
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._connect())
+        connecting = self._connecting
+        try:
+            self._protocol = await asyncio.shield(connecting)
+        finally:
+            if self._connecting is connecting and connecting.done():
+                self._connecting = None
+        return self._protocol
+
+    async def _wait(self, protocol: _RespProtocol, future: asyncio.Future) -> List[Any]:
+        if self._socket_timeout is None:
+            return await future
+        try:
+            return await asyncio.wait_for(future, self._socket_timeout)
+        except asyncio.TimeoutError as exc:
+            protocol.close()
+            raise redis_exceptions.TimeoutError("Timeout reading from socket") from exc
+
+    async def _roundtrip(self, frames: bytes, n: int) -> List[Any]:
+        protocol = await self._get_protocol()
+        return await self._wait(protocol, protocol.request(frames, n))
+
+    async def execute_command(self, *args: Any) -> Any:
+        """
+        Run a command asynchronously.
+
+        Returns:
+            Any: The reply of the command.
+
+        Raises:
+            redis.exceptions.RedisError: On an error reply, or when the server cannot be reached.
+        """
+        reply = (await self._roundtrip(encode_command(args), 1))[0]
+        if isinstance(reply, redis_exceptions.RedisError):
+            raise reply
+        return reply
+
+    def pipeline(self, transaction: bool = False) -> AioRespPipeline:
+        """
+        Create a pipeline, whose commands are sent in a single write. Only non-transactional pipelines are supported.
+        """
+        if transaction:
+            raise ValueError("transactions are not supported by AioRespConnection")
+        return AioRespPipeline(self)
+
+    async def ping(self) -> bool:
+        return await self.execute_command("PING") == b"PONG"
+
+    async def get(self, key: Union[str, bytes]) -> Optional[bytes]:
+        return await self.execute_command("GET", key)
+
+    async def aclose(self) -> None:
+        """
+        Close the connection.
+        """
+        if self._protocol is not None:
+            self._protocol.close()
+            self._protocol = None
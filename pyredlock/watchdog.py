@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import heapq
+import inspect
+import itertools
+import threading
+import time
+
+from loguru import logger as loguru_logger
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .redlock import Lock, MultipleRedlockException, Redlock
+
+
+class _Lease(object):
+    """A held lock tracked by a watchdog."""
+
+    __slots__ = ("lock", "ttl", "on_lost", "owner", "due", "cancelled")
+
+    def __init__(self, lock: Lock, ttl: int, on_lost: Optional[Callable[[Lock], Any]], owner: Any, due: float) -> None:
+        self.lock = lock
+        self.ttl = ttl
+        self.on_lost = on_lost
+        self.owner = owner
+        self.due = due
+        self.cancelled = False
+
+
+class _BaseWatchdog(object):
+    """The lease bookkeeping shared by the synchronous and the asynchronous watchdog."""
+
+    def __init__(self, redlock: Redlock, renew_ratio: float = 1 / 3, batch_window: float = 0.1) -> None:
+        """
+        Initialize the watchdog.
+
+        Args:
+            redlock (Redlock): The lock manager which acquired the locks.
+            renew_ratio (float, optional): Fraction of the ttl after which a lock is renewed. Defaults to 1/3.
+            batch_window (float, optional): Locks due within this many seconds of each other are renewed
+                in the same batch. Defaults to 0.1.
+
+        Attributes:
+            _heap (List[Tuple[float, int, _Lease]]): Min-heap of the leases ordered by renewal deadline.
+            _leases (Dict[Tuple[Any, Any], _Lease]): The watched leases by (resource, val).
+
+        Notes:
+            Every tick pops all the leases which are due, and sends the extend command of all of them
+            to each node in one pipeline, so that renewing thousands of locks costs one round-trip per node.
+            A lease which is not renewed on a quorum of the nodes is lost: it is no longer watched,
+            and its on_lost callback is invoked with the lock.
+
+            The leases are renewed through their owner, i.e. its nodes, quorum and script registry, one pipeline
+            per owner and node, so that locks of Redlock subclasses with scripts of their own can share a watchdog.
+            A batch which fails for any other reason than a node error loses its leases, and does not stop
+            the renewal of the others.
+        """
+        if not 0 < renew_ratio < 1:
+            raise ValueError("renew_ratio {} is not in (0, 1)".format(renew_ratio))
+        self._redlock = redlock
+        self._renew_ratio = renew_ratio
+        self._batch_window = batch_window
+        self._heap: List[Tuple[float, int, _Lease]] = []
+        self._leases: Dict[Tuple[Any, Any], _Lease] = {}
+        self._seq = itertools.count()
+
+    def _push(self, lease: _Lease) -> None:
+        heapq.heappush(self._heap, (lease.due, next(self._seq), lease))
+
+    def _add(self, lock: Lock, ttl: int, on_lost: Optional[Callable[[Lock], Any]], owner: Any) -> None:
+        previous = self._leases.pop((lock.resource, lock.val), None)
+        if previous is not None:
+            previous.cancelled = True
+        # Keyed on the remaining validity, so that a lock acquired a while ago is renewed sooner.
+        due = time.monotonic() + min(lock.remaining_ms(), ttl) * self._renew_ratio / 1000
+        lease = _Lease(lock, ttl, on_lost, owner if owner is not None else self._redlock, due)
+        self._leases[(lock.resource, lock.val)] = lease
+        self._push(lease)
+
+    def _remove(self, lock: Lock) -> None:
+        lease = self._leases.pop((lock.resource, lock.val), None)
+        if lease is not None:
+            lease.cancelled = True
+
+    def _pop_due(self) -> List[_Lease]:
+        horizon = time.monotonic() + self._batch_window
+        leases = []
+        while len(self._heap) > 0 and self._heap[0][0] <= horizon:
+            _, _, lease = heapq.heappop(self._heap)
+            if not lease.cancelled:
+                leases.append(lease)
+        return leases
+
+    def _next_due(self) -> Optional[float]:
+        while len(self._heap) > 0 and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if len(self._heap) > 0 else None
+
+    @staticmethod
+    def _by_owner(leases: List[_Lease]) -> List[Tuple[Redlock, List[_Lease]]]:
+        batches: Dict[int, Tuple[Redlock, List[_Lease]]] = {}
+        for lease in leases:
+            batches.setdefault(id(lease.owner), (lease.owner, []))[1].append(lease)
+        return list(batches.values())
+
+    def _fail(self, leases: List[_Lease], exc: Exception) -> List[_Lease]:
+        """
+        Give up the leases of a batch which could not be renewed, and return them.
+        """
+        loguru_logger.error(f"Redlock Renew Error:{exc!r}.")
+        lost = []
+        for lease in leases:
+            if not lease.cancelled:
+                self._remove(lease.lock)
+                lost.append(lease)
+        return lost
+
+    def _settle(self, owner: Redlock, leases: List[_Lease], results: List[Any], started: int) -> List[_Lease]:
+        """
+        Reschedule the leases renewed on a quorum of the nodes of their owner, and return the lost ones.
+
+        The locks of the renewed leases get a new deadline, counted from the time.monotonic_ns() instant
+        at which the renewal was sent.
+        """
+        votes = [0] * len(leases)
+        for replies in results:
+            for i, reply in enumerate(replies):
+                if not isinstance(reply, Exception) and reply:
+                    votes[i] += 1
+        lost = []
+        for lease, n in zip(leases, votes):
+            if lease.cancelled:
+                continue
+            if n >= owner._quorum:
+                deadline = started + (lease.ttl - int(lease.ttl * owner._clock_drift_factor) - 2) * 1000000
+                lease.lock = lease.lock._replace(
+                    validity=max(0, (deadline - time.monotonic_ns()) // 1000000),
+                    deadline=deadline
+                )
+                lease.due = started / 1e9 + lease.ttl * self._renew_ratio / 1000
+                self._push(lease)
+            else:
+                self._remove(lease.lock)
+                lost.append(lease)
+        return lost
+
+    def __len__(self) -> int:
+        return len(self._leases)
+
+
+class LockWatchdog(_BaseWatchdog):
+    """A daemon thread which keeps renewing held locks until they are released."""
+
+    def __init__(self, redlock: Redlock, renew_ratio: float = 1 / 3, batch_window: float = 0.1) -> None:
+        super(LockWatchdog, self).__init__(redlock, renew_ratio, batch_window)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def watch(self, lock: Lock, ttl: int, on_lost: Optional[Callable[[Lock], Any]] = None, owner: Any = None) -> None:
+        """
+        Keep renewing a held lock.
+
+        Args:
+            lock (Lock): Lock object to renew.
+            ttl (int): Time-to-live to renew the lock with, in milliseconds.
+            on_lost (Optional[Callable[[Lock], Any]], optional): Called with the lock when it could not be renewed.
+                Defaults to None.
+            owner (Any, optional): The lock manager which acquired the lock, whose nodes, scripts and extend command
+                renew it. Defaults to None (the redlock).
+        """
+        with self._cond:
+            self._add(lock, ttl, on_lost, owner)
+            self._cond.notify()
+
+    def unwatch(self, lock: Lock) -> None:
+        """
+        Stop renewing a lock, e.g. right before releasing it.
+
+        Args:
+            lock (Lock): Lock object to stop renewing.
+        """
+        with self._cond:
+            self._remove(lock)
+
+    def start(self) -> None:
+        """
+        Start the watchdog thread.
+        """
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="redlock-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the watchdog thread. The locks are no longer renewed, and expire by themselves unless released.
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._running:
+                    due = self._next_due()
+                    if due is not None and due <= time.monotonic():
+                        break
+                    self._cond.wait(None if due is None else due - time.monotonic())
+                if not self._running:
+                    return
+                leases = self._pop_due()
+            if len(leases) > 0:
+                self._renew(leases)
+
+    def _renew(self, leases: List[_Lease]) -> None:
+        lost = []
+        for owner, batch in self._by_owner(leases):
+            try:
+                lost.extend(self._renew_batch(owner, batch))
+            except Exception as exc:
+                with self._cond:
+                    lost.extend(self._fail(batch, exc))
+        for lease in lost:
+            if lease.on_lost is not None:
+                try:
+                    lease.on_lost(lease.lock)
+                except Exception as exc:
+                    loguru_logger.error(f"Redlock watchdog callback error:{exc}.")
+
+    def _renew_batch(self, owner: Redlock, leases: List[_Lease]) -> List[_Lease]:
+        calls = [owner._extend_command(lease.lock, lease.ttl) for lease in leases]
+        started = time.monotonic_ns()
+        results, redis_errors, _ = owner._call_servers(
+            lambda server: owner._scripts.execute_many(server, calls)
+        )
+        if len(redis_errors) > 0:
+            loguru_logger.error(f"Redlock Renew Error:{MultipleRedlockException(redis_errors)}")
+        with self._cond:
+            return self._settle(owner, leases, results, started)
+
+
+class AioLockWatchdog(_BaseWatchdog):
+    """An asyncio task which keeps renewing held locks until they are released."""
+
+    def __init__(self, redlock: Redlock, renew_ratio: float = 1 / 3, batch_window: float = 0.1) -> None:
+        super(AioLockWatchdog, self).__init__(redlock, renew_ratio, batch_window)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def watch(self, lock: Lock, ttl: int, on_lost: Optional[Callable[[Lock], Any]] = None, owner: Any = None) -> None:
+        """
+        Keep renewing a held lock.
+
+        Args:
+            lock (Lock): Lock object to renew.
+            ttl (int): Time-to-live to renew the lock with, in milliseconds.
+            on_lost (Optional[Callable[[Lock], Any]], optional): Called (or awaited, for a coroutine function)
+                with the lock when it could not be renewed. Defaults to None.
+            owner (Any, optional): The lock manager which acquired the lock, whose nodes, scripts and extend command
+                renew it. Defaults to None (the redlock).
+        """
+        self._add(lock, ttl, on_lost, owner)
+        self._wakeup.set()
+
+    def unwatch(self, lock: Lock) -> None:
+        """
+        Stop renewing a lock, e.g. right before releasing it.
+
+        Args:
+            lock (Lock): Lock object to stop renewing.
+        """
+        self._remove(lock)
+
+    def start(self) -> None:
+        """
+        Start the watchdog task on the running event loop.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the watchdog task. The locks are no longer renewed, and expire by themselves unless released.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            due = self._next_due()
+            if due is None or due > time.monotonic():
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), None if due is None else due - time.monotonic())
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            leases = self._pop_due()
+            if len(leases) > 0:
+                await self._renew(leases)
+
+    async def _renew(self, leases: List[_Lease]) -> None:
+        lost = []
+        for owner, batch in self._by_owner(leases):
+            try:
+                lost.extend(await self._renew_batch(owner, batch))
+            except Exception as exc:
+                lost.extend(self._fail(batch, exc))
+        for lease in lost:
+            if lease.on_lost is not None:
+                try:
+                    ret = lease.on_lost(lease.lock)
+                    if inspect.isawaitable(ret):
+                        await ret
+                except Exception as exc:
+                    loguru_logger.error(f"Redlock watchdog callback error:{exc}.")
+
+    async def _renew_batch(self, owner: Redlock, leases: List[_Lease]) -> List[_Lease]:
+        calls = [owner._extend_command(lease.lock, lease.ttl) for lease in leases]
+        started = time.monotonic_ns()
+        results, redis_errors, _ = await owner._acall_servers(
+            lambda server: owner._scripts.aexecute_many(server, calls)
+        )
+        if len(redis_errors) > 0:
+            loguru_logger.error(f"Redlock Renew Error:{MultipleRedlockException(redis_errors)}")
+        return self._settle(owner, leases, results, started)